@@ -0,0 +1,95 @@
+"""
+Benchmark: analyze_finances (one grouped aggregation over a direction column derived once) vs the
+legacy analyzer (a type mask recomputed per table, a frame copy and a groupby per table).
+
+Rows follow the standardized schema (typed columns, mixed bank and credit card accounts).
+Plots and CSVs are not written; only the summary computation is timed.
+
+Usage:
+    python benchmarks/bench_analyzer.py --rows 10000 100000 1000000 10000000
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.analyzer import analyze_finances
+from src.schema import enforce_schema
+
+CATEGORIES = ['Food', 'Travel', 'Shopping', 'Fuel', 'Entertainment', 'Payment', 'Other']
+TYPES = ['Debit', 'Debit', 'Debit', 'Credit']
+
+
+def make_frame(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    merchants = np.array([f"UPI/MERCHANT {i:04d}/PAYMENT" for i in range(2000)], dtype=object)
+    start = np.datetime64('2023-01-01')
+    df = pd.DataFrame({
+        'date': start + rng.integers(0, 3 * 365, rows).astype('timedelta64[D]'),
+        'description': merchants[rng.integers(0, len(merchants), rows)],
+        'amount': np.round(rng.gamma(2.0, 900.0, rows), 2),
+        'type': np.array(TYPES, dtype=object)[rng.integers(0, len(TYPES), rows)],
+        'category': np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)],
+        'AccountType': np.where(rng.random(rows) < 0.6, 'BankAccount', 'CreditCard'),
+    })
+    return enforce_schema(df)
+
+
+def legacy_summary(df):
+    """Summary tables as the analyzer computed them before the single-pass rewrite."""
+    bank_df = df[df['AccountType'] == 'BankAccount']
+    cc_df = df[df['AccountType'] == 'CreditCard']
+    bank_income = bank_df[bank_df['type'].str.lower().isin(['credit', 'refund/payment', 'in'])]['amount'].sum()
+    bank_expenses = bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])]['amount'].sum()
+    bank_df['month'] = pd.to_datetime(bank_df['date'], errors='coerce').dt.to_period('M')
+    bank_df.groupby('month').agg({'amount': ['sum'], 'type': lambda x: (x.str.lower() == 'debit').sum()})
+    bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])].groupby('category', observed=True)['amount'].sum().sort_values(ascending=False).head(5)
+    recurring = bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])].groupby(['description', 'category'], observed=True).size()
+    recurring[recurring > 2].sort_values(ascending=False)
+    df_monthly = bank_df.copy()
+    df_monthly['income'] = df_monthly['amount'].where(df_monthly['type'].str.lower().isin(['credit', 'refund/payment', 'in']), 0)
+    df_monthly['expense'] = df_monthly['amount'].where(df_monthly['type'].str.lower().isin(['debit', 'expense', 'out']), 0)
+    df_monthly.groupby('month').agg({'income': 'sum', 'expense': 'sum'})
+    cc_df['month'] = pd.to_datetime(cc_df['date'], errors='coerce').dt.to_period('M')
+    cc_df.groupby('category', observed=True)['amount'].sum().sort_values(ascending=False)
+    cc_df[cc_df['type'].str.lower().isin(['credit', 'refund/payment', 'in'])]['amount'].sum()
+    expenses = cc_df[cc_df['type'].str.lower().isin(['debit', 'expense', 'out'])]['amount'].sum()
+    expenses / max(1, len(cc_df['month'].unique()))
+    return bank_income, bank_expenses
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000, 10000000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10000000,
+                        help="Skip the legacy analyzer above this many rows")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    print(f"{'rows':>10} {'legacy s':>10} {'single-pass s':>14} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        after_s, summary = timed(analyze_finances, df, output_dir=None)
+        if rows <= args.legacy_max_rows:
+            before_s, (income, expenses) = timed(legacy_summary, df)
+            assert round(income, 2) == summary['bank']['total_income']
+            assert round(expenses, 2) == summary['bank']['total_expenses']
+            print(f"{rows:>10,} {before_s:>10.3f} {after_s:>14.3f} {before_s / after_s:>7.2f}x")
+        else:
+            print(f"{rows:>10,} {'-':>10} {after_s:>14.3f} {'-':>8}")
+        del df
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: writing a combined file from many statements by concatenating them all, deduplicating
+and saving once (the old --combined path) vs streaming them through CombinedWriter one statement
+at a time. Statements are generated lazily, so the streaming run only ever holds one of them.
+Each run happens in a fresh child process; "peak MiB" is how much its peak RSS grew.
+
+Usage:
+    python benchmarks/bench_combined.py --statements 50 --rows-per-statement 20000 --overlap 0.1 --fmt csv parquet
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.io_utils import CombinedWriter
+from src.schema import enforce_schema, transaction_ids
+
+
+def make_statement(index, rows, overlap):
+    """Statement index; its first overlap share repeats the last rows of statement index - 1."""
+    fresh = int(rows * (1 - overlap))
+    rng = np.random.default_rng(0)
+    position = np.arange(index * fresh, index * fresh + rows)
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2022-01-01') + pd.to_timedelta(position // 50, unit='D'),
+        'description': [f"UPI/MERCHANT{p % 997}/{p}" for p in position],
+        'amount': (position * 7919 % 500000) / 100,
+        'type': np.where(position % 5 == 0, 'Credit', 'Debit'),
+        'category': rng.choice(['Food', 'Travel', 'Shopping', 'Bills'], rows),
+        'AmountValue': (position * 7919 % 500000) / 100,
+        'AccountType': 'BankAccount',
+        'source': 'axis',
+        'is_credit_card': False,
+    })
+    df = enforce_schema(df)
+    df['transaction_id'] = transaction_ids(df)
+    return df
+
+
+def statements(args):
+    return (make_statement(i, args.rows_per_statement, args.overlap) for i in range(args.statements))
+
+
+def concat_then_save(args, path, fmt):
+    combined = pd.concat(list(statements(args)), ignore_index=True).drop_duplicates(subset=['transaction_id'])
+    if fmt == 'parquet':
+        combined.to_parquet(path, index=False)
+    else:
+        combined.to_csv(path, index=False)
+    return len(combined)
+
+
+def stream(args, path, fmt):
+    with CombinedWriter(path, format=fmt) as writer:
+        for df in statements(args):
+            writer.write(df)
+    return writer.rows
+
+
+def _run(fn, *args):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    begin = time.perf_counter()
+    rows = fn(*args)
+    seconds = time.perf_counter() - begin
+    return seconds, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024, rows
+
+
+def measure(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork')) as pool:
+        return pool.submit(_run, fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--statements', type=int, default=50)
+    parser.add_argument('--rows-per-statement', type=int, default=20000)
+    parser.add_argument('--overlap', type=float, default=0.1)
+    parser.add_argument('--fmt', nargs='+', default=['csv', 'parquet'])
+    args = parser.parse_args()
+
+    one = make_statement(0, args.rows_per_statement, args.overlap).memory_usage(deep=True).sum() / 2**20
+    print(f"{args.statements} statements x {args.rows_per_statement:,} rows ({one:.1f} MiB each in memory)")
+    print(f"{'format':>8} {'method':>8} {'seconds':>8} {'peak MiB':>9} {'rows':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.fmt:
+            for name, fn in (('concat', concat_then_save), ('stream', stream)):
+                seconds, peak, rows = measure(fn, args, os.path.join(tmp, f"{name}.{fmt}"), fmt)
+                print(f"{fmt:>8} {name:>8} {seconds:>8.2f} {peak:>9.1f} {rows:>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: dashboard queries (monthly totals, category split, income vs expense, top categories)
+answered from the persisted aggregate cube vs grouping the transaction rows for every query.
+
+A synthetic history of monthly statements per source is merged into an AggregateStore one statement
+at a time, as the ingest pipeline does; the cube is then reloaded from disk and queried.
+
+Usage:
+    python benchmarks/bench_cube.py --years 10 --rows-per-statement 2000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.aggregates import AggregateStore
+from src.schema import enforce_schema
+
+CATEGORIES = ['Food', 'Travel', 'Shopping', 'Fuel', 'Entertainment', 'Payment', 'Utilities', 'Health', 'Other']
+SOURCES = {'Axis Bank': 'BankAccount', 'ICICI Bank': 'BankAccount', 'Amex': 'CreditCard', 'ICICI Credit Card': 'CreditCard'}
+
+
+def make_statement(month, source, rows, rng):
+    start = np.datetime64(month.to_timestamp(), 'D')
+    return enforce_schema(pd.DataFrame({
+        'date': start + rng.integers(0, 28, rows).astype('timedelta64[D]'),
+        'description': [f"MERCHANT {i}" for i in rng.integers(0, 500, rows)],
+        'amount': np.round(rng.gamma(2.0, 900.0, rows), 2),
+        'type': np.where(rng.random(rows) < 0.2, 'Credit', 'Debit'),
+        'category': np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)],
+        'AccountType': SOURCES[source],
+        'source': source,
+    }))
+
+
+def row_queries(df):
+    month = df['date'].dt.to_period('M')
+    credit = df['type'].str.lower() == 'credit'
+    return [
+        df.groupby(month)['amount'].sum(),
+        df.groupby('category', observed=True)['amount'].sum(),
+        df[credit].groupby(month[credit])['amount'].sum(),
+        df[~credit].groupby(month[~credit])['amount'].sum(),
+        df[~credit].groupby(['source', 'category'], observed=True)['amount'].sum().nlargest(5),
+    ]
+
+
+def cube_queries(store):
+    return [
+        store.query(by='month'),
+        store.query(by='category'),
+        store.query(by='month', direction='in'),
+        store.query(by='month', direction='out'),
+        store.query(by=['source', 'category'], direction='out').nlargest(5),
+    ]
+
+
+def load_store(state_path):
+    store = AggregateStore(state_path)
+    store.cube
+    return store
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--rows-per-statement', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    months = pd.period_range('2015-01', periods=12 * args.years, freq='M')
+    statements = [make_statement(month, source, args.rows_per_statement, rng) for month in months for source in SOURCES]
+    rows = pd.concat(statements, ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'aggregates.sqlite')
+        store = AggregateStore(state_path)
+        start = time.perf_counter()
+        for statement in statements:
+            store.merge(statement)
+        build_s = time.perf_counter() - start
+        load_s, store = best_of(args.repeat, load_store, state_path)
+
+        scan_s, expected = best_of(args.repeat, row_queries, rows)
+        cube_s, answered = best_of(args.repeat, cube_queries, store)
+    for want, got in zip(expected[:4], answered[:4]):
+        assert np.allclose(want.sort_index().to_numpy(), got.sort_index().to_numpy())
+
+    print(f"{len(statements):,} statements, {len(rows):,} rows -> {len(store.cube):,} cube cells")
+    print(f"cube build (merge per statement): {build_s:8.3f}s")
+    print(f"cube load from disk:              {load_s * 1000:8.1f} ms")
+    print(f"5 queries, row scans:             {scan_s * 1000:8.1f} ms")
+    print(f"5 queries, cube:                  {cube_s * 1000:8.1f} ms  ({scan_s / cube_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
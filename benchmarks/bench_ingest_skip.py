@@ -0,0 +1,61 @@
+"""
+Benchmark: re-running ingest over a directory of statements where only one is new. The first
+pass parses and saves every statement; later passes check each file's fingerprint against the
+manifest and only parse the new one (vs --force, which parses everything again).
+
+Usage:
+    python benchmarks/bench_ingest_skip.py --statements 100 300 --rows 200
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.pipeline import IngestPipeline
+from synthetic import write_statement
+
+
+def ingest(pipeline, files, force=False):
+    parsed = 0
+    for path in files:
+        result = None if force else pipeline.load_unchanged(path)
+        if result is None:
+            result = pipeline.run(path, persist=True, original_path=path)
+            parsed += 1
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--statements', type=int, nargs='+', default=[100, 300])
+    parser.add_argument('--rows', type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'statements':>10} {'first pass s':>13} {'one new s':>10} {'--force s':>10}")
+    for count in args.statements:
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = os.path.join(tmp, 'raw')
+            # One folder per statement; the seed makes every statement's content different
+            files = [write_statement(os.path.join(raw, f"{i:04d}"), 'axis', args.rows, seed=i) for i in range(count)]
+            processed = os.path.join(tmp, 'processed')
+            begin = time.perf_counter()
+            ingest(IngestPipeline(processed_dir=processed, category_cache=None), files)
+            first_s = time.perf_counter() - begin
+
+            files.append(write_statement(os.path.join(raw, f"{count:04d}"), 'axis', args.rows, seed=count))
+            begin = time.perf_counter()
+            assert ingest(IngestPipeline(processed_dir=processed, category_cache=None), files) == 1
+            skip_s = time.perf_counter() - begin
+
+            begin = time.perf_counter()
+            ingest(IngestPipeline(processed_dir=processed, category_cache=None), files, force=True)
+            force_s = time.perf_counter() - begin
+        print(f"{count:>10} {first_s:>13.2f} {skip_s:>10.2f} {force_s:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
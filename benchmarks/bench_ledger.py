@@ -0,0 +1,76 @@
+"""
+Benchmark: ingesting a stream of overlapping statements (each repeats part of the previous one)
+into the SQLite ledger with upserts, vs keeping all history in memory and re-running
+concat + drop_duplicates after every statement. Also times an indexed date-range query.
+
+Usage:
+    python benchmarks/bench_ledger.py --statements 24 --rows-per-statement 2000 20000 --overlap 0.25
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.ledger import Ledger
+from src.schema import enforce_schema, transaction_ids
+
+
+def make_statements(count, rows, overlap, seed=0):
+    """count date-ordered statements of rows each; each starts with the last overlap share of the previous one."""
+    rng = np.random.default_rng(seed)
+    fresh = int(rows * (1 - overlap))
+    total = fresh * (count - 1) + rows
+    history = pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 3 * 365, total)), unit='D'),
+        'description': [f"UPI/MERCHANT{m}/{r}" for m, r in zip(rng.integers(0, 500, total), rng.integers(0, 10**6, total))],
+        'amount': rng.integers(100, 500000, total) / 100,
+        'type': rng.choice(['Debit', 'Credit'], total, p=[0.8, 0.2]),
+        'category': rng.choice(['Food', 'Travel', 'Shopping', 'Bills'], total),
+        'source': rng.choice(['axis', 'icici', 'amex'], total),
+    })
+    history = enforce_schema(history)
+    history['transaction_id'] = transaction_ids(history)
+    return [history.iloc[i * fresh:i * fresh + rows].reset_index(drop=True) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--statements', type=int, default=24)
+    parser.add_argument('--rows-per-statement', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--overlap', type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"{'rows/stmt':>10} {'stored':>10} {'concat+dedup s':>15} {'ledger upsert s':>16} {'range query ms':>15}")
+    for rows in args.rows_per_statement:
+        statements = make_statements(args.statements, rows, args.overlap)
+
+        begin = time.perf_counter()
+        history = None
+        for statement in statements:
+            history = statement if history is None else pd.concat([history, statement], ignore_index=True)
+            history = history.drop_duplicates(subset=['transaction_id'], ignore_index=True)
+        concat_s = time.perf_counter() - begin
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = Ledger(os.path.join(tmp, 'ledger.sqlite'))
+            begin = time.perf_counter()
+            for i, statement in enumerate(statements):
+                ledger.upsert(statement, statement=f"statement_{i}")
+            ledger_s = time.perf_counter() - begin
+            assert len(ledger) == len(history)
+            begin = time.perf_counter()
+            month = ledger.query(start='2024-06-01', end='2024-06-30', sources=['axis'])
+            query_ms = (time.perf_counter() - begin) * 1000
+            expected = history[(history['date'] >= '2024-06-01') & (history['date'] <= '2024-06-30')
+                               & (history['source'] == 'axis')]
+            assert len(month) == len(expected)
+        print(f"{rows:>10,} {len(history):>10,} {concat_s:>15.2f} {ledger_s:>16.2f} {query_ms:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: ingest time (detect -> parse -> categorize -> standardize) for text statements of every
+layout with logging off (WARNING), at the default INFO level, at DEBUG with sampled per-line
+output, and at DEBUG logging every line, the last with and without the background queue writer.
+Log records go to a file in a temp directory, so terminal speed does not count.
+
+Usage:
+    python benchmarks/bench_logging.py --transactions 20000 --repeat 3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.logger import configure_logging
+from src.pipeline import IngestPipeline
+from synthetic import LAYOUTS, write_statement
+
+MODES = [
+    # (name, level, sample every line, queue)
+    ('off', 'WARNING', False, True),
+    ('info', 'INFO', False, True),
+    ('debug sampled', 'DEBUG', False, True),
+    ('debug all', 'DEBUG', True, True),
+    ('debug all, no queue', 'DEBUG', True, False),
+]
+
+
+def ingest(files):
+    # No category cache: every repeat categorizes from scratch, as the first one does
+    pipeline = IngestPipeline(category_cache=None)
+    return sum(len(pipeline.run(path).df) for path in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=20000, help='per statement')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [write_statement(os.path.join(tmp, 'raw'), layout, args.transactions) for layout in LAYOUTS]
+
+        print(f"{len(files)} statements x {args.transactions:,} transactions")
+        print(f"{'logging':>20} {'best s':>8} {'rows':>8} {'log MiB':>8}")
+        for name, level, every_line, use_queue in MODES:
+            log_path = os.path.join(tmp, 'bench.log')
+            best = None
+            for _ in range(args.repeat):
+                with open(log_path, 'w') as stream:
+                    sampling = {'sample_first': 0, 'sample_every': 1} if every_line else {}
+                    configure_logging(level=level, stream=stream, use_queue=use_queue, **sampling)
+                    begin = time.perf_counter()
+                    rows = ingest(files)
+                    seconds = time.perf_counter() - begin
+                    # Stop the writer thread so every queued record is counted in the log size
+                    configure_logging(level='WARNING', use_queue=False)
+                best = seconds if best is None else min(best, seconds)
+            size = os.path.getsize(log_path) / 2**20
+            print(f"{name:>20} {best:>8.2f} {rows:>8,} {size:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
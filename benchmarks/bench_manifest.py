@@ -0,0 +1,74 @@
+"""
+Benchmark: per-save manifest cost as the manifest grows, for the legacy manifest.json (load the
+whole file, append, rewrite it) vs the append-only SQLite manifest (one indexed insert).
+
+Usage:
+    python benchmarks/bench_manifest.py --entries 1000 10000 100000 --saves 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.manifest import Manifest
+
+
+def make_entry(i):
+    return {
+        'filename': f"statement_{i:06d}.pdf.csv", 'source': ['Axis Bank', 'ICICI Bank', 'Amex'][i % 3],
+        'rows': 100 + i % 50, 'amount_sum': 12345.67, 'date_min': '2025-08-01 00:00:00',
+        'date_max': '2025-08-31 00:00:00', 'saved_at': datetime.now().isoformat(),
+        'original_path': f"data/raw/statement_{i:06d}.pdf", 'content_hash': f"{i:064x}",
+    }
+
+
+def legacy_append(path, entry):
+    """What save_to_processed used to do for every save."""
+    manifest = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    manifest.append(entry)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def per_save_ms(fn, start, saves):
+    begin = time.perf_counter()
+    for i in range(start, start + saves):
+        fn(make_entry(i))
+    return (time.perf_counter() - begin) / saves * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--saves', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'entries':>10} {'json ms/save':>13} {'sqlite ms/save':>15} {'lookup ms':>10}")
+    for entries in args.entries:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'legacy', 'manifest.json')
+            os.makedirs(os.path.dirname(json_path))
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump([make_entry(i) for i in range(entries)], f, indent=2)
+            manifest = Manifest(os.path.join(tmp, 'manifest.sqlite'))
+            with manifest._connect() as conn:
+                conn.executemany(manifest._insert_sql(), [manifest._row(make_entry(i)) for i in range(entries)])
+
+            json_ms = per_save_ms(lambda entry: legacy_append(json_path, entry), entries, args.saves)
+            sqlite_ms = per_save_ms(manifest.append, entries, args.saves)
+            begin = time.perf_counter()
+            for i in range(args.saves):
+                assert manifest.find(filename=f"statement_{i * 7:06d}.pdf.csv")
+            lookup_ms = (time.perf_counter() - begin) / args.saves * 1000
+        print(f"{entries:>10,} {json_ms:>13.2f} {sqlite_ms:>15.2f} {lookup_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
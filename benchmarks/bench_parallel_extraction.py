@@ -0,0 +1,43 @@
+"""
+Benchmark serial vs page-sharded PDF extraction across page counts.
+
+Usage:
+    python benchmarks/bench_parallel_extraction.py --pages 10 50 200 --workers 4
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.extract_utils import _extract_page_range, extract_pdf_pages_parallel
+from synthetic import LINES_PER_PAGE, write_statement
+
+
+def time_call(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"workers={args.workers} cpus={os.cpu_count()}")
+    print(f"{'pages':>6} {'serial_s':>10} {'parallel_s':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for page_count in args.pages:
+            # One Axis transaction per line, LINES_PER_PAGE lines per page
+            pdf_path = write_statement(tmp_dir, 'axis', page_count * LINES_PER_PAGE, fmt='pdf')
+            serial_s, serial_pages = time_call(_extract_page_range, pdf_path)
+            parallel_s, parallel_pages = time_call(extract_pdf_pages_parallel, pdf_path, args.workers)
+            assert serial_pages == parallel_pages, "parallel extraction changed the page text or order"
+            print(f"{page_count:>6} {serial_s:>10.3f} {parallel_s:>11.3f} {serial_s / parallel_s:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: ingesting a directory of statement PDFs (detect -> extract -> parse -> categorize ->
+standardize) one after another vs fanned out to a process pool, as run_parser --combined --jobs N
+does. Each run starts with an empty extraction cache and no category cache, so every file pays for
+its pdfplumber pass and its categorization.
+
+Usage:
+    python benchmarks/bench_parallel_ingest.py --files 16 --pages 5 --jobs 1 2 4
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import src.extract_utils as extract_utils
+from src.pipeline import IngestPipeline
+from synthetic import LINES_PER_PAGE, write_statement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=16)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Axis statements of args.pages pages each, one folder per file (and a seed, so no two are equal)
+        files = [write_statement(os.path.join(tmp, 'raw', f"{i:03d}"), 'axis', args.pages * LINES_PER_PAGE, fmt='pdf', seed=i)
+                 for i in range(args.files)]
+
+        print(f"{args.files} files x {args.pages} pages, {os.cpu_count()} CPUs")
+        print(f"{'jobs':>5} {'seconds':>9} {'rows':>8} {'speedup':>8}")
+        baseline = None
+        for jobs in args.jobs:
+            # Cold cache per run; forked workers inherit it
+            extract_utils._cache = extract_utils.ExtractionCache(cache_dir=os.path.join(tmp, f'cache_{jobs}'))
+            begin = time.perf_counter()
+            outcomes = IngestPipeline(processed_dir=os.path.join(tmp, 'processed'), category_cache=None).run_many(files, jobs=jobs)
+            seconds = time.perf_counter() - begin
+            assert all(outcome.error is None for outcome in outcomes)
+            rows = sum(len(outcome.result.df) for outcome in outcomes)
+            baseline = baseline or seconds
+            print(f"{jobs:>5} {seconds:>9.2f} {rows:>8,} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
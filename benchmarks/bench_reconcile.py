@@ -0,0 +1,65 @@
+"""
+Benchmark: transfer reconciliation (as-of merge per receiving account over date-sorted legs) on
+combined bank + card ledgers with a known number of planted card bill payments.
+
+Usage:
+    python benchmarks/bench_reconcile.py --rows 100000 300000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.reconcile import match_transfers
+
+ACCOUNTS = {'icici': 'BankAccount', 'axis': 'BankAccount', 'amex': 'CreditCard', 'icici_cc': 'CreditCard'}
+DESCRIPTIONS = np.array(['UPI/ZOMATO', 'POS AMAZON', 'NEFT/SALARY', 'SWIGGY', 'IMPS/RENT', 'UBER TRIP'], dtype=object)
+
+
+def make_ledger(rows, payments, days=5 * 365, seed=7):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01')
+    sources = np.array(list(ACCOUNTS), dtype=object)
+    source = sources[rng.integers(0, len(sources), rows)]
+    ledger = pd.DataFrame({
+        'date': start + rng.integers(0, days, rows).astype('timedelta64[D]'),
+        'description': DESCRIPTIONS[rng.integers(0, len(DESCRIPTIONS), rows)],
+        'amount': np.round(rng.gamma(2.0, 900.0, rows), 2),
+        'type': np.where(rng.random(rows) < 0.3, 'Credit', 'Debit'),
+        'source': source,
+    })
+    # Card bill payments: a bank debit and a card credit of the same (distinctive) amount, 0-2 days apart
+    paid_on = start + rng.integers(0, days, payments).astype('timedelta64[D]')
+    amounts = np.round(rng.uniform(20000, 200000, payments), 2)
+    bank = np.where(rng.random(payments) < 0.5, 'icici', 'axis')
+    card = np.where(rng.random(payments) < 0.5, 'amex', 'icici_cc')
+    ledger = pd.concat([ledger, pd.DataFrame({'date': paid_on, 'description': 'NEFT/CC PAYMENT', 'amount': amounts,
+                                              'type': 'Debit', 'source': bank}),
+                        pd.DataFrame({'date': paid_on + rng.integers(0, 3, payments).astype('timedelta64[D]'),
+                                      'description': 'PAYMENT RECEIVED. THANK YOU', 'amount': -amounts,
+                                      'type': 'Credit', 'source': card})], ignore_index=True)
+    ledger['AccountType'] = ledger['source'].map(ACCOUNTS)
+    return ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 300000, 1000000])
+    parser.add_argument('--payments', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>12} {'pairs':>7}")
+    for rows in args.rows:
+        ledger = make_ledger(rows, args.payments)
+        start = time.perf_counter()
+        pairs = match_transfers(ledger)
+        seconds = time.perf_counter() - start
+        print(f"{len(ledger):>10,} {seconds:>9.3f} {len(ledger) / seconds:>12,.0f} {len(pairs):>7,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: recurring-payment detection (one sort by merchant and date, numpy group reductions)
+on a synthetic multi-year ledger mixing subscriptions with irregular spending.
+
+Usage:
+    python benchmarks/bench_recurring.py --rows 100000 1000000 5000000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.recurring import detect_recurring
+
+
+def _names(prefix, count, suffix):
+    # Merchant names must differ in letters: digits are stripped when merchants are normalized
+    return np.array([f"{prefix}{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676 % 26)}{suffix}" for i in range(count)])
+
+
+def make_ledger(rows, years=5, subscriptions=200, seed=7):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01')
+    frames = []
+    # Monthly subscriptions with a fixed amount and a day or two of jitter
+    months = 12 * years
+    sub_ids = np.repeat(np.arange(subscriptions), months)
+    month_index = np.tile(np.arange(months), subscriptions)
+    frames.append(pd.DataFrame({
+        'date': (start.astype('datetime64[M]') + month_index).astype('datetime64[D]') + (sub_ids % 27) + rng.integers(0, 2, len(sub_ids)),
+        'description': _names('UPI/', subscriptions, '/PAYMENT')[sub_ids],
+        'amount': 99.0 + (sub_ids * 7 % 900),
+    }))
+    rest = max(rows - len(sub_ids), 0)
+    merchants = _names('POS SHOP ', 20000, ' MUMBAI')
+    frames.append(pd.DataFrame({
+        'date': start + rng.integers(0, 365 * years, rest).astype('timedelta64[D]'),
+        'description': merchants[rng.integers(0, len(merchants), rest)],
+        'amount': np.round(rng.gamma(2.0, 400.0, rest), 2),
+    }))
+    df = pd.concat(frames, ignore_index=True)
+    df['type'] = 'Debit'
+    df['category'] = 'Other'
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 5000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>12} {'recurring':>10}")
+    for rows in args.rows:
+        df = make_ledger(rows)
+        start = time.perf_counter()
+        found = detect_recurring(df)
+        seconds = time.perf_counter() - start
+        print(f"{len(df):>10,} {seconds:>9.3f} {len(df) / seconds:>12,.0f} {len(found):>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: reading a slice of the history (a date range for one source, a category over all time)
+from the partitioned transaction store vs reading and concatenating every processed CSV and
+filtering in pandas.
+
+Usage:
+    python benchmarks/bench_store.py --years 5 --rows-per-statement 5000
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.store import TransactionStore
+from src.schema import enforce_schema
+
+CATEGORIES = ['Food', 'Travel', 'Shopping', 'Fuel', 'Entertainment', 'Payment', 'Utilities', 'Health', 'Other']
+SOURCES = {'Axis Bank': 'BankAccount', 'ICICI Bank': 'BankAccount', 'Amex': 'CreditCard', 'ICICI Credit Card': 'CreditCard'}
+
+
+def make_statement(month, source, rows, rng):
+    start = np.datetime64(month.to_timestamp(), 'D')
+    amounts = np.round(rng.gamma(2.0, 900.0, rows), 2)
+    return enforce_schema(pd.DataFrame({
+        'date': start + rng.integers(0, 28, rows).astype('timedelta64[D]'),
+        'description': [f"MERCHANT {i}" for i in rng.integers(0, 500, rows)],
+        'amount': amounts,
+        'AmountValue': amounts,
+        'type': np.where(rng.random(rows) < 0.2, 'Credit', 'Debit'),
+        'category': np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)],
+        'AccountType': SOURCES[source],
+        'source': source,
+    }))
+
+
+def read_flat(directory, start, end, sources=None, categories=None):
+    """The pre-store way: load every processed file, then filter."""
+    df = enforce_schema(pd.concat([pd.read_csv(path) for path in sorted(glob.glob(os.path.join(directory, '*.csv')))],
+                                  ignore_index=True))
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['date'] <= pd.Timestamp(end)
+    if sources is not None:
+        mask &= df['source'].isin(sources)
+    if categories is not None:
+        mask &= df['category'].isin(categories)
+    return df[mask]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--rows-per-statement', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    months = pd.period_range('2020-01', periods=12 * args.years, freq='M')
+    queries = {
+        'one month, one source': dict(start=str(months[-1].start_time.date()), end=str(months[-1].end_time.date()), sources=['Amex']),
+        'one quarter, all sources': dict(start=str(months[-3].start_time.date()), end=str(months[-1].end_time.date())),
+        'one category, all time': dict(start=None, end=None, categories=['Fuel']),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TransactionStore(os.path.join(tmp, 'transactions'))
+        rows = 0
+        for month in months:
+            for source in SOURCES:
+                statement = make_statement(month, source, args.rows_per_statement, rng)
+                key = f"{source.lower().replace(' ', '_')}_{month}"
+                statement.to_csv(os.path.join(tmp, f"{key}.csv"), index=False)
+                store.write(statement, key)
+                rows += len(statement)
+        print(f"{len(months) * len(SOURCES):,} statements, {rows:,} rows")
+        print(f"{'query':<26} {'flat CSVs s':>12} {'store s':>9} {'rows':>9} {'speedup':>8}")
+        for label, query in queries.items():
+            flat_s, expected = timed(read_flat, tmp, **query)
+            store_s, got = timed(store.read, **query)
+            assert len(expected) == len(got)
+            print(f"{label:<26} {flat_s:>12.3f} {store_s:>9.3f} {len(got):>9,} {flat_s / store_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
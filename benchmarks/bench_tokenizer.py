@@ -0,0 +1,160 @@
+"""
+Micro-benchmark: lines per second per bank format, legacy per-line matching vs the shared tokenizer.
+
+Usage:
+    python benchmarks/bench_tokenizer.py --transactions 20000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from src.parsers.tokenizer import (
+    AMEX_DATE, DATE_DMY, iter_blocks, iter_icici_cc_transactions, iter_matching_lines,
+    tokenize_amex_line, tokenize_bank_line,
+)
+from synthetic import LINES_PER_PAGE, statement_lines
+
+
+# --- Legacy per-line implementations (before the shared tokenizer) ---
+def legacy_bank_entry(entry, deposit_first):
+    parts = entry.split()
+    date_match = re.match(r'^(\d{2}-\d{2}-\d{4})', entry)
+    if not date_match:
+        return []
+    amounts = []
+    for part in parts:
+        clean_part = part.replace(',', '')
+        if re.match(r'^\d+\.?\d*$', clean_part):
+            amounts.append(float(clean_part))
+    desc_parts = []
+    for part in parts[1:]:
+        if not re.match(r'^\d{1,3}(?:,\d{3})*\.?\d*$', part.replace(',', '')):
+            desc_parts.append(part)
+        else:
+            break
+    return [(date_match.group(1), ' '.join(desc_parts), amounts, deposit_first)]
+
+
+def legacy_axis(lines):
+    out = []
+    for line in lines:
+        line = line.strip()
+        if re.match(r'^(\d{2}-\d{2}-\d{4})', line):
+            out.extend(legacy_bank_entry(line, False))
+    return out
+
+
+def legacy_icici_savings(lines):
+    blocks, block = [], []
+    for line in (l.strip() for l in lines if l.strip()):
+        if re.match(r'^\d{2}-\d{2}-\d{4}', line):
+            if block:
+                blocks.append(' '.join(block))
+            block = [line]
+        elif block:
+            block.append(line)
+    if block:
+        blocks.append(' '.join(block))
+    out = []
+    for entry in blocks:
+        out.extend(legacy_bank_entry(entry, True))
+    return out
+
+
+def legacy_icici_cc(lines):
+    lines = [line.strip() for line in lines if line.strip()]
+    out = []
+    i = 0
+    while i < len(lines):
+        tx_match = re.match(r'^(\d{2}-\d{2}-\d{4})\s+(.+?)\s+(\d+[,.]*\d*)\s*(Dr\.|Cr\.)\s*(\d{8,})$', lines[i])
+        if tx_match:
+            desc_lines = [tx_match.group(2)]
+            j = i + 1
+            while j < len(lines) and not re.match(r'^(\d{2}-\d{2}-\d{2,4})', lines[j]):
+                desc_lines.append(lines[j])
+                j += 1
+            out.append((tx_match.group(1), ' '.join(desc_lines), tx_match.group(3), tx_match.group(4)))
+            i = j
+        else:
+            i += 1
+    return out
+
+
+def legacy_amex(lines):
+    import pandas as pd
+    out = []
+    for line in lines:
+        line = line.strip()
+        date_match = re.match(r'^([A-Za-z]+) (\d{1,2})', line)
+        if date_match:
+            try:
+                month_num = pd.to_datetime(date_match.group(1), format='%B').month
+            except Exception:
+                month_num = 8
+            if len(line.split()) >= 3:
+                amount_match = re.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*(Cr\.?)?$', line)
+                if amount_match:
+                    out.append((month_num, date_match.group(2), amount_match.group(1)))
+    return out
+
+
+# --- Shared tokenizer over page buffers (after) ---
+def paged(lines):
+    return ['\n'.join(lines[i:i + LINES_PER_PAGE]) + '\n' for i in range(0, len(lines), LINES_PER_PAGE)]
+
+
+def tokenizer_axis(pages):
+    return [tokenize_bank_line(line) for line in iter_matching_lines(pages, DATE_DMY)]
+
+
+def tokenizer_icici_savings(pages):
+    return [tokenize_bank_line(' '.join(block)) for block in iter_blocks(pages, DATE_DMY)]
+
+
+def tokenizer_icici_cc(pages):
+    return [
+        (tokens.date, ' '.join([tokens.description] + continuation), tokens.amounts, tokens.flag)
+        for tokens, _, continuation in iter_icici_cc_transactions(pages)
+    ]
+
+
+def tokenizer_amex(pages):
+    return [tokens for tokens in map(tokenize_amex_line, iter_matching_lines(pages, AMEX_DATE)) if tokens]
+
+
+# Layouts as named in synthetic.LAYOUTS
+FORMATS = [
+    ('axis', legacy_axis, tokenizer_axis),
+    ('icici_savings', legacy_icici_savings, tokenizer_icici_savings),
+    ('icici_credit_card', legacy_icici_cc, tokenizer_icici_cc),
+    ('amex', legacy_amex, tokenizer_amex),
+]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'format':<18} {'lines':>8} {'before lines/s':>15} {'after lines/s':>14} {'speedup':>8}")
+    for name, legacy_fn, tokenizer_fn in FORMATS:
+        lines = list(statement_lines(name, args.transactions, args.seed))
+        pages = paged(lines)
+        before_s, before = timed(legacy_fn, lines)
+        after_s, after = timed(tokenizer_fn, pages)
+        assert len(before) == len(after), f"{name}: tokenizer found {len(after)} entries, legacy found {len(before)}"
+        print(f"{name:<18} {len(lines):>8} {len(lines) / before_s:>15,.0f} {len(lines) / after_s:>14,.0f} {before_s / after_s:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
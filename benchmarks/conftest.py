@@ -0,0 +1,104 @@
+"""
+Options and result collection for the opt-in pytest benchmarks in this directory:
+
+    pytest benchmarks --benchmark --bench-sizes 100 10000 1000000 --bench-save-baseline
+
+Without --benchmark every benchmark is skipped, so a plain `pytest` run is unaffected. Results
+go to benchmarks/results/latest.json and a table in the terminal summary; --bench-save-baseline
+merges them into benchmarks/baselines/ingest.json, which later runs are checked against.
+"""
+import os
+import sys
+import json
+import platform
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(BENCH_DIR, os.pardir)))
+sys.path.append(BENCH_DIR)
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baselines', 'ingest.json')
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'ingest benchmarks (benchmarks/)')
+    group.addoption('--benchmark', action='store_true', help='Run the benchmarks in benchmarks/')
+    group.addoption('--bench-sizes', type=int, nargs='+', default=[100, 10000],
+                    help='Transactions per synthetic statement (default: 100 10000)')
+    group.addoption('--bench-pdf-max', type=int, default=1000,
+                    help='Largest size also generated as a PDF for the extraction benchmark (pdfplumber reads ~10 pages/s)')
+    group.addoption('--bench-repeat', type=int, default=1, help='Timed runs per stage (the fastest counts)')
+    group.addoption('--bench-baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    group.addoption('--bench-save-baseline', action='store_true', help='Merge this run into the baseline JSON')
+    group.addoption('--bench-tolerance', type=float, default=0.3,
+                    help='Allowed throughput drop / peak memory growth vs the baseline (fraction)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: opt-in performance benchmark (run with --benchmark)')
+    config._bench_results = {}
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        metafunc.parametrize('size', metafunc.config.getoption('--bench-sizes', default=[100, 10000]))
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark', default=False):
+        return
+    skip = pytest.mark.skip(reason='benchmarks run with: pytest benchmarks --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope='session')
+def bench_baseline(request):
+    return _load(request.config.getoption('--bench-baseline')).get('results', {})
+
+
+@pytest.fixture(scope='session')
+def bench_results(request):
+    return request.config._bench_results
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    results = getattr(config, '_bench_results', None)
+    if not results:
+        return
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()}
+    _write(DEFAULT_RESULTS, {'meta': meta, 'results': results})
+    if config.getoption('--bench-save-baseline'):
+        path = config.getoption('--bench-baseline')
+        baseline = _load(path)
+        baseline.setdefault('results', {}).update(results)
+        baseline['meta'] = meta
+        _write(path, baseline)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, '_bench_results', None)
+    if not results:
+        return
+    terminalreporter.section('ingest benchmarks')
+    terminalreporter.write_line(f"{'stage/layout/size':<42} {'rows/s':>12} {'seconds':>9} {'peak MiB':>9}")
+    for key, entry in sorted(results.items()):
+        terminalreporter.write_line(f"{key:<42} {entry['rows_per_s']:>12,.0f} {entry['seconds']:>9.3f} {entry['peak_mib']:>9.1f}")
+    terminalreporter.write_line(f"Saved {DEFAULT_RESULTS}")
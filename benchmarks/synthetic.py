@@ -0,0 +1,161 @@
+"""
+Deterministic synthetic statements in every supported layout (ICICI credit card, ICICI savings,
+Axis, Amex), as text files or PDFs, for benchmarks and load tests.
+
+statement_lines(layout, count, seed) yields the text lines of a statement holding exactly count
+transactions (each parses to one row), spread over one calendar year. write_statement() places
+the file under <root>/<bank>/<type>/ so src.parser.detect_parser routes it by its folders, and
+writes PDFs directly (one Courier text object per line, no third-party writer), so a 1M-row
+statement can be generated in seconds and pdfplumber reads the text back unchanged.
+
+Usage:
+    python benchmarks/synthetic.py data/synthetic --transactions 100 10000 1000000 --fmt txt pdf
+"""
+import os
+import sys
+import zlib
+import random
+import argparse
+from datetime import date, timedelta
+
+LAYOUTS = ['icici_credit_card', 'icici_savings', 'axis', 'amex']
+# Folder (and file name) each layout is detected from
+LAYOUT_PATHS = {
+    'icici_credit_card': ('icici', 'credit_card', 'icici_credit_card_statement'),
+    'icici_savings': ('icici', 'bank', 'icici_statement'),
+    'axis': ('axis', 'bank', 'axis_statement'),
+    'amex': ('amex', 'credit_card', 'amex_statement'),
+}
+YEAR = 2024
+MERCHANTS = ['ZOMATO LTD', 'UBER INDIA', 'AMAZON PAY', 'SWIGGY', 'BOOKMYSHOW', 'SHOPPERS STOP', 'C N PETROLEUM',
+             'IRCTC', 'NETFLIX', 'APOLLO PHARMACY', 'BIG BAZAAR', 'AIRTEL', 'TATA POWER', 'HDFC LIFE']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+               'November', 'December']
+LINES_PER_PAGE = 50
+
+
+def _dates(count):
+    """count dates spread evenly over YEAR, in order."""
+    start = date(YEAR, 1, 1)
+    for i in range(count):
+        yield start + timedelta(days=i * 365 // max(count, 1))
+
+
+def _amount(rng):
+    # Below 1,000 so the amount token ends the description (see src.parsers.tokenizer)
+    return f"{rng.randint(1, 999)}.{rng.randint(0, 99):02d}"
+
+
+def statement_lines(layout, count, seed=0):
+    """Yield the lines of a layout statement with count transactions; same seed, same lines."""
+    rng = random.Random(f"{layout}-{count}-{seed}")
+    if layout == 'amex':
+        yield f"American Express statement {YEAR}"
+    for i, day in enumerate(_dates(count)):
+        merchant = rng.choice(MERCHANTS)
+        amount = _amount(rng)
+        balance = f"{rng.randint(10, 99)},{rng.randint(100, 999)}.{rng.randint(0, 99):02d}"
+        credit = rng.random() < 0.2
+        dmy = day.strftime('%d-%m-%Y')
+        if layout == 'axis':
+            amounts = f"{amount} {balance}" if credit else f"{amount} 0.00 {balance}"
+            yield f"{dmy} UPI/P2M/{rng.randint(10**11, 10**12)}/{merchant} {amounts}"
+        elif layout == 'icici_savings':
+            yield f"{dmy} UPI/{merchant}/{rng.randint(10**11, 10**12)}/"
+            amounts = f"{amount} {balance}" if credit else f"0.00 {amount} {balance}"
+            yield f"Payment fr {amounts}"
+        elif layout == 'icici_credit_card':
+            flag = 'Cr.' if credit else 'Dr.'
+            yield f"{dmy} {merchant} {amount} {flag} {rng.randint(10**10, 10**11)}"
+            yield "MUMBAI IN"
+        elif layout == 'amex':
+            suffix = ' Cr' if credit else ''
+            yield f"{MONTH_NAMES[day.month - 1]} {day.day} {merchant} MUMBAI {amount}{suffix}"
+        else:
+            raise ValueError(f"Unknown layout: {layout}")
+
+
+def statement_path(root, layout, count, fmt='txt'):
+    bank, kind, stem = LAYOUT_PATHS[layout]
+    # Amex parsers take the statement year from the file name
+    return os.path.join(root, bank, kind, f"{stem}_{YEAR}_{count}.{fmt}")
+
+
+def write_statement(root, layout, count, fmt='txt', seed=0):
+    """Write a layout statement with count transactions under root as .txt or .pdf; returns its path."""
+    path = statement_path(root, layout, count, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = statement_lines(layout, count, seed)
+    if fmt == 'pdf':
+        write_pdf(path, lines)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + '\n')
+    return path
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, lines, lines_per_page=LINES_PER_PAGE):
+    """
+    Write lines as an A4 PDF, lines_per_page per page, in the built-in Courier font. Objects:
+    1 catalog, 2 page tree, 3 font, then a (page, content stream) pair per page.
+    """
+    offsets = []
+    page_ids = []
+
+    with open(path, 'wb') as f:
+        def add(obj_id, body):
+            offsets.append((obj_id, f.tell()))
+            f.write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        add(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        page, next_id = [], 4
+
+        def flush(page, next_id):
+            ops = ["BT /F1 9 Tf 11 TL 36 806 Td"] + [f"({_pdf_escape(line)}) Tj T*" for line in page] + ["ET"]
+            stream = zlib.compress('\n'.join(ops).encode('latin-1', 'replace'))
+            add(next_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                + f"/Contents {next_id + 1} 0 R >>".encode())
+            add(next_id + 1, f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream")
+            page_ids.append(next_id)
+            return next_id + 2
+
+        for line in lines:
+            page.append(line)
+            if len(page) == lines_per_page:
+                next_id, page = flush(page, next_id), []
+        if page or not page_ids:
+            next_id = flush(page, next_id)
+        kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+        add(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+        add(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref = f.tell()
+        positions = dict(offsets)
+        f.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, next_id):
+            f.write(f"{positions[obj_id]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root', help='Directory to write statements under')
+    parser.add_argument('--transactions', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument('--fmt', nargs='+', choices=['txt', 'pdf'], default=['txt', 'pdf'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for count in args.transactions:
+        for layout in args.layouts:
+            for fmt in args.fmt:
+                print(write_statement(args.root, layout, count, fmt, args.seed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
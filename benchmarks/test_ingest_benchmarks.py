@@ -0,0 +1,110 @@
+"""
+End-to-end ingest benchmarks over synthetic statements (benchmarks/synthetic.py), one test per
+layout and size: extraction (PDF -> page text, no cache), parsing, categorization,
+standardization, analysis and persistence. Each stage records rows per second (fastest of
+--bench-repeat runs) and peak traced memory (a separate run under tracemalloc, which sees Python
+and numpy allocations but not Arrow's). Entries that exist in the baseline must stay within
+--bench-tolerance; stages faster than MIN_COMPARED_SECONDS are too noisy to compare on time.
+Everything is offline: the statements are generated into pytest's tmp directory.
+"""
+import gc
+import time
+import logging
+import tracemalloc
+
+import pytest
+
+from synthetic import LAYOUTS, write_statement
+from src.analyzer import analyze_finances
+from src.categorizer import categorize_transactions
+from src.extract_utils import iter_pdf_pages
+from src.io_utils import save_to_processed
+from src.parser import detect_parser
+from src.standardizer import standardize_transactions
+
+pytestmark = pytest.mark.benchmark
+
+MIN_COMPARED_SECONDS = 0.05
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def measure(func, repeat=1):
+    """(fastest seconds, peak MiB under tracemalloc, result) of func()."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20, result
+
+
+def check(key, rows, seconds, peak_mib, results, baseline, tolerance):
+    entry = {'rows': rows, 'seconds': round(seconds, 6), 'rows_per_s': round(rows / seconds, 1) if seconds else None,
+             'peak_mib': round(peak_mib, 2)}
+    results[key] = entry
+    expected = baseline.get(key)
+    if expected is None:
+        return
+    assert rows == expected['rows'], f"{key}: {rows} rows, baseline had {expected['rows']}"
+    if expected['seconds'] >= MIN_COMPARED_SECONDS:
+        floor = expected['rows_per_s'] * (1 - tolerance)
+        assert entry['rows_per_s'] >= floor, f"{key}: {entry['rows_per_s']:,.0f} rows/s, baseline {expected['rows_per_s']:,.0f}"
+    ceiling = expected['peak_mib'] * (1 + tolerance) + 1
+    assert entry['peak_mib'] <= ceiling, f"{key}: peak {entry['peak_mib']:.1f} MiB, baseline {expected['peak_mib']:.1f} MiB"
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_ingest_stages(layout, size, tmp_path_factory, request, bench_results, bench_baseline):
+    options = request.config.getoption
+    repeat, tolerance = options('--bench-repeat'), options('--bench-tolerance')
+    root = str(tmp_path_factory.mktemp(f"{layout}_{size}"))
+
+    def record(stage, rows, seconds, peak_mib):
+        check(f"{stage}/{layout}/{size}", rows, seconds, peak_mib, bench_results, bench_baseline, tolerance)
+
+    if size <= options('--bench-pdf-max'):
+        pdf_path = write_statement(root, layout, size, fmt='pdf')
+        seconds, peak, pages = measure(lambda: list(iter_pdf_pages(pdf_path, use_cache=False, workers=1)), repeat)
+        assert sum(page.count('\n') for page in pages) > 0
+        record('extraction', size, seconds, peak)
+
+    text_path = write_statement(root, layout, size, fmt='txt')
+    bank_key, parser_cls = detect_parser(text_path)
+    seconds, peak, parsed = measure(lambda: parser_cls(text_path).read_frame(), repeat)
+    assert len(parsed) == size
+    record('parsing', size, seconds, peak)
+
+    # The persistent category memo is left out so repeated runs measure the same work
+    seconds, peak, categorized = measure(lambda: categorize_transactions(parsed.copy(), cache=None), repeat)
+    record('categorization', size, seconds, peak)
+
+    metadata = parser_cls(text_path).statement_metadata() or {'source': bank_key, 'is_credit_card': 'credit_card' in bank_key}
+    seconds, peak, standardized = measure(lambda: standardize_transactions(categorized.copy(), metadata), repeat)
+    assert standardized['date'].notna().all()
+    record('standardization', size, seconds, peak)
+
+    seconds, peak, summary = measure(lambda: analyze_finances(standardized, save_plots=False, name=layout), repeat)
+    assert summary
+    record('analysis', size, seconds, peak)
+
+    processed_dir = tmp_path_factory.mktemp(f"processed_{layout}_{size}")
+    seconds, peak, path = measure(lambda: save_to_processed(standardized, metadata['source'], f"{layout}_{size}.txt",
+                                                            processed_dir=str(processed_dir)), repeat)
+    record('persistence', size, seconds, peak)
@@ -0,0 +1,311 @@
+"""
+Persisted running aggregates for incremental analysis, stored in SQLite.
+
+The store is a materialized cube: for every account (AccountType) x month x category x source
+x direction cell it keeps the amount sum, row count, min and max, plus per-(description, category)
+counts of bank outflows (for recurring payments). The ingest pipeline merges each persisted
+statement into it (next to the processed data), aggregating only that statement's rows.
+Summaries (analyzer.summarize_aggregates) and dashboard queries (AggregateStore.query /
+analyzer.query_cube) are answered from the cube alone, so their cost does not grow with the
+length of the history.
+
+Cells are kept per statement: merging a statement again under the same key (a corrected
+statement saved from the same input) replaces its earlier contribution, and a frame whose content
+was merged before is skipped. Each transaction_id is counted for one statement that contains it
+(the first one merged), so rows shared by overlapping statements are counted once. Every
+statement's rows are kept (the columns the cube is built from), so when a replaced statement no
+longer contains a row it counted, the row passes to another statement that has it and that
+statement's cells are rebuilt. Every merge runs in one BEGIN IMMEDIATE transaction, so concurrent
+writers (the CLI and a Streamlit session) are serialized and cannot lose each other's merges.
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from src.logger import get_logger
+from src.schema import frame_fingerprint, transaction_ids
+from src.analyzer import aggregate_transactions, exclude_transfers, query_cube, recurring_counts, summarize_aggregates, transaction_direction
+
+DEFAULT_STATE_PATH = os.path.join('data', 'processed', 'aggregates.sqlite')
+CUBE_LEVELS = ['account', 'month', 'category', 'source', 'direction']
+CUBE_STATS = ('sum', 'size', 'min', 'max')
+# Columns of a statement's rows the cube and the recurring counts are built from
+ROW_COLUMNS = ['date', 'description', 'amount', 'type', 'category', 'source', 'AccountType', 'is_internal_transfer']
+# Stay well below SQLite's bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+def _none_if_missing(value):
+    return None if pd.isna(value) else value
+
+
+def _sql_value(value):
+    value = _none_if_missing(value)
+    # numpy scalars (month keys, counts) are not SQLite types
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _batches(values):
+    for start in range(0, len(values), _LOOKUP_BATCH):
+        batch = values[start:start + _LOOKUP_BATCH]
+        yield batch, ','.join('?' * len(batch))
+
+
+def _stored_rows(df, ids):
+    """The ROW_COLUMNS of df as SQLite rows (tuples), prefixed with the transaction_id."""
+    rows = pd.DataFrame({col: df[col] if col in df.columns else None for col in ROW_COLUMNS}, index=df.index)
+    if 'AccountType' not in df.columns:
+        # Aggregated as bank rows (analyzer.transaction_keys)
+        rows['AccountType'] = 'BankAccount'
+    rows['date'] = pd.to_datetime(rows['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+    rows['is_internal_transfer'] = rows['is_internal_transfer'].astype('boolean').fillna(False).astype(bool)
+    rows.insert(0, 'transaction_id', ids)
+    # Converted a column at a time (as src.ledger does), not a value at a time
+    return list(zip(*(rows[col].astype(object).where(rows[col].notna(), None).tolist() for col in rows.columns)))
+
+
+class AggregateStore:
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.logger = get_logger()
+        self._loaded = False
+        self._prepare()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _prepare(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS statements (statement TEXT PRIMARY KEY, fingerprint TEXT, "
+                         "rows INTEGER, merged_at TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS statements_fingerprint ON statements (fingerprint)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS cells (statement TEXT, {', '.join(CUBE_LEVELS)}, "
+                         f"sum REAL, size INTEGER, min REAL, max REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS recurring (statement TEXT, description, category, count INTEGER)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS statement_rows (statement TEXT, transaction_id TEXT, "
+                         f"{', '.join(ROW_COLUMNS)})")
+            conn.execute("CREATE INDEX IF NOT EXISTS statement_rows_transaction ON statement_rows (transaction_id)")
+            # transaction_id -> statement whose cells count it
+            conn.execute("CREATE TABLE IF NOT EXISTS row_owners (transaction_id TEXT PRIMARY KEY, statement TEXT)")
+            for table in ('cells', 'recurring', 'statement_rows', 'row_owners'):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_statement ON {table} (statement)")
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connect())
+
+    @staticmethod
+    def _insert_sql(table, width):
+        return f"INSERT INTO {table} VALUES ({', '.join('?' * width)})"
+
+    def load(self):
+        """Read the cube, recurring counts and merged statements, summed over every statement."""
+        with self._connect() as conn:
+            cells = pd.read_sql_query(f"SELECT {', '.join(CUBE_LEVELS)}, sum, size, min, max FROM cells ORDER BY rowid", conn)
+            recurring = pd.read_sql_query("SELECT description, category, count FROM recurring ORDER BY rowid", conn)
+            statements = conn.execute("SELECT statement, fingerprint, rows, merged_at FROM statements ORDER BY rowid").fetchall()
+        cells = cells.astype({'month': 'int64', 'sum': float, 'size': 'int64', 'min': float, 'max': float})
+        for level in CUBE_LEVELS:
+            if level != 'month':
+                cells[level] = cells[level].astype(object)
+        self._cube = cells.groupby(CUBE_LEVELS, dropna=False).agg(
+            {'sum': 'sum', 'size': 'sum', 'min': 'min', 'max': 'max'})
+        self._recurring = recurring.astype({'description': object, 'category': object}).groupby(
+            ['description', 'category'], dropna=False)['count'].sum().astype('int64')
+        self._ingested = {statement: {'fingerprint': fingerprint, 'rows': rows, 'merged_at': merged_at}
+                          for statement, fingerprint, rows, merged_at in statements}
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    @property
+    def cube(self):
+        self._ensure_loaded()
+        return self._cube
+
+    @property
+    def recurring(self):
+        self._ensure_loaded()
+        return self._recurring
+
+    @property
+    def ingested(self):
+        """{statement key: {'fingerprint', 'rows', 'merged_at'}} of every merged statement."""
+        self._ensure_loaded()
+        return self._ingested
+
+    def merge(self, df, key=None):
+        """
+        Merge one statement's transactions into the aggregates under key (default: the frame's
+        content fingerprint), replacing whatever was merged under key before. Returns False (and
+        changes nothing) when a frame with the same content was merged before.
+        """
+        fingerprint = frame_fingerprint(df)
+        key = key or fingerprint
+        df = df.reset_index(drop=True)
+        ids = df['transaction_id'] if 'transaction_id' in df.columns else pd.Series(pd.NA, index=df.index)
+        if ids.isna().any():
+            ids = ids.fillna(transaction_ids(df))
+        rows = _stored_rows(df, ids)
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM statements WHERE fingerprint = ?", (fingerprint,)).fetchone() is not None:
+                self.logger.info(f"Aggregates already include {fingerprint[:12]}; skipping merge")
+                return False
+            released = [row[0] for row in conn.execute("SELECT transaction_id FROM row_owners WHERE statement = ?", (key,))]
+            replaced = conn.execute("DELETE FROM statements WHERE statement = ?", (key,)).rowcount
+            for table in ('cells', 'recurring', 'statement_rows', 'row_owners'):
+                conn.execute(f"DELETE FROM {table} WHERE statement = ?", (key,))
+            conn.execute("INSERT INTO statements (statement, fingerprint, rows, merged_at) VALUES (?, ?, ?, ?)",
+                         (key, fingerprint, 0, datetime.now().isoformat()))
+            conn.executemany(self._insert_sql('statement_rows', 2 + len(ROW_COLUMNS)), ((key,) + row for row in rows))
+            # Rows an overlapping statement already counts are not counted again
+            conn.execute("INSERT OR IGNORE INTO row_owners (transaction_id, statement) "
+                         "SELECT transaction_id, statement FROM statement_rows WHERE statement = ?", (key,))
+            # Rows only the replaced version had pass to the earliest other statement that contains them
+            recount = {key}
+            for batch, marks in _batches(released):
+                conn.execute("INSERT OR IGNORE INTO row_owners (transaction_id, statement) SELECT transaction_id, statement "
+                             f"FROM statement_rows WHERE transaction_id IN ({marks}) ORDER BY rowid", batch)
+                recount.update(row[0] for row in conn.execute(
+                    f"SELECT DISTINCT statement FROM row_owners WHERE transaction_id IN ({marks})", batch))
+            for statement in recount:
+                self._count_statement(conn, statement)
+        if replaced:
+            self.logger.info(f"Replaced the aggregates of {key}")
+        self._loaded = False
+        return True
+
+    def _count_statement(self, conn, statement):
+        """(Re)build a statement's cells and recurring counts from the stored rows it counts."""
+        cursor = conn.execute(f"SELECT {', '.join('r.' + col for col in ROW_COLUMNS)} FROM statement_rows r "
+                              "JOIN row_owners o ON o.transaction_id = r.transaction_id AND o.statement = r.statement "
+                              "WHERE r.statement = ? ORDER BY r.rowid", (statement,))
+        df = pd.DataFrame(cursor.fetchall(), columns=ROW_COLUMNS).astype({'amount': float, 'is_internal_transfer': bool})
+        df['date'] = pd.to_datetime(df['date'])
+        df = exclude_transfers(df)
+        direction = transaction_direction(df['type'])
+        cube = aggregate_transactions(df, direction, funcs=CUBE_STATS, by=CUBE_LEVELS)
+        for table in ('cells', 'recurring'):
+            conn.execute(f"DELETE FROM {table} WHERE statement = ?", (statement,))
+        conn.executemany(self._insert_sql('cells', 1 + len(CUBE_LEVELS) + len(CUBE_STATS)),
+                         ([statement] + [_sql_value(v) for v in cell] + [float(row.sum), int(row.size), float(row.min), float(row.max)]
+                          for cell, row in zip(cube.index, cube.itertuples(index=False))))
+        counts = recurring_counts(df, direction)
+        conn.executemany(self._insert_sql('recurring', 4),
+                         ([statement, _sql_value(d), _sql_value(c), int(n)] for (d, c), n in counts.items()))
+        conn.execute("UPDATE statements SET rows = ? WHERE statement = ?", (int(len(df)), statement))
+
+    def summary(self, output_dir=None, save_plots=True, name="report"):
+        return summarize_aggregates(self.cube, self.recurring.sort_index(), output_dir=output_dir, save_plots=save_plots, name=name)
+
+    def query(self, by=(), stat='sum', start=None, end=None, **where):
+        """Slice and roll up the cube, e.g. query(by='month', account='BankAccount', direction='out')."""
+        return query_cube(self.cube, by=by, stat=stat, start=start, end=end, **where)
+
+
+class StatementAnalysis:
+    """
+    Analysis of statements that stream past one at a time (e.g. on their way into a combined file).
+    Each added statement is merged into an AggregateStore, the persisted one or, without state_path,
+    a temporary one for this batch alone, and only `columns` of its rows are kept for what the cube
+    cannot answer (dated rows for recurring payments and daily charts). Close it to remove a
+    temporary store.
+    """
+    def __init__(self, state_path=None, columns=('date', 'description', 'amount', 'type', 'category')):
+        self._tmp = None
+        if state_path is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix='analysis-')
+            state_path = os.path.join(self._tmp.name, 'aggregates.sqlite')
+        self.store = AggregateStore(state_path)
+        self.columns = list(columns)
+        self._rows = []
+
+    def add(self, df):
+        if df is None or df.empty:
+            return
+        self.store.merge(df)
+        if self.columns:
+            ids = df['transaction_id'] if 'transaction_id' in df.columns else transaction_ids(df)
+            self._rows.append(df[[col for col in self.columns if col in df.columns]].assign(transaction_id=ids))
+
+    def track(self, frames):
+        """Yield frames unchanged, adding each one on the way (put it in front of another consumer)."""
+        for df in frames:
+            self.add(df)
+            yield df
+
+    def rows(self):
+        """The kept columns of every added row; rows shared by overlapping statements appear once."""
+        if not self._rows:
+            return pd.DataFrame(columns=['transaction_id'] + self.columns)
+        return pd.concat(self._rows, ignore_index=True).drop_duplicates(subset=['transaction_id'], ignore_index=True)
+
+    def summary(self, output_dir=None, save_plots=True, name="report"):
+        return self.store.summary(output_dir=output_dir, save_plots=save_plots, name=name)
+
+    def close(self):
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ImmediateTransaction:
+    # BEGIN IMMEDIATE takes the write lock up front: a second writer waits instead of merging
+    # into a state it read before the first one committed
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.isolation_level = None
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+def get_aggregates_path(processed_dir=None):
+    """`analysis.aggregates_path` from config.yaml, else aggregates.sqlite in the processed data directory."""
+    from src.config_loader import get_config
+    config = get_config() or {}
+    path = ((config.get('analysis') or {}).get('aggregates_path'))
+    if path:
+        return path
+    processed_dir = processed_dir or (config.get('data') or {}).get('processed_dir')
+    return os.path.join(processed_dir, 'aggregates.sqlite') if processed_dir else DEFAULT_STATE_PATH
+
+
+def update_aggregates(df, state_path=None, key=None):
+    """Merge one ingested statement into the persisted cube; returns True when it was new or changed."""
+    return AggregateStore(state_path or get_aggregates_path()).merge(df, key=key)
+
+
+def analyze_incremental(frames, state_path=None, output_dir=None, save_plots=True, name="report"):
+    """
+    Merge one statement frame (or a list of them, one per statement) into the persisted aggregates
+    and return the analyze_finances summary for the whole history, computed from the aggregates alone.
+    """
+    store = AggregateStore(state_path or get_aggregates_path())
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    for df in frames:
+        if df is not None and not df.empty:
+            store.merge(df)
+    return store.summary(output_dir=output_dir, save_plots=save_plots, name=name)
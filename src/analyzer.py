@@ -1,50 +1,217 @@
 
+import math
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+from src.metrics import get_metrics, timed
 
+INCOME_TYPES = ('credit', 'refund/payment', 'in')
+EXPENSE_TYPES = ('debit', 'expense', 'out')
+DIRECTIONS = ['in', 'out', 'other']
+# Levels summarize_aggregates needs; aggregates may carry more (e.g. source) and are summed over them
+CUBE_KEYS = ['account', 'month', 'category', 'direction']
+# Month key for rows without a parseable date (NaT's integer value)
+NO_MONTH = np.iinfo('int64').min
+
+
+def transaction_direction(types):
+    """
+    Normalize transaction types to 'in', 'out' or 'other' (as a Categorical). Only the distinct
+    type labels are lower-cased and classified; rows are mapped through their factorized codes.
+    """
+    codes, uniques = pd.factorize(types)
+    lowered = pd.Index(uniques).astype(str).str.lower()
+    labels = np.where(lowered.isin(INCOME_TYPES), 0, np.where(lowered.isin(EXPENSE_TYPES), 1, 2))
+    direction_codes = np.append(labels, 2)[codes]  # code -1 (missing type) -> 'other'
+    return pd.Categorical.from_codes(direction_codes, categories=DIRECTIONS)
+
+
+def exclude_transfers(df):
+    """df without the rows flagged as internal transfers by src.reconcile (df itself when none are)."""
+    if 'is_internal_transfer' not in df.columns:
+        return df
+    flagged = df['is_internal_transfer'].fillna(False).to_numpy(dtype=bool)
+    return df[~flagged] if flagged.any() else df
+
+
+def month_keys(dates):
+    """Integer month keys (months since 1970-01) for a date column; NO_MONTH where the date is missing."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    return dates.to_numpy().astype('datetime64[M]').view('int64')
+
+
+def _month_index(keys):
+    return pd.PeriodIndex([pd.Period(year=1970 + key // 12, month=key % 12 + 1, freq='M') for key in keys],
+                          freq='M', name='month')
+
+
+def transaction_keys(df, direction=None):
+    """Per-row grouping keys: account (AccountType), month key, category, source and direction."""
+    if direction is None:
+        direction = transaction_direction(df['type'])
+    missing = pd.Series(np.nan, index=df.index, dtype=object)
+    account = df['AccountType'] if 'AccountType' in df.columns else pd.Series('BankAccount', index=df.index)
+    category = df['category'] if 'category' in df.columns else missing
+    source = df['source'] if 'source' in df.columns else missing
+    return {'account': account, 'month': month_keys(df['date']), 'category': category, 'source': source,
+            'direction': direction}
+
+
+def aggregate_transactions(df, direction=None, funcs=('sum', 'size'), by=CUBE_KEYS):
+    """
+    One grouped aggregation of amount (by default sum and row count; any of sum, size, min, max)
+    by the keys in `by` (see transaction_keys; account, month, category and direction by default).
+    Every summary table in analyze_finances is derived from this (small) frame. Each key is
+    factorized once and the codes are combined into a single integer key, so the aggregation itself
+    is a groupby on one int64 column (missing keys are kept, as with groupby(dropna=False)).
+    """
+    all_keys = transaction_keys(df, direction)
+    keys = {key: all_keys[key] for key in by}
+    if df.empty:
+        index = pd.MultiIndex.from_arrays([[]] * len(keys), names=list(keys))
+        return pd.DataFrame({func: pd.Series(dtype='int64' if func == 'size' else float) for func in funcs}, index=index)
+    combined = np.zeros(len(df), dtype='int64')
+    levels = []
+    for values in keys.values():
+        codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+        combined = combined * len(uniques) + codes
+        levels.append(uniques)
+    # Grouping on the single combined key keeps pandas' compensated summation
+    grouped = df['amount'].groupby(combined, sort=False)
+    stats = {func: getattr(grouped, func)() for func in funcs}
+    present = stats[funcs[0]].index.to_numpy()
+    arrays = []
+    for level in reversed(levels):
+        arrays.append(level.take(present % len(level)))
+        present = present // len(level)
+    index = pd.MultiIndex.from_arrays(arrays[::-1], names=list(keys))
+    return pd.DataFrame({func: values.to_numpy() for func, values in stats.items()}, index=index)
+
+
+def query_cube(cube, by=(), stat='sum', start=None, end=None, **where):
+    """
+    Answer a query from an aggregate (aggregate_transactions output or AggregateStore.cube) without
+    touching transaction rows: keep cells matching `where` (level=value, or level=[values]) and the
+    month range [start, end] (anything pd.Period accepts), then total `stat` ('sum' or 'size') over
+    the levels in `by`. Returns a scalar when `by` is empty; a 'month' level comes back as periods
+    (cells without a date are dropped).
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    for level, value in where.items():
+        values = _level(cube, level)
+        mask &= values.isin(value) if isinstance(value, (list, tuple, set)) else values == value
+    by = [by] if isinstance(by, str) else list(by)
+    if start is not None or end is not None or 'month' in by:
+        months = _level(cube, 'month')
+        mask &= months != NO_MONTH
+        if start is not None:
+            mask &= months >= month_keys(pd.Series([pd.Period(start, freq='M').to_timestamp()]))[0]
+        if end is not None:
+            mask &= months <= month_keys(pd.Series([pd.Period(end, freq='M').to_timestamp()]))[0]
+    part = cube[mask]
+    if not by:
+        return _total(part) if stat == 'sum' else part[stat].sum()
+    result = part[stat].groupby(level=by, observed=True).sum().rename('amount' if stat == 'sum' else 'count')
+    if 'month' in by:
+        if len(by) == 1:
+            result.index = _month_index(result.index)
+        else:
+            position = by.index('month')
+            result.index = result.index.set_levels(_month_index(result.index.levels[position]), level='month')
+    return result
+
+
+def _level(cube, name):
+    return cube.index.get_level_values(name)
+
+
+def _total(cube):
+    # Exactly rounded sum of the per-group partial sums, so totals match a direct sum over the rows
+    return np.float64(math.fsum(cube['sum']))
+
+
+def _sum_by(cube, level):
+    """Sum the cube over every level except level; missing keys are dropped, as a plain groupby would."""
+    if cube.empty:
+        return pd.Series(dtype=float)
+    return cube['sum'].groupby(level=level, observed=True).sum().rename('amount')
+
+
+def _monthly_columns(cube, columns):
+    """Per-month sums for the given {column: direction or None (all directions)} over rows with a date."""
+    dated = cube[_level(cube, 'month') != NO_MONTH]
+    months = np.unique(_level(dated, 'month'))
+    out = pd.DataFrame(index=_month_index(months), columns=list(columns), dtype=float)
+    for column, direction in columns.items():
+        part = dated if direction is None else dated[_level(dated, 'direction') == direction]
+        sums = part['sum'].groupby(level='month').sum()
+        out[column] = sums.reindex(months, fill_value=0.0).to_numpy(dtype=float)
+    return out
+
+
+@timed('analyze_seconds')
 def analyze_finances(df, output_dir=None, save_plots=True, name="report"):
 
     # Accept base_name param for output naming
     if name is None:
         name = "report"
 
-    # Use AccountType column to separate
-    bank_df = df[df.get('AccountType', '') == 'BankAccount'] if 'AccountType' in df.columns else df
-    cc_df = df[df.get('AccountType', '') == 'CreditCard'] if 'AccountType' in df.columns else pd.DataFrame()
+    # Both legs of a transfer between the user's own accounts would count as income and expense
+    get_metrics().inc('analyze_rows_total', len(df))
+    df = exclude_transfers(df)
+    # One pass over the rows: direction and month are derived once, then grouped once
+    direction = transaction_direction(df['type'])
+    cube = aggregate_transactions(df, direction)
+    return summarize_aggregates(cube, recurring_counts(df, direction), output_dir=output_dir, save_plots=save_plots, name=name)
+
+
+def recurring_counts(df, direction=None):
+    """Row counts of bank outflows per (description, category); the input for recurring payments."""
+    if direction is None:
+        direction = transaction_direction(df['type'])
+    out_rows = direction == 'out'
+    if 'AccountType' in df.columns:
+        out_rows &= (df['AccountType'] == 'BankAccount').to_numpy()
+    return df.loc[out_rows].groupby(['description', 'category'], observed=True).size()
+
+
+def summarize_aggregates(cube, recurring, output_dir=None, save_plots=True, name="report"):
+    """
+    Build the analyze_finances summary (and optional CSV/PNG outputs) from an aggregate produced by
+    aggregate_transactions and the recurring_counts series, without touching transaction rows.
+    """
+    if name is None:
+        name = "report"
+    # Rows without an AccountType were aggregated as bank rows
+    bank = cube[_level(cube, 'account') == 'BankAccount']
+    cc = cube[_level(cube, 'account') == 'CreditCard']
+    bank_out = bank[_level(bank, 'direction') == 'out']
 
     # --- Bank analysis ---
-    bank_income = bank_df[bank_df['type'].str.lower().isin(['credit', 'refund/payment', 'in'])]['amount'].sum() if not bank_df.empty else 0.0
-    bank_expenses = bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])]['amount'].sum() if not bank_df.empty else 0.0
+    bank_income = _total(bank[_level(bank, 'direction') == 'in']) if not bank.empty else 0.0
+    bank_expenses = _total(bank_out) if not bank.empty else 0.0
     bank_savings = bank_income - bank_expenses
     bank_net_cash_flow = bank_income - bank_expenses
-    # Monthly breakdown
-    if not bank_df.empty:
-        bank_df['month'] = pd.to_datetime(bank_df['date'], errors='coerce').dt.to_period('M')
-        monthly = bank_df.groupby('month').agg({'amount': ['sum'], 'type': lambda x: (x.str.lower() == 'debit').sum()})
+    if not bank.empty:
         # Top 5 spending categories
-        top_categories = bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])].groupby('category')['amount'].sum().sort_values(ascending=False).head(5)
-        # Recurring payments
-        recurring = bank_df[bank_df['type'].str.lower().isin(['debit', 'expense', 'out'])].groupby(['description', 'category']).size()
+        top_categories = _sum_by(bank_out, 'category').sort_values(ascending=False).head(5)
+        # Recurring payments: counted per description, the only table not read off the aggregate
         recurring = recurring[recurring > 2].sort_values(ascending=False)
-        # Monthly trend plot
-        df_monthly = bank_df.copy()
-        df_monthly['income'] = df_monthly['amount'].where(df_monthly['type'].str.lower().isin(['credit', 'refund/payment', 'in']), 0)
-        df_monthly['expense'] = df_monthly['amount'].where(df_monthly['type'].str.lower().isin(['debit', 'expense', 'out']), 0)
-        monthly_trend = df_monthly.groupby('month').agg({'income': 'sum', 'expense': 'sum'})
+        # Monthly trend
+        monthly_trend = _monthly_columns(bank, {'income': 'in', 'expense': 'out'})
     else:
-        monthly = pd.DataFrame()
         top_categories = pd.Series(dtype=float)
         recurring = pd.Series(dtype=int)
         monthly_trend = pd.DataFrame()
 
     # --- Credit Card analysis ---
-    if not cc_df.empty:
-        cc_df['month'] = pd.to_datetime(cc_df['date'], errors='coerce').dt.to_period('M')
-        total_spend_by_category = cc_df.groupby('category')['amount'].sum().sort_values(ascending=False)
-        payments = cc_df[cc_df['type'].str.lower().isin(['credit', 'refund/payment', 'in'])]['amount'].sum()
-        expenses = cc_df[cc_df['type'].str.lower().isin(['debit', 'expense', 'out'])]['amount'].sum()
-        average_monthly_spend = expenses / max(1, len(cc_df['month'].unique()))
+    if not cc.empty:
+        total_spend_by_category = _sum_by(cc, 'category').sort_values(ascending=False)
+        payments = _total(cc[_level(cc, 'direction') == 'in'])
+        expenses = _total(cc[_level(cc, 'direction') == 'out'])
+        average_monthly_spend = expenses / max(1, len(np.unique(_level(cc, 'month'))))
+        cc_monthly = _monthly_columns(cc, {'amount': None})
     else:
         total_spend_by_category = pd.Series(dtype=float)
         payments = 0.0
@@ -59,32 +226,25 @@ def analyze_finances(df, output_dir=None, save_plots=True, name="report"):
             monthly_trend.to_csv(os.path.join(output_dir, f"{name}_bank_monthly.csv"))
         if not top_categories.empty:
             top_categories.to_frame().to_csv(os.path.join(output_dir, f"{name}_bank_top_categories.csv"))
-        if not monthly_trend.empty:
-            plt.figure(figsize=(10,5))
-            plt.plot(monthly_trend.index.astype(str), monthly_trend['income'], label='Income', marker='o')
-            plt.plot(monthly_trend.index.astype(str), monthly_trend['expense'], label='Expense', marker='o')
-            plt.title('Bank Monthly Income vs Expense')
-            plt.xlabel('Month')
-            plt.ylabel('Amount (INR)')
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, f"{name}_bank_monthly_trend.png"))
-            plt.close()
         # Credit card outputs
         if not total_spend_by_category.empty:
             total_spend_by_category.to_frame().to_csv(os.path.join(output_dir, f"{name}_cc_spend_by_category.csv"))
-        if not cc_df.empty:
-            cc_monthly = cc_df.groupby('month').agg({'amount': 'sum'})
+        if not cc.empty:
             cc_monthly.to_csv(os.path.join(output_dir, f"{name}_cc_monthly.csv"))
-            plt.figure(figsize=(10,5))
-            plt.plot(cc_monthly.index.astype(str), cc_monthly['amount'], label='CC Spend', marker='o')
-            plt.title('Credit Card Monthly Spend')
-            plt.xlabel('Month')
-            plt.ylabel('Amount (INR)')
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, f"{name}_cc_monthly_trend.png"))
-            plt.close()
+        if save_plots:
+            # Figures are rendered by the background plot stage (src/plotting.py); unchanged ones are skipped
+            from src.plotting import PlotSpec, line_series, render_plots
+            specs = []
+            if not monthly_trend.empty:
+                specs.append(PlotSpec(os.path.join(output_dir, f"{name}_bank_monthly_trend.png"), 'Bank Monthly Income vs Expense', [
+                    line_series('Income', monthly_trend.index, monthly_trend['income']),
+                    line_series('Expense', monthly_trend.index, monthly_trend['expense']),
+                ]))
+            if not cc.empty:
+                specs.append(PlotSpec(os.path.join(output_dir, f"{name}_cc_monthly_trend.png"), 'Credit Card Monthly Spend', [
+                    line_series('CC Spend', cc_monthly.index, cc_monthly['amount']),
+                ]))
+            render_plots(specs)
 
     # Always return JSON-serializable dict
     def convert_keys_to_str(obj):
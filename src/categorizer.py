@@ -0,0 +1,238 @@
+"""
+Description cleaning and categorization shared by every parser and the ingest pipeline.
+
+Category rules live in an external YAML or CSV rule file (see rules/category_rules.yaml). Each
+rule maps one or more merchant keywords to a category. The keywords are compiled into one
+Aho-Corasick automaton, so a description is scanned once whatever the number of rules. When
+several keywords match, the rule with the lowest priority wins. Priority defaults to the rule's
+position in the file, which means earlier rules win, just like the old if-chain. Frames are
+classified per unique description and the results are broadcast back to the rows.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import deque, namedtuple
+
+import pandas as pd
+
+from src.logger import get_logger
+from src.schema import has_stage, mark_stage
+
+DEFAULT_RULES_PATH = 'rules/category_rules.yaml'
+DEFAULT_CATEGORY = 'Other'
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+CategoryRule = namedtuple('CategoryRule', ['category', 'keywords', 'priority'])
+
+_UNCLEAN_CHARS_RE = re.compile(r'[^a-z0-9 ]')
+
+
+def clean_description(desc):
+    desc = str(desc).strip().lower()
+    return _UNCLEAN_CHARS_RE.sub('', desc)
+
+
+def clean_descriptions(values):
+    """Vectorized clean_description for a Series."""
+    return values.astype(str).str.strip().str.lower().str.replace(_UNCLEAN_CHARS_RE, '', regex=True)
+
+
+# --- Rule files ---
+def load_rules(path):
+    """
+    Load CategoryRules from a .yaml/.yml or .csv rule file. Returns (rules, default_category).
+
+    YAML: {default: Other, rules: [{category: Food, keywords: [zomato, swiggy], priority: 10}, ...]}
+    (a single `keyword:` is accepted too). CSV: header `keyword,category[,priority]`, one keyword per row.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    default = DEFAULT_CATEGORY
+    entries = []
+    if ext in ('.yaml', '.yml'):
+        import yaml
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        default = data.get('default', DEFAULT_CATEGORY)
+        for entry in data.get('rules') or []:
+            keywords = entry.get('keywords') or [entry.get('keyword')]
+            entries.append((entry['category'], keywords, entry.get('priority')))
+    elif ext == '.csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                entries.append((row['category'], [row['keyword']], row.get('priority') or None))
+    else:
+        raise ValueError(f"Unsupported rule file type: {path}")
+    rules = []
+    for position, (category, keywords, priority) in enumerate(entries):
+        keywords = tuple(kw for kw in (clean_description(k).strip() for k in keywords if k is not None) if kw)
+        if keywords:
+            rules.append(CategoryRule(category, keywords, float(priority) if priority is not None else float(position)))
+    return rules, default
+
+
+# --- Automaton ---
+def _ahocorasick_module():
+    try:
+        import ahocorasick
+        return ahocorasick
+    except ImportError:
+        return None
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over (keyword, rank) pairs. best_rank(text) returns the lowest rank
+    of any keyword occurring in text, or None. Uses pyahocorasick when it is installed.
+    """
+    _NO_MATCH = float('inf')
+
+    def __init__(self, keywords):
+        ahocorasick = _ahocorasick_module()
+        self._native = None
+        if ahocorasick is not None:
+            native = ahocorasick.Automaton()
+            for keyword, rank in keywords:
+                existing = native.get(keyword, None)
+                native.add_word(keyword, rank if existing is None else min(existing, rank))
+            if len(native):
+                native.make_automaton()
+                self._native = native
+            return
+        self._build(keywords)
+
+    def _build(self, keywords):
+        goto = [{}]
+        best = [self._NO_MATCH]
+        for keyword, rank in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(self._NO_MATCH)
+                state = nxt
+            best[state] = min(best[state], rank)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                # Fold the best output reachable through the failure link into this state
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+        self._goto, self._fail, self._best = goto, fail, best
+
+    def best_rank(self, text):
+        if self._native is not None:
+            ranks = [rank for _, rank in self._native.iter(text)]
+            return min(ranks) if ranks else None
+        if not hasattr(self, '_goto'):
+            return None
+        goto, fail, best = self._goto, self._fail, self._best
+        found = self._NO_MATCH
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if best[state] < found:
+                found = best[state]
+        return None if found == self._NO_MATCH else found
+
+
+class CategoryEngine:
+    """Compiled category rules: one automaton pass per unique cleaned description."""
+
+    def __init__(self, rules, default=DEFAULT_CATEGORY):
+        self.rules = list(rules)
+        self.default = default
+        # Rank = position after a stable sort on priority, so ties keep file order
+        ordered = sorted(range(len(self.rules)), key=lambda i: self.rules[i].priority)
+        self._categories = [self.rules[i].category for i in ordered]
+        self._automaton = KeywordAutomaton(
+            (keyword, rank) for rank, i in enumerate(ordered) for keyword in self.rules[i].keywords
+        )
+        # Identifies the effective rule set, so cached categories can be invalidated when it changes
+        payload = [default] + [[self.rules[i].category, list(self.rules[i].keywords)] for i in ordered]
+        self.fingerprint = hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_file(cls, path):
+        rules, default = load_rules(path)
+        get_logger().info(f"Loaded {len(rules)} category rules from {path}")
+        return cls(rules, default=default)
+
+    def classify(self, desc_clean):
+        """Category for one cleaned description."""
+        rank = self._automaton.best_rank(desc_clean)
+        return self.default if rank is None else self._categories[rank]
+
+    def classify_series(self, desc_clean, cache=None):
+        """
+        Classify a Series of cleaned descriptions once per unique value and broadcast back to rows.
+        With a CategoryCache, known descriptions are looked up instead and new results are stored.
+        """
+        codes, uniques = pd.factorize(desc_clean, use_na_sentinel=False)
+        if cache is None:
+            categories = [self.classify(value) for value in uniques]
+        else:
+            known = cache.lookup(uniques)
+            computed = {value: self.classify(value) for value in uniques if value not in known}
+            cache.store(computed)
+            get_logger().info(f"Category cache: {len(known)}/{len(uniques)} unique descriptions hit, "
+                              f"{len(computed)} categorized (session hit rate {cache.hit_rate:.1%})")
+            known.update(computed)
+            categories = [known[value] for value in uniques]
+        return pd.Series(pd.Index(categories, dtype=object).take(codes), index=desc_clean.index, dtype=object)
+
+
+def resolve_rules_path(path):
+    """Relative rule paths are looked up in the working directory first, then in the repo root."""
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    return os.path.join(_REPO_ROOT, path)
+
+
+_engine = None
+
+
+def get_category_engine():
+    """Engine for the rule file configured under `categorization.rules_path` (loaded once)."""
+    global _engine
+    if _engine is None:
+        from src.config_loader import get_config
+        options = (get_config() or {}).get('categorization') or {}
+        _engine = CategoryEngine.from_file(resolve_rules_path(options.get('rules_path', DEFAULT_RULES_PATH)))
+    return _engine
+
+
+def categorize_description(desc):
+    return get_category_engine().classify(clean_description(desc))
+
+
+def categorize_transactions(df, engine=None, cache=True):
+    """
+    Add description_clean and category columns. Frames already categorized are returned unchanged.
+    cache=True uses the configured persistent CategoryCache; pass a CategoryCache or None to override.
+    """
+    if has_stage(df, 'categorize'):
+        return df
+    engine = engine or get_category_engine()
+    if cache is True:
+        from src.category_cache import get_category_cache
+        cache = get_category_cache(engine.fingerprint)
+    df['description_clean'] = clean_descriptions(df['description'])
+    df['category'] = engine.classify_series(df['description_clean'], cache=cache)
+    return mark_stage(df, 'categorize')
@@ -0,0 +1,115 @@
+"""
+Persistent memo cache from cleaned description to category, stored in SQLite.
+
+Repeat merchants make up most statements, so categorize_transactions looks descriptions up here
+before running the rule engine and stores whatever it had to compute. Entries are scoped by the
+fingerprint of the rule set that produced them, so alternating rule sets (an ad-hoc rules file,
+the tests, the CLI) each keep their own entries. Only the `keep_rule_sets` most recently used
+fingerprints are kept; older ones are pruned when a cache is opened.
+"""
+import os
+import sqlite3
+import time
+
+from src.logger import get_logger
+
+DEFAULT_CACHE_PATH = os.path.join('data', 'cache', 'categories.sqlite')
+DEFAULT_KEEP_RULE_SETS = 4
+_CATEGORIES_TABLE = ("CREATE TABLE IF NOT EXISTS categories (fingerprint TEXT NOT NULL, description_clean TEXT NOT NULL, "
+                     "category TEXT NOT NULL, PRIMARY KEY (fingerprint, description_clean))")
+_RULE_SETS_TABLE = "CREATE TABLE IF NOT EXISTS rule_sets (fingerprint TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+# Stay well below SQLite's bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+class CategoryCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, fingerprint=None, keep_rule_sets=DEFAULT_KEEP_RULE_SETS):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.keep_rule_sets = keep_rule_sets
+        self.hits = 0
+        self.misses = 0
+        self.logger = get_logger()
+        self._prepare()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _prepare(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_CATEGORIES_TABLE)
+            conn.execute(_RULE_SETS_TABLE)
+            conn.execute("INSERT OR REPLACE INTO rule_sets (fingerprint, last_used) VALUES (?, ?)", (self._key, time.time()))
+            stale = [row[0] for row in conn.execute(
+                "SELECT fingerprint FROM rule_sets ORDER BY last_used DESC LIMIT -1 OFFSET ?", (max(self.keep_rule_sets, 1),))]
+            for fingerprint in stale:
+                conn.execute("DELETE FROM categories WHERE fingerprint = ?", (fingerprint,))
+                conn.execute("DELETE FROM rule_sets WHERE fingerprint = ?", (fingerprint,))
+            if stale:
+                self.logger.info(f"Pruned cached categories of {len(stale)} rule set(s) not used recently from {self.path}")
+
+    @property
+    def _key(self):
+        return self.fingerprint or ''
+
+    def lookup(self, descriptions):
+        """Return {description_clean: category} for the descriptions already cached."""
+        descriptions = list(descriptions)
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(descriptions), _LOOKUP_BATCH):
+                batch = descriptions[start:start + _LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                found.update(conn.execute(
+                    f"SELECT description_clean, category FROM categories WHERE fingerprint = ? AND description_clean IN ({placeholders})",
+                    [self._key] + batch
+                ).fetchall())
+        self.hits += len(found)
+        self.misses += len(descriptions) - len(found)
+        return found
+
+    def store(self, mapping):
+        if not mapping:
+            return
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO categories (fingerprint, description_clean, category) VALUES (?, ?, ?)",
+                             ((self._key, description, category) for description, category in mapping.items()))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM categories WHERE fingerprint = ?", (self._key,)).fetchone()[0]
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def clear(self):
+        """Drop this rule set's entries."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM categories WHERE fingerprint = ?", (self._key,))
+
+
+_cache = None
+
+
+def get_category_cache(fingerprint):
+    """
+    Cache configured under `categorization` (cache_path, use_cache, cache_keep_rule_sets) for the
+    given rule fingerprint, or None when caching is disabled.
+    """
+    global _cache
+    if _cache is None or _cache.fingerprint != fingerprint:
+        from src.config_loader import get_config
+        options = (get_config() or {}).get('categorization') or {}
+        if not options.get('use_cache', True):
+            return None
+        _cache = CategoryCache(options.get('cache_path', DEFAULT_CACHE_PATH), fingerprint=fingerprint,
+                               keep_rule_sets=int(options.get('cache_keep_rule_sets', DEFAULT_KEEP_RULE_SETS)))
+    return _cache
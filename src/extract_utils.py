@@ -1,5 +1,23 @@
 import os
 import re
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from src.logger import get_logger
+
+# Bump whenever the extraction logic or cache file layout changes so stale entries are ignored
+EXTRACTOR_VERSION = "pdfplumber-2"
+# Terminates every page inside a cache entry so cached text can be streamed page by page
+PAGE_BREAK = '\f'
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'extracted')
+DEFAULT_CACHE_MAX_ENTRIES = 256
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Page-sharded extraction only pays off once process start-up is amortised over enough pages
+DEFAULT_PARALLEL_MIN_PAGES = 8
+DEFAULT_SHARDS_PER_WORKER = 4
+# Text statements are streamed in chunks of this many lines
+DEFAULT_TEXT_PAGE_LINES = 1000
 
 def get_extracted_txt_path(pdf_path):
     base_dir, pdf_filename = os.path.split(pdf_path)
@@ -13,3 +31,318 @@ def save_extracted_text(pdf_path, text):
     with open(txt_path, "w", encoding="utf-8") as f:
         f.write(text)
     return txt_path
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# (path, size, mtime_ns) -> SHA-256, so an unchanged file is hashed once per process
+_digests = {}
+
+def file_digest(path):
+    """file_sha256 of path, computed once per process while the file's size and mtime are unchanged."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = _digests[key] = file_sha256(path)
+    return digest
+
+
+class ExtractionCache:
+    """
+    Bounded on-disk cache of extracted PDF text keyed by content hash + extractor version.
+    Recency is tracked through file mtimes; the least recently used entries are evicted
+    once either max_entries or max_bytes is exceeded. The entry just committed is never evicted, so
+    a PDF whose text alone exceeds max_bytes is still read back from the cache by the next stage.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_CACHE_MAX_ENTRIES, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = get_logger()
+
+    def key_for(self, pdf_path, digest=None):
+        """Cache key for pdf_path; pass its SHA-256 as digest when it is already known."""
+        return f"{digest or file_digest(pdf_path)}-{EXTRACTOR_VERSION}"
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + '.txt')
+
+    def open_pages(self, key):
+        """Return an iterator over the cached pages for key, or None on a miss."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        # Mark as most recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return self._read_pages(path)
+
+    def _read_pages(self, path):
+        page = []
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for line in f:
+                while PAGE_BREAK in line:
+                    head, line = line.split(PAGE_BREAK, 1)
+                    page.append(head)
+                    yield ''.join(page)
+                    page = []
+                if line:
+                    page.append(line)
+        if page:
+            yield ''.join(page)
+
+    def get(self, key):
+        pages = self.open_pages(key)
+        if pages is None:
+            return None
+        return ''.join(pages)
+
+    def writer(self, key):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return _CacheWriter(self, self.path_for(key))
+
+    def put(self, key, text):
+        writer = self.writer(key)
+        writer.write_page(text)
+        return writer.commit()
+
+    def entries(self):
+        """Return (mtime, size, path) for every cache entry, oldest first."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache is within bounds, sparing the entry at keep."""
+        entries = self.entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            count -= 1
+            total_bytes -= size
+            self.logger.info(f"Evicted extraction cache entry: {path}")
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+class _CacheWriter:
+    """Streams pages into a temporary file that only becomes a cache entry on commit()."""
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        # A unique name: two threads (or processes) extracting the same PDF each write their own file
+        fd, self.tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                             dir=os.path.dirname(path) or None)
+        self.file = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+
+    def write_page(self, page):
+        self.file.write(page.replace(PAGE_BREAK, ''))
+        self.file.write(PAGE_BREAK)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict(keep=self.path)
+        return self.path
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+_cache = None
+
+def get_extraction_cache():
+    global _cache
+    if _cache is None:
+        from src.config_loader import get_config
+        options = (get_config() or {}).get('extraction') or {}
+        _cache = ExtractionCache(
+            cache_dir=options.get('cache_dir', DEFAULT_CACHE_DIR),
+            max_entries=options.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+            max_bytes=options.get('cache_max_bytes', DEFAULT_CACHE_MAX_BYTES),
+        )
+    return _cache
+
+_worker_limit = None
+
+def limit_extraction_workers(limit):
+    """Cap the extraction workers of this process (None lifts the cap), e.g. inside a file-level worker pool."""
+    global _worker_limit
+    _worker_limit = limit
+
+def get_extraction_workers():
+    """Configured extraction worker count; 0 or a negative value means one per CPU."""
+    from src.config_loader import get_config
+    options = (get_config() or {}).get('extraction') or {}
+    workers = int(options.get('workers', 1) or 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if _worker_limit is not None:
+        workers = min(workers, _worker_limit)
+    return workers
+
+def count_pdf_pages(pdf_path):
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def _extract_page_range(pdf_path, start=0, stop=None):
+    # Runs inside a worker process: each shard opens its own handle on the PDF
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return [(page.extract_text() or '') + '\n' for page in pdf.pages[start:stop]]
+
+def shard_pages(page_count, workers, shards_per_worker=DEFAULT_SHARDS_PER_WORKER):
+    """Split [0, page_count) into contiguous (start, stop) ranges, a few per worker for load balancing."""
+    shard_count = max(1, min(page_count, workers * shards_per_worker))
+    size, remainder = divmod(page_count, shard_count)
+    ranges = []
+    start = 0
+    for i in range(shard_count):
+        stop = start + size + (1 if i < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def iter_pdf_pages_parallel(pdf_path, workers, page_count=None):
+    """Extract pages in a process pool, yielding them in page order as shards complete."""
+    if page_count is None:
+        page_count = count_pdf_pages(pdf_path)
+    ranges = shard_pages(page_count, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        # map() yields results in submission order, so the page order is preserved
+        shards = pool.map(_extract_page_range, [pdf_path] * len(ranges), [r[0] for r in ranges], [r[1] for r in ranges])
+        for shard in shards:
+            yield from shard
+
+def extract_pdf_pages_parallel(pdf_path, workers, page_count=None):
+    return list(iter_pdf_pages_parallel(pdf_path, workers, page_count=page_count))
+
+def _iter_pdfplumber_pages(pdf_path, workers=None):
+    if workers is None:
+        workers = get_extraction_workers()
+    if workers > 1:
+        from src.config_loader import get_config
+        options = (get_config() or {}).get('extraction') or {}
+        min_pages = options.get('parallel_min_pages', DEFAULT_PARALLEL_MIN_PAGES)
+        page_count = count_pdf_pages(pdf_path)
+        if page_count >= min_pages:
+            get_logger().info(f"Extracting {page_count} pages from {pdf_path} with {workers} workers")
+            yield from iter_pdf_pages_parallel(pdf_path, workers, page_count=page_count)
+            return
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            yield (page.extract_text() or '') + '\n'
+            # Release the parsed layout objects so memory stays flat on long statements
+            page.flush_cache()
+
+def iter_pdf_pages(pdf_path, cache=None, use_cache=True, workers=None, digest=None):
+    """
+    Yield the text of a PDF page by page, streaming from the extraction cache when the file content is unchanged.
+    On a miss, pages are written through to the cache as they are extracted; the entry is only
+    committed once every page has been read.
+    Args:
+        pdf_path (str): Path to the PDF
+        cache (ExtractionCache): Optional cache, defaults to the configured shared cache
+        use_cache (bool): Set to False to always run pdfplumber
+        workers (int): Extraction processes for a cache miss, defaults to extraction.workers in config.yaml
+        digest (str): The PDF's SHA-256 when already known, so it is not hashed again
+    Yields:
+        str: Text of one page, newline terminated
+    """
+    if not use_cache:
+        yield from _iter_pdfplumber_pages(pdf_path, workers=workers)
+        return
+    logger = get_logger()
+    cache = cache or get_extraction_cache()
+    key = cache.key_for(pdf_path, digest=digest)
+    pages = cache.open_pages(key)
+    if pages is not None:
+        logger.info(f"Extraction cache hit for {pdf_path}")
+        yield from pages
+        return
+    writer = cache.writer(key)
+    try:
+        for page in _iter_pdfplumber_pages(pdf_path, workers=workers):
+            writer.write_page(page)
+            yield page
+    except BaseException:
+        # Includes GeneratorExit: a partially consumed extraction must not become a cache entry
+        writer.abort()
+        raise
+    writer.commit()
+    logger.info(f"Extraction cache miss for {pdf_path}, cached as {key}")
+
+def extract_pdf_text(pdf_path, cache=None, use_cache=True, workers=None):
+    """Extract the full text of a PDF; see iter_pdf_pages for caching behaviour."""
+    return ''.join(iter_pdf_pages(pdf_path, cache=cache, use_cache=use_cache, workers=workers))
+
+def iter_statement_pages(file_path, lines_per_page=DEFAULT_TEXT_PAGE_LINES, digest=None):
+    """Yield a statement's text page by page: PDF pages, or fixed-size line chunks for text files."""
+    if os.path.splitext(file_path)[-1].lower() == '.pdf':
+        yield from iter_pdf_pages(file_path, digest=digest)
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        chunk = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= lines_per_page:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+def read_first_page(file_path, digest=None, lines_per_page=DEFAULT_TEXT_PAGE_LINES):
+    """
+    Text of a statement's first page only: from the extraction cache when the PDF was extracted
+    before (pass its SHA-256 as digest to skip hashing it again), otherwise just page one through
+    pdfplumber. For text files, the first chunk of lines.
+    """
+    if os.path.splitext(file_path)[-1].lower() != '.pdf':
+        return next(iter_statement_pages(file_path, lines_per_page=lines_per_page), '')
+    cache = get_extraction_cache()
+    pages = cache.open_pages(cache.key_for(file_path, digest=digest))
+    if pages is not None:
+        first = next(pages, '')
+        pages.close()
+        return first
+    return ''.join(_extract_page_range(file_path, 0, 1))
+
+def iter_statement_lines(file_path):
+    """Yield a statement's lines without holding the whole document in memory."""
+    for page in iter_statement_pages(file_path):
+        yield from page.splitlines()
+
+def read_statement_text(file_path):
+    """Return the raw text of a statement, extracting (or reusing cached text) for PDFs."""
+    return ''.join(iter_statement_pages(file_path))
@@ -1,31 +1,92 @@
 
 import os
+import hashlib
+import tempfile
+import numpy as np
 import pandas as pd
-import json
 from datetime import datetime
 from src.logger import get_logger
+from src.ledger import get_ledger
+from src.manifest import file_fingerprint, get_manifest
+from src.metrics import get_metrics, timed
+from src.schema import (STRING_DTYPE, TRANSACTION_SCHEMA, enforce_schema, frame_fingerprint, row_fingerprints,
+                        transaction_ids)
+from src.store import arrow_table, get_transaction_store, statement_key, transaction_arrow_schema
 
+DEFAULT_PROCESSED_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed')
+# Input extensions dropped from processed file names (no more statement.pdf.csv / combined.csv.csv)
+_INPUT_EXTENSIONS = ('.pdf', '.txt', '.csv', '.parquet')
+# Column layout of combined files (AccountType last, as in save_to_processed)
+COMBINED_COLUMNS = [col for col in TRANSACTION_SCHEMA if col != 'AccountType'] + ['AccountType']
 
-def save_to_processed(df, source, filename, format='csv', processed_dir=None, original_path=None):
+
+def statement_id(original_path):
+    """Short digest of an input file's absolute path, telling apart statements that share a file name."""
+    return hashlib.sha256(os.path.abspath(original_path).encode('utf-8')).hexdigest()[:10]
+
+
+def processed_filename(filename, format='csv', original_path=None):
     """
-    Save DataFrame to processed dir as CSV or Parquet, log, and append manifest entry.
+    (stem, file name) of the processed file for filename: input extension dropped, lowercased, no
+    spaces. A statement read from original_path gets its statement_id appended to the stem.
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in _INPUT_EXTENSIONS:
+        stem = filename
+    stem = stem.replace(' ', '_').lower()
+    if original_path:
+        stem = f"{stem}-{statement_id(original_path)}"
+    return stem, stem + ('.parquet' if format == 'parquet' else '.csv')
+
+
+def _retract_renamed(processed_dir, original_path, stem, transaction_store):
+    # A statement saved before its processed name carried the statement_id (or under another file
+    # name) leaves rows under the old name; drop them unless another input was saved there since
+    manifest = get_manifest(processed_dir)
+    previous = manifest.latest(original_path=os.path.abspath(original_path))
+    if previous is None or not previous['filename']:
+        return
+    old_stem = os.path.splitext(previous['filename'])[0]
+    owner = manifest.latest(filename=previous['filename'])
+    if old_stem == stem or owner is None or owner['original_path'] != previous['original_path']:
+        return
+    if transaction_store is not None:
+        transaction_store.delete(statement_key(old_stem))
+    old_path = os.path.join(processed_dir, previous['filename'])
+    if os.path.exists(old_path):
+        os.remove(old_path)
+    get_logger().info(f"Removed rows saved earlier from {original_path} as {previous['filename']}")
+
+
+@timed('persist_seconds')
+def save_to_processed(df, source, filename, format='csv', processed_dir=None, original_path=None, store=True):
+    """
+    Save DataFrame to processed dir as CSV or Parquet, log, and append a manifest entry (src.manifest).
+    A statement saved from original_path is named after the file name plus its statement_id, so
+    inputs that share a file name (statement.pdf from two folders) never overwrite each other.
+    With store=True the rows also go to the partitioned transaction store (src.store), replacing
+    any rows saved earlier for the same statement, and are upserted into the SQLite ledger
+    (src.ledger) by transaction_id; pass store=False for derived frames such as combined files.
     Args:
         df (pd.DataFrame): DataFrame to save
         source (str): Source identifier
         filename (str): Desired filename (spaces replaced, lowercased)
         format (str): 'csv' or 'parquet'
         processed_dir (str): Optional base dir for processed files
-        original_path (str): Optional original file path
+        original_path (str): Optional original file path; its size, mtime and hash are recorded too
+        store (bool): Also write the rows to the partitioned transaction store and the ledger
     Returns:
         str: Path to saved file
     """
     logger = get_logger()
     # Configurable processed dir
     if processed_dir is None:
-        processed_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed')
+        processed_dir = DEFAULT_PROCESSED_DIR
     os.makedirs(processed_dir, exist_ok=True)
-    safe_filename = filename.replace(' ', '_').lower() + ('.parquet' if format == 'parquet' else '.csv')
+    stem, safe_filename = processed_filename(filename, format, original_path=original_path)
     save_path = os.path.join(processed_dir, safe_filename)
+    # Persist the typed schema only; display columns are rebuilt at render time
+    df = enforce_schema(df)
     # Ensure all columns, including AccountType, are saved
     if 'AccountType' in df.columns:
         cols = [col for col in df.columns if col != 'AccountType'] + ['AccountType']
@@ -35,30 +96,201 @@ def save_to_processed(df, source, filename, format='csv', processed_dir=None, or
     else:
         df.to_csv(save_path, index=False)
     logger.info(f"Saved processed file: {save_path}")
+    get_metrics().inc('persist_rows_total', len(df), format=format)
+    if store:
+        transaction_store = get_transaction_store(processed_dir)
+        if original_path:
+            try:
+                _retract_renamed(processed_dir, original_path, stem, transaction_store)
+            except Exception as e:
+                logger.error(f"Failed to remove earlier rows of {original_path}: {e}")
+        if transaction_store is not None:
+            try:
+                transaction_store.write(df, statement_key(stem))
+            except Exception as e:
+                logger.error(f"Failed to write {stem} to the transaction store: {e}")
+        # Overlapping statements share transaction ids, so their common rows are stored once
+        try:
+            get_ledger(processed_dir).upsert(df, statement=stem)
+        except Exception as e:
+            logger.error(f"Failed to upsert {stem} into the ledger: {e}")
 
     # Manifest metadata
-    manifest_path = os.path.join(processed_dir, 'manifest.json')
     metadata = {
         'filename': safe_filename,
         'source': source,
         'rows': int(df.shape[0]),
         'amount_sum': float(df['AmountValue'].sum()) if 'AmountValue' in df.columns else None,
-        'date_min': str(df['Date'].min()) if 'Date' in df.columns else None,
-        'date_max': str(df['Date'].max()) if 'Date' in df.columns else None,
+        'date_min': str(df['date'].min()) if 'date' in df.columns else None,
+        'date_max': str(df['date'].max()) if 'date' in df.columns else None,
         'saved_at': datetime.now().isoformat(),
-        'original_path': original_path
+        'original_path': original_path,
+        'content_hash': frame_fingerprint(df),
     }
-    # Append to manifest.json
+    # Fingerprint of the input file, so an unchanged statement is not parsed again (Manifest.unchanged)
+    if original_path and os.path.isfile(original_path):
+        metadata.update(file_fingerprint(original_path))
+    # One atomic insert; earlier entries are never read or rewritten
     try:
-        if os.path.exists(manifest_path):
-            with open(manifest_path, 'r', encoding='utf-8') as f:
-                manifest = json.load(f)
+        get_manifest(processed_dir).append(metadata)
+        logger.info(f"Appended metadata to manifest: {metadata}")
+    except Exception as e:
+        logger.error(f"Failed to update manifest: {e}")
+    return save_path
+
+
+class CombinedWriter:
+    """
+    Processed file built from several statements, written one statement at a time: each write()
+    appends a frame's rows (a Parquet row group, or CSV lines) in COMBINED_COLUMNS layout, so only
+    the frame being written is held in memory. Rows whose transaction_id was written before are
+    dropped; the ids seen so far are kept as a sorted array of 64-bit integers (8 bytes per row).
+    The file appears at path only when close() succeeds.
+    """
+    def __init__(self, path, format='csv'):
+        self.path = path
+        self.format = format
+        self.rows = 0
+        self.duplicates = 0
+        self.amount_sum = 0.0
+        self.date_min = None
+        self.date_max = None
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._digest = hashlib.sha256()
+        # Unique per writer: two sessions combining into the same file never share a temporary file
+        fd, self._tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                              dir=os.path.dirname(path) or None)
+        os.close(fd)
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
         else:
-            manifest = []
-        manifest.append(metadata)
-        with open(manifest_path, 'w', encoding='utf-8') as f:
-            json.dump(manifest, f, indent=2)
+            self.abort()
+
+    def write(self, df):
+        """Append df's rows that were not written before; returns how many were written."""
+        if df is None or df.empty:
+            return 0
+        df = enforce_schema(df.reset_index(drop=True))
+        if 'transaction_id' not in df.columns:
+            df['transaction_id'] = transaction_ids(df)
+        elif df['transaction_id'].isna().any():
+            df['transaction_id'] = df['transaction_id'].fillna(transaction_ids(df))
+        # Ids are 16 hex digits: compare them as 64-bit integers
+        keys = np.frombuffer(bytes.fromhex(''.join(df['transaction_id'])), dtype='>u8').astype(np.uint64)
+        new = ~pd.Series(keys).duplicated().to_numpy()
+        if len(self._seen):
+            # Binary search: the seen array is never re-hashed as it grows
+            positions = np.minimum(np.searchsorted(self._seen, keys), len(self._seen) - 1)
+            new &= self._seen[positions] != keys
+        self.duplicates += len(keys) - int(new.sum())
+        if not new.any():
+            return 0
+        added = np.sort(keys[new])
+        self._seen = np.insert(self._seen, np.searchsorted(self._seen, added), added)
+        frame = df[new]
+        self._append(frame)
+        self._digest.update(row_fingerprints(frame).tobytes())
+        self.rows += len(frame)
+        self.amount_sum += float(frame['AmountValue'].sum()) if 'AmountValue' in frame.columns else 0.0
+        dates = frame['date'].dropna() if 'date' in frame.columns else pd.Series(dtype='datetime64[ns]')
+        if not dates.empty:
+            self.date_min = dates.min() if self.date_min is None else min(self.date_min, dates.min())
+            self.date_max = dates.max() if self.date_max is None else max(self.date_max, dates.max())
+        return len(frame)
+
+    def _append(self, frame):
+        frame = enforce_schema(frame.reindex(columns=COMBINED_COLUMNS))
+        if self.format == 'parquet':
+            table = arrow_table(frame, transaction_arrow_schema(COMBINED_COLUMNS))
+            if self._writer is None:
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+            # One row group per statement
+            self._writer.write_table(table, row_group_size=max(len(frame), 1))
+        else:
+            frame.to_csv(self._tmp_path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+
+    @property
+    def content_hash(self):
+        """frame_fingerprint of everything written so far."""
+        return self._digest.hexdigest()
+
+    def close(self):
+        if not self.rows:
+            # Nothing was written: leave a valid file holding just the columns
+            self._append(pd.DataFrame({col: pd.Series(dtype=TRANSACTION_SCHEMA[col]) for col in COMBINED_COLUMNS}))
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def save_combined(frames, source, filename, format='csv', processed_dir=None):
+    """
+    Write frames (an iterable of standardized statements, consumed one at a time) to one processed
+    file with CombinedWriter and append its manifest entry. Rows repeated across statements are
+    written once. Combined files never go to the transaction store or the ledger; their statements
+    are saved there on their own.
+    Returns:
+        str: Path to saved file
+    """
+    logger = get_logger()
+    processed_dir = processed_dir or DEFAULT_PROCESSED_DIR
+    os.makedirs(processed_dir, exist_ok=True)
+    _, safe_filename = processed_filename(filename, format)
+    save_path = os.path.join(processed_dir, safe_filename)
+    with CombinedWriter(save_path, format=format) as writer:
+        for df in frames:
+            writer.write(df)
+    logger.info(f"Saved combined file: {save_path} ({writer.rows} rows, {writer.duplicates} repeated rows dropped)")
+    metadata = {
+        'filename': safe_filename,
+        'source': source,
+        'rows': writer.rows,
+        'amount_sum': writer.amount_sum,
+        'date_min': str(writer.date_min) if writer.date_min is not None else None,
+        'date_max': str(writer.date_max) if writer.date_max is not None else None,
+        'saved_at': datetime.now().isoformat(),
+        'original_path': None,
+        'content_hash': writer.content_hash,
+    }
+    try:
+        get_manifest(processed_dir).append(metadata)
         logger.info(f"Appended metadata to manifest: {metadata}")
     except Exception as e:
-        logger.error(f"Failed to update manifest.json: {e}")
+        logger.error(f"Failed to update manifest: {e}")
     return save_path
+
+
+def load_processed(path):
+    """Read a processed CSV or Parquet file back as a typed transaction frame."""
+    if path.endswith('.parquet'):
+        df = enforce_schema(pd.read_parquet(path))
+    else:
+        df = _read_processed_csv(path)
+    # Files saved before transaction ids existed get the ids standardization would have assigned
+    if 'transaction_id' not in df.columns:
+        df['transaction_id'] = transaction_ids(df)
+    return df
+
+
+def _read_processed_csv(path):
+    # Text columns stay text (an all-digit transaction_id must not become a number) and empty text
+    # stays '' rather than NA, so the frame has the same content fingerprint as when it was saved
+    text_columns = [col for col, dtype in TRANSACTION_SCHEMA.items() if dtype == STRING_DTYPE]
+    columns = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, dtype={col: str for col in text_columns}, keep_default_na=False,
+                     na_values={col: [''] for col in columns if col not in text_columns})
+    return enforce_schema(df)
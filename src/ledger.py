@@ -0,0 +1,156 @@
+"""
+Embedded SQLite ledger of every ingested transaction, keyed by transaction_id.
+
+standardize_transactions gives each row a deterministic content-hash transaction_id (see
+src.schema.transaction_ids), and save_to_processed upserts each statement's rows here with one
+executemany per statement. Re-ingesting a statement, or one that overlaps an earlier statement,
+updates the rows already in the ledger instead of adding copies, so the ledger never needs an
+in-memory concat plus dedup. Date, source and category are indexed; query() turns its filters into
+an indexed SQL lookup and returns a typed DataFrame.
+"""
+import os
+import sqlite3
+
+import pandas as pd
+
+from src.logger import get_logger
+from src.schema import TRANSACTION_SCHEMA, enforce_schema, transaction_ids
+
+LEDGER_FILENAME = 'ledger.sqlite'
+# transaction_id first (the primary key), then the remaining schema columns and the statement that last wrote the row
+LEDGER_COLUMNS = ['transaction_id'] + [col for col in TRANSACTION_SCHEMA if col != 'transaction_id'] + ['statement']
+INDEXED_COLUMNS = ('date', 'source', 'category')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _sql_type(col):
+    dtype = TRANSACTION_SCHEMA.get(col)
+    if dtype == 'float64':
+        return 'REAL'
+    if dtype in ('bool', 'Int64'):
+        return 'INTEGER'
+    return 'TEXT'
+
+
+def _sql_values(values):
+    """A column as a list of Python values SQLite accepts (None for missing)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        text = values.dt.strftime(DATE_FORMAT)
+        return text.astype(object).where(text.notna(), None).tolist()
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype(int).tolist()
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class Ledger:
+    def __init__(self, path):
+        self.path = path
+        self.logger = get_logger()
+        self._prepare()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _prepare(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = ', '.join(f"{col} {_sql_type(col)}" for col in LEDGER_COLUMNS[1:])
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS transactions (transaction_id TEXT PRIMARY KEY, {columns})")
+            for col in INDEXED_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS transactions_{col} ON transactions ({col})")
+
+    @staticmethod
+    def _update_sql():
+        updates = ', '.join(f"{col} = ?" for col in LEDGER_COLUMNS[1:])
+        return f"UPDATE transactions SET {updates} WHERE transaction_id = ?"
+
+    @staticmethod
+    def _insert_sql():
+        return (f"INSERT INTO transactions ({', '.join(LEDGER_COLUMNS)}) VALUES ({', '.join('?' * len(LEDGER_COLUMNS))}) "
+                f"ON CONFLICT (transaction_id) DO NOTHING")
+
+    def upsert(self, df, statement=None):
+        """
+        Insert or update df's rows (standardized transactions) by transaction_id, in one transaction.
+        Rows without an id get one from src.schema.transaction_ids. Returns the number of new rows.
+        """
+        if df is None or df.empty:
+            return 0
+        df = enforce_schema(df.reset_index(drop=True))
+        if 'transaction_id' not in df.columns or df['transaction_id'].isna().any():
+            ids = transaction_ids(df)
+            df['transaction_id'] = ids if 'transaction_id' not in df.columns else df['transaction_id'].fillna(ids)
+        columns = []
+        for col in LEDGER_COLUMNS:
+            if col == 'statement':
+                columns.append([statement] * len(df))
+            elif col in df.columns:
+                columns.append(_sql_values(df[col]))
+            else:
+                columns.append([None] * len(df))
+        rows = list(zip(*columns))
+        with self._connect() as conn:
+            # Rows already present are updated in place, then the rest inserted; both passes are
+            # primary-key lookups and their row counts tell new from existing rows without a table scan
+            conn.executemany(self._update_sql(), (row[1:] + row[:1] for row in rows))
+            added = conn.executemany(self._insert_sql(), rows).rowcount
+        self.logger.info(f"Upserted {len(df)} transactions into {self.path} ({added} new, {len(df) - added} already present)")
+        return added
+
+    @staticmethod
+    def _where(start=None, end=None, sources=None, categories=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(start).strftime(DATE_FORMAT))
+        if end is not None:
+            end = pd.Timestamp(end)
+            # A date-only bound includes the whole day
+            if end == end.normalize():
+                clauses.append("date < ?")
+                params.append((end + pd.Timedelta(days=1)).strftime(DATE_FORMAT))
+            else:
+                clauses.append("date <= ?")
+                params.append(end.strftime(DATE_FORMAT))
+        for col, values in (('source', sources), ('category', categories)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{col} IN ({', '.join('?' * len(values))})" if values else "0")
+                params.extend(values)
+        return ' AND '.join(clauses) or '1', params
+
+    def query(self, start=None, end=None, sources=None, categories=None, columns=None):
+        """
+        Transactions dated start..end (inclusive; anything pd.Timestamp accepts) from the given
+        sources and categories, ordered by date, as a typed DataFrame.
+        """
+        where, params = self._where(start, end, sources, categories)
+        selected = [col for col in LEDGER_COLUMNS if columns is None or col in columns]
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"SELECT {', '.join(selected)} FROM transactions WHERE {where} ORDER BY date, rowid",
+                                   conn, params=params)
+        return self._typed(df)
+
+    @staticmethod
+    def _typed(df):
+        for col in df.columns:
+            dtype = TRANSACTION_SCHEMA.get(col)
+            if dtype == 'bool':
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(bool)
+            elif dtype == 'Int64':
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+            elif dtype == 'datetime64[ns]':
+                df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+        return enforce_schema(df)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+def get_ledger(processed_dir):
+    """Ledger of the transactions saved to processed_dir."""
+    return Ledger(os.path.join(processed_dir, LEDGER_FILENAME))
@@ -1,29 +1,202 @@
-import logging
+"""
+Logging setup shared by every module.
+
+configure_logging() runs once per process (get_logger() calls it on first use): the level comes
+from $LOG_LEVEL, else `logging.level` in config.yaml, else INFO, and is not looked up again.
+With `logging.queue` enabled (the default) callers only put records on an in-memory queue; a
+QueueListener thread formats and writes them, so a slow console or file never stalls parsing.
+Records are formatted on the listener thread, so pass immutable values as %-style args.
+
+Hot loops should not build messages that are then dropped: use %-style args (or log_event) so
+formatting is deferred, check debug_sampler(logger) before per-line debug output, and use
+log_event(logger, level, event, **fields) for structured records (rendered as
+`event key=value ...`, or as one JSON object per line with `logging.format: json`).
+"""
 import os
+import sys
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
 
-def get_logger(name=None, log_file=None, use_rotating_file=False, max_bytes=1048576, backup_count=3):
-    logger = logging.getLogger(name)
-    if not logger.hasHandlers():
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(message)s')
+LOG_FORMAT = '[%(asctime)s] %(levelname)s - %(message)s'
+# Per-line debug output: the first DEFAULT_SAMPLE_FIRST lines of a statement, then every DEFAULT_SAMPLE_EVERY-th
+DEFAULT_SAMPLE_FIRST = 10
+DEFAULT_SAMPLE_EVERY = 100
+
+_configured = False
+_listener = None
+_queue_handler = None
+_sample_first = DEFAULT_SAMPLE_FIRST
+_sample_every = DEFAULT_SAMPLE_EVERY
+
+
+class StructuredMessage:
+    """Log message for an event and its fields, only rendered when a handler emits it."""
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join([self.event] + [f"{key}={value}" for key, value in self.fields.items()])
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, plus the fields of a log_event."""
+    def format(self, record):
+        entry = {'time': self.formatTime(record), 'level': record.levelname, 'logger': record.name}
+        if isinstance(record.msg, StructuredMessage):
+            entry['event'] = record.msg.event
+            entry.update(record.msg.fields)
+        else:
+            entry['message'] = record.getMessage()
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # QueueHandler.prepare formats the message in the caller's thread; leave it to the listener
+    def prepare(self, record):
+        return record
+
+
+def resolve_level(level=None):
+    """Numeric level for level (name or number), else $LOG_LEVEL, else `logging.level`, else INFO."""
+    if level is None:
+        level = os.environ.get('LOG_LEVEL') or _logging_options().get('level') or 'INFO'
+    if isinstance(level, int):
+        return level
+    return getattr(logging, str(level).upper(), logging.INFO)
+
+
+def _logging_options():
+    try:
+        from src.config_loader import get_config
+        return (get_config() or {}).get('logging') or {}
+    except Exception:
+        return {}
+
+
+def configure_logging(level=None, log_file=None, use_rotating_file=False, max_bytes=1048576, backup_count=3,
+                      stream=None, use_queue=None, fmt=None, sample_first=None, sample_every=None):
+    """
+    Set up the root logger: a console handler (stream, default stderr), optionally a (rotating)
+    file handler, both behind a queue unless use_queue=False. Calling it again replaces the setup.
+    sample_first / sample_every override `logging.debug_sample_first` / `debug_sample_every` for
+    debug_sampler (sample_every=1 logs every line).
+    """
+    global _configured, _listener, _queue_handler, _sample_first, _sample_every
+    options = _logging_options()
+    root = logging.getLogger()
+    _shutdown_listener()
+    for handler in list(root.handlers):
+        if getattr(handler, '_finance_handler', False):
+            root.removeHandler(handler)
+
+    formatter = JsonFormatter() if (fmt or options.get('format', 'text')) == 'json' else logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    if log_file:
+        if use_rotating_file:
+            from logging.handlers import RotatingFileHandler
+            handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count))
+        else:
+            handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
-
-        # Optionally add RotatingFileHandler
-        if log_file:
-            if use_rotating_file:
-                from logging.handlers import RotatingFileHandler
-                file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
-            else:
-                file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
-
-    # Determine log level from env or config
-    log_level_str = os.environ.get('LOG_LEVEL', None)
-    if log_level_str:
-        log_level = getattr(logging, log_level_str.upper(), logging.INFO)
-    else:
-        log_level = logging.INFO
-    logger.setLevel(log_level)
-    return logger
+
+    if options.get('queue', True) if use_queue is None else use_queue:
+        _queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        handlers = [_queue_handler]
+    for handler in handlers:
+        handler._finance_handler = True
+        root.addHandler(handler)
+    root.setLevel(resolve_level(level))
+    if sample_first is None:
+        sample_first = options.get('debug_sample_first', DEFAULT_SAMPLE_FIRST)
+    if sample_every is None:
+        sample_every = options.get('debug_sample_every', DEFAULT_SAMPLE_EVERY)
+    _sample_first = int(sample_first)
+    _sample_every = max(int(sample_every), 1)
+    _configured = True
+
+
+def set_log_level(level):
+    """Change the root level after configuration (the level is otherwise resolved only once)."""
+    get_logger().setLevel(resolve_level(level))
+
+
+def get_logger(name=None, log_file=None, use_rotating_file=False, max_bytes=1048576, backup_count=3):
+    global _configured
+    if not _configured:
+        if logging.getLogger().hasHandlers() and not log_file:
+            # Someone else (pytest, an embedding app) owns the handlers; only set the level
+            logging.getLogger().setLevel(resolve_level())
+            _configured = True
+        else:
+            configure_logging(log_file=log_file, use_rotating_file=use_rotating_file,
+                              max_bytes=max_bytes, backup_count=backup_count)
+    return logging.getLogger(name)
+
+
+def log_event(logger, level, event, **fields):
+    """Log a structured event; nothing is built unless level is enabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, StructuredMessage(event, fields))
+
+
+class _Sampler:
+    __slots__ = ('first', 'every', 'count')
+
+    def __init__(self, first, every):
+        self.first = first
+        self.every = every
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return self.count <= self.first or self.count % self.every == 0
+
+
+def _never():
+    return False
+
+
+def debug_sampler(logger, first=None, every=None):
+    """
+    Callable deciding, call by call, whether a per-line debug message is emitted: the first
+    `first` calls, then every `every`-th (`logging.debug_sample_first` / `debug_sample_every`).
+    When DEBUG is off for logger it always returns False, without counting.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return _never
+    return _Sampler(_sample_first if first is None else first, _sample_every if every is None else every)
+
+
+def _shutdown_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_in_child():
+    # The listener thread does not survive fork; give the child its own queue and thread
+    global _listener
+    if _listener is not None and _queue_handler is not None:
+        handlers = _listener.handlers
+        _queue_handler.queue = queue.SimpleQueue()
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # multiprocessing workers leave through os._exit, skipping atexit; flush the queue before that
+        from multiprocessing import util
+        util.Finalize(None, _shutdown_listener, exitpriority=0)
+
+
+atexit.register(_shutdown_listener)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
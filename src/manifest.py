@@ -0,0 +1,139 @@
+"""
+Append-only manifest of processed files, stored in SQLite.
+
+Each save_to_processed call inserts one row in its own transaction, so the cost of a save does not
+depend on how many entries exist and concurrent writers (the CLI and a Streamlit session) cannot
+lose each other's entries. Entries are never updated; lookups by filename, source and content hash
+use indexes. A legacy manifest.json next to the database is imported once, the first time the
+manifest is opened.
+
+Entries of statements saved from an input file also record that file's size, mtime and content
+hash (file_fingerprint), so ingest can tell an input it has already processed (unchanged) from a
+new or modified one without parsing it again.
+"""
+import json
+import os
+import sqlite3
+
+from src.logger import get_logger
+from src.extract_utils import file_sha256
+
+MANIFEST_FILENAME = 'manifest.sqlite'
+LEGACY_MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_FIELDS = ['filename', 'source', 'rows', 'amount_sum', 'date_min', 'date_max', 'saved_at', 'original_path',
+                   'content_hash', 'file_size', 'file_mtime', 'file_hash']
+LOOKUP_FIELDS = ('filename', 'source', 'content_hash', 'original_path', 'file_hash')
+
+
+def file_fingerprint(path):
+    """Manifest fields identifying an input file: absolute path, size, mtime (ns) and SHA-256."""
+    stat = os.stat(path)
+    return {'original_path': os.path.abspath(path), 'file_size': stat.st_size, 'file_mtime': stat.st_mtime_ns,
+            'file_hash': file_sha256(path)}
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.logger = get_logger()
+        self._prepare()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _prepare(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL lets readers proceed while another process appends
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         f"{', '.join(MANIFEST_FIELDS)})")
+            # Manifests created before a field existed get the column added (NULL in older entries)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            for field in MANIFEST_FIELDS:
+                if field not in existing:
+                    conn.execute(f"ALTER TABLE entries ADD COLUMN {field}")
+            for field in LOOKUP_FIELDS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS entries_{field} ON entries ({field})")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._import_legacy()
+
+    def _import_legacy(self):
+        legacy_path = os.path.join(os.path.dirname(self.path), LEGACY_MANIFEST_FILENAME)
+        if not os.path.exists(legacy_path):
+            return
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone() is not None:
+                return
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE: only one process imports, the others see the marker afterwards
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone() is None:
+                    with open(legacy_path, 'r', encoding='utf-8') as f:
+                        legacy = json.load(f)
+                    conn.executemany(self._insert_sql(), [self._row(entry) for entry in legacy])
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (legacy_path,))
+                    self.logger.info(f"Imported {len(legacy)} entries from {legacy_path} into {self.path}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _insert_sql():
+        return f"INSERT INTO entries ({', '.join(MANIFEST_FIELDS)}) VALUES ({', '.join('?' * len(MANIFEST_FIELDS))})"
+
+    @staticmethod
+    def _row(entry):
+        return [entry.get(field) for field in MANIFEST_FIELDS]
+
+    def append(self, entry):
+        """Insert one entry (a dict with MANIFEST_FIELDS keys) atomically; returns its id."""
+        with self._connect() as conn:
+            return conn.execute(self._insert_sql(), self._row(entry)).lastrowid
+
+    def find(self, **criteria):
+        """Entries matching all given LOOKUP_FIELDS values, oldest first."""
+        unknown = set(criteria) - set(LOOKUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported manifest lookup field(s): {sorted(unknown)}")
+        where = ' AND '.join(f"{field} = ?" for field in criteria) or '1'
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f"SELECT id, {', '.join(MANIFEST_FIELDS)} FROM entries WHERE {where} ORDER BY id",
+                                list(criteria.values())).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest(self, **criteria):
+        entries = self.find(**criteria)
+        return entries[-1] if entries else None
+
+    def unchanged(self, path):
+        """
+        Latest entry saved from the input file at path if the file has not changed since, else None.
+        Size and mtime equal to the last entry for the path are trusted without reading the file;
+        otherwise the content hash decides (a touched, copied or renamed file is still unchanged).
+        """
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        entry = self.latest(original_path=os.path.abspath(path))
+        if entry is not None and (entry['file_size'], entry['file_mtime']) == (stat.st_size, stat.st_mtime_ns):
+            return entry
+        return self.latest(file_hash=file_sha256(path))
+
+    def entries(self):
+        return self.find()
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def get_manifest(processed_dir):
+    """Manifest of the processed files in processed_dir."""
+    return Manifest(os.path.join(processed_dir, MANIFEST_FILENAME))
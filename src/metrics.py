@@ -0,0 +1,272 @@
+"""
+In-process ingest metrics: counters and histograms keyed by metric name and label values.
+
+Hot paths record into the process-wide registry from get_metrics() (or time a block with
+timer(...) / @timed(...)); nothing is exported until export() writes a Prometheus text file
+(textfile-collector format) and a JSON summary. Parser loops record once per page or per
+statement, never per line. Worker processes of IngestPipeline.run_many start with an empty
+registry and send a snapshot() back, which the parent merge()s.
+
+StageProfiler collects cProfile statistics per pipeline stage for run_parser --profile.
+"""
+import os
+import json
+import time
+import bisect
+import cProfile
+import pstats
+import tempfile
+import threading
+import functools
+from contextlib import contextmanager
+
+from src.logger import get_logger
+
+METRIC_PREFIX = 'finance_'
+# Seconds; covers one tokenizer page (ms) up to a large PDF extraction (tens of seconds)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, text):
+        """Help text shown above the metric in the Prometheus export."""
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        """Add value to the counter name{labels}."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one observation (e.g. seconds) in the histogram name{labels}."""
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'max': 0.0}
+            histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall time of the with-block in the histogram name{labels}, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name, **labels):
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def histogram_count(self, name, **labels):
+        histogram = self._histograms.get((name, _label_key(labels)))
+        return sum(histogram['counts']) if histogram else 0
+
+    def snapshot(self):
+        """Picklable copy of every counter and histogram (see merge)."""
+        with self._lock:
+            return {
+                'buckets': self.buckets,
+                'help': dict(self._help),
+                'counters': dict(self._counters),
+                'histograms': {key: {'counts': list(h['counts']), 'sum': h['sum'], 'max': h['max']}
+                               for key, h in self._histograms.items()},
+            }
+
+    def merge(self, snapshot):
+        """Add another registry's snapshot (e.g. from a worker process) into this one."""
+        if snapshot['buckets'] != self.buckets:
+            raise ValueError("Cannot merge metrics recorded with different histogram buckets")
+        with self._lock:
+            self._help.update(snapshot['help'])
+            for key, value in snapshot['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, other in snapshot['histograms'].items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    self._histograms[key] = {'counts': list(other['counts']), 'sum': other['sum'], 'max': other['max']}
+                    continue
+                histogram['counts'] = [a + b for a, b in zip(histogram['counts'], other['counts'])]
+                histogram['sum'] += other['sum']
+                histogram['max'] = max(histogram['max'], other['max'])
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        """Prometheus text exposition format; counter names end in _total, histograms are cumulative."""
+        snapshot = self.snapshot()
+        lines = []
+        for kind, entries in (('counter', snapshot['counters']), ('histogram', snapshot['histograms'])):
+            for name in sorted({name for name, _ in entries}):
+                metric = METRIC_PREFIX + name
+                if name in snapshot['help']:
+                    lines.append(f"# HELP {metric} {snapshot['help'][name]}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for (entry_name, key), value in sorted(entries.items()):
+                    if entry_name != name:
+                        continue
+                    if kind == 'counter':
+                        lines.append(f"{metric}{_format_labels(key)} {value:g}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ('+Inf',), value['counts']):
+                        cumulative += count
+                        le = bound if bound == '+Inf' else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {value['sum']:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """JSON-friendly summary: counter values, and count/sum/mean/max per histogram."""
+        snapshot = self.snapshot()
+        counters = [{'name': name, 'labels': dict(key), 'value': value}
+                    for (name, key), value in sorted(snapshot['counters'].items())]
+        histograms = []
+        for (name, key), histogram in sorted(snapshot['histograms'].items()):
+            count = sum(histogram['counts'])
+            histograms.append({
+                'name': name,
+                'labels': dict(key),
+                'count': count,
+                'sum': round(histogram['sum'], 6),
+                'mean': round(histogram['sum'] / count, 6) if count else None,
+                'max': round(histogram['max'], 6),
+            })
+        return {'counters': counters, 'histograms': histograms}
+
+    def export(self, output_dir, name='ingest'):
+        """Write <name>.prom and <name>.json to output_dir (each replaced atomically); returns both paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        prom_path = os.path.join(output_dir, f"{name}.prom")
+        json_path = os.path.join(output_dir, f"{name}.json")
+        for path, text in ((prom_path, self.to_prometheus()), (json_path, json.dumps(self.summary(), indent=2))):
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=output_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        get_logger().info(f"Exported metrics to {prom_path} and {json_path}")
+        return prom_path, json_path
+
+
+_metrics = None
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+        for name, text in METRIC_HELP.items():
+            _metrics.describe(name, text)
+    return _metrics
+
+
+def timer(name, **labels):
+    """Time a with-block into the process-wide registry."""
+    return get_metrics().timer(name, **labels)
+
+
+def timed(name, **labels):
+    """Decorator: time every call of the function into the histogram name{labels}."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def get_metrics_dir():
+    """Directory run_parser exports metrics to (`metrics.dir`); None when unset or empty."""
+    from src.config_loader import get_config
+    config = get_config() or {}
+    options = config.get('metrics') or {}
+    if 'dir' in options:
+        return options['dir'] or None
+    return os.path.join((config.get('data') or {}).get('processed_dir', 'data/processed'), 'metrics')
+
+
+METRIC_HELP = {
+    'stage_seconds': 'Wall time of each ingest pipeline stage.',
+    'stage_rows_total': 'Rows returned by each ingest pipeline stage.',
+    'parse_statement_seconds': 'Wall time of parse_statement (detect to standardize) per statement.',
+    'statements_parsed_total': 'Statements parsed, by parser.',
+    'parser_extract_seconds': 'Time a parser waited for page text (PDF extraction or cache reads) per statement.',
+    'parser_match_seconds': 'Time a parser spent matching and tokenizing lines per statement.',
+    'parser_pages_total': 'Pages streamed into parsers.',
+    'parser_lines_total': 'Lines streamed into parsers.',
+    'parser_transactions_total': 'Transactions emitted by parsers.',
+    'standardize_seconds': 'Wall time of standardize_transactions per call.',
+    'standardize_rows_total': 'Rows standardized.',
+    'persist_seconds': 'Wall time of save_to_processed per call.',
+    'persist_rows_total': 'Rows saved to processed files, by format.',
+    'analyze_seconds': 'Wall time of analyze_finances per call.',
+    'analyze_rows_total': 'Rows analyzed.',
+}
+
+
+class StageProfiler:
+    """
+    cProfile statistics per pipeline stage, accumulated over every file. dump() writes
+    <stage>.prof (load with pstats or snakeviz) and <stage>.txt (top functions by cumulative time).
+    Only one stage is profiled at a time; a stage started inside another is counted in the outer one.
+    """
+    def __init__(self, output_dir, top=40):
+        self.output_dir = output_dir
+        self.top = top
+        self.stats = {}
+        self._active = False
+
+    def run(self, stage, func, *args, **kwargs):
+        if self._active:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        self._active = True
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self._active = False
+            if stage in self.stats:
+                self.stats[stage].add(profile)
+            else:
+                self.stats[stage] = pstats.Stats(profile)
+
+    def dump(self):
+        """Write the per-stage files; returns the paths written."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        for stage, stats in self.stats.items():
+            prof_path = os.path.join(self.output_dir, f"{stage}.prof")
+            stats.dump_stats(prof_path)
+            text_path = os.path.join(self.output_dir, f"{stage}.txt")
+            with open(text_path, 'w', encoding='utf-8') as f:
+                stats.stream = f
+                stats.sort_stats('cumulative').print_stats(self.top)
+            paths += [prof_path, text_path]
+        return paths
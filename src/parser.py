@@ -1,73 +1,140 @@
-
 # --- Imports and global variables ---
 import os
 import re
+import importlib
+from collections import namedtuple
 from src.logger import get_logger
-from src.parsers.icici_credit_card_parser import ICICICreditCardParser
-from src.parsers.icici_savings_bank_statement_parser import ICICISavingsBankStatementParser
-from src.parsers.axis_bank_statement_parser import AxisBankStatementParser
-from src.parsers.amex_credit_card_parser import AmexCreditCardParser
-# from parsers.upi_statement_parser import UPIStatementParser  # Disabled: not available
-# from parsers.hdfc_credit_card_parser import HDFCCreditCardParser  # Placeholder for future
-# from parsers.sbi_bank_statement_parser import SBIBankStatementParser  # Placeholder for future
 
-BANK_MAPPINGS = {
-    "icici_credit_card": ICICICreditCardParser,
-    "icici_savings": ICICISavingsBankStatementParser,
-    "axis": AxisBankStatementParser,
-    "amex": AmexCreditCardParser,
+ParserSpec = namedtuple('ParserSpec', ['key', 'target', 'fingerprint'])
+
+# bank key -> (parser class as "<module in src/parsers>.<Class>", first-page fingerprint). Overridden by
+# the `parsers:` section of config.yaml. Every fingerprint pattern must match the first page
+# (case-insensitive); specs are tried in order, so more specific layouts come first.
+DEFAULT_PARSERS = {
+    "amex": ("amex_credit_card_parser.AmexCreditCardParser", [r"American\s*Express|americanexpress"]),
+    "icici_credit_card": ("icici_credit_card_parser.ICICICreditCardParser",
+                          [r"Card\s*Holder\s*Name", r"Credit\s*Limit", r"Reward\s*point"]),
+    "icici_savings": ("icici_savings_bank_statement_parser.ICICISavingsBankStatementParser",
+                      [r"www\.icicibank\.com", r"Base\s*Branch"]),
+    "axis": ("axis_bank_statement_parser.AxisBankStatementParser", [r"UTIB0\d{6}", r"Cust\s*ID"]),
     # "upi": UPIStatementParser,  # Disabled: not available
     # "hdfc_credit_card": HDFCCreditCardParser,
     # "sbi": SBIBankStatementParser,
 }
 
-# --- Main function ---
-def parse_statement(file_path):
-    logger = get_logger()
+_registry = None
+_classes = {}
+# file SHA-256 -> bank key its first page matched (None: no fingerprint matched)
+_detections = {}
+
+
+def get_parser_registry():
+    """ParserSpecs in detection order, from config.yaml `parsers:` (falling back to DEFAULT_PARSERS)."""
+    global _registry
+    if _registry is None:
+        from src.config_loader import get_config
+        configured = (get_config() or {}).get('parsers') or {}
+        specs = []
+        for key, entry in (configured or DEFAULT_PARSERS).items():
+            target, fingerprint = DEFAULT_PARSERS.get(key, (None, []))
+            if isinstance(entry, dict):
+                target = entry.get('class', target)
+                fingerprint = entry.get('fingerprint', fingerprint)
+            elif isinstance(entry, str):
+                target = entry
+            elif entry:
+                target, fingerprint = entry
+            if not target:
+                continue
+            patterns = [re.compile(pattern, re.IGNORECASE) for pattern in fingerprint or []]
+            specs.append(ParserSpec(key, target, patterns))
+        _registry = specs
+    return _registry
+
+
+def load_parser(key):
+    """Import (on first use) and return the parser class registered under key."""
+    parser_cls = _classes.get(key)
+    if parser_cls is None:
+        spec = next((spec for spec in get_parser_registry() if spec.key == key), None)
+        if spec is None:
+            raise ValueError(f"No parser registered for {key}")
+        module_name, class_name = spec.target.rsplit('.', 1)
+        module = importlib.import_module(f"src.parsers.{module_name}")
+        parser_cls = _classes[key] = getattr(module, class_name)
+    return parser_cls
+
+
+# --- Detection ---
+def detect_by_content(file_path):
+    """
+    Bank key whose fingerprint matches the statement's first page, or None. Only the first page is
+    read (from the extraction cache when possible), and the decision is cached by file hash.
+    """
+    from src.extract_utils import file_digest, read_first_page
+    digest = file_digest(file_path)
+    if digest in _detections:
+        return _detections[digest]
+    try:
+        first_page = read_first_page(file_path, digest=digest)
+    except Exception as e:
+        get_logger().warning(f"Could not read the first page of {file_path} for detection: {e}")
+        return None
+    bank_key = next((spec.key for spec in get_parser_registry()
+                     if spec.fingerprint and all(pattern.search(first_page) for pattern in spec.fingerprint)), None)
+    _detections[digest] = bank_key
+    return bank_key
+
+
+def detect_by_path(file_path):
+    """Bank key named by the statement's file or folder names (e.g. icici/credit_card/...), or None."""
     file_name = os.path.basename(file_path).lower().replace('_', ' ').replace('-', ' ')
     folder_parts = [re.sub(r'[_\-]', ' ', part.lower()) for part in os.path.normpath(os.path.dirname(file_path)).split(os.sep)]
-    logger.info(f"[DEBUG] file_name: {file_name}")
-    logger.info(f"[DEBUG] folder_parts: {folder_parts}")
-    bank_key = None
+    get_logger().debug("Detecting parser by path: file_name=%s folder_parts=%s", file_name, folder_parts)
     # Flexible ICICI detection using regex and substring matching
     icici_in_path = any(re.search(r'icici', part) for part in folder_parts) or re.search(r'icici', file_name)
     if icici_in_path:
         credit_card_in_path = any(re.search(r'credit\s*card', part) for part in folder_parts) or re.search(r'credit\s*card', file_name)
         bank_in_path = any(re.search(r'bank|savings|statement', part) for part in folder_parts) or re.search(r'bank|savings|statement', file_name)
         if credit_card_in_path:
-            bank_key = "icici_credit_card"
-        elif bank_in_path:
-            bank_key = "icici_savings"
+            return "icici_credit_card"
+        if bank_in_path:
+            return "icici_savings"
     # Fallback to original detection for other banks (flexible)
-    if not bank_key:
-        for key, parser_cls in BANK_MAPPINGS.items():
-            key_pattern = re.sub(r'_', ' ', key)
-            if re.search(key_pattern, file_name) or any(re.search(key_pattern, part) for part in folder_parts):
-                bank_key = key
-                break
-    if bank_key and bank_key in BANK_MAPPINGS:
-        parser_cls = BANK_MAPPINGS[bank_key]
-        parser = parser_cls(file_path)
-        try:
-            result = parser.parse()
-            if isinstance(result, tuple) and len(result) == 2:
-                df, metadata = result
-            else:
-                df = result
-                metadata = {
-                    "source": bank_key,
-                    "is_credit_card": "credit_card" in bank_key,
-                    "parser": parser_cls.__name__
-                }
-            from src.standardizer import standardize_transactions
-            df = standardize_transactions(df, metadata)
-            logger.info(f"Parsed {len(df)} transactions from {file_path} using {parser_cls.__name__}")
-            return df, metadata
-        except Exception as e:
-            logger.error(f"Failed to parse {file_path} with {parser_cls.__name__}: {e}")
-            raise
-    logger.error(f"Bank or statement type not supported or not detected in file name: {file_name} or folders: {folder_parts}")
-    raise ValueError("Bank or statement type not supported or not detected in file name or folders.")
+    for spec in get_parser_registry():
+        key_pattern = re.sub(r'_', ' ', spec.key)
+        if re.search(key_pattern, file_name) or any(re.search(key_pattern, part) for part in folder_parts):
+            return spec.key
+    return None
+
+
+def detect_parser(file_path):
+    """
+    Return (bank_key, parser class) for a statement, or raise ValueError when unsupported. The
+    first page's content decides; file and folder names are only used when no fingerprint matches.
+    The parser module is imported only once a statement is routed to it.
+    """
+    logger = get_logger()
+    bank_key = detect_by_content(file_path)
+    how = "content"
+    if bank_key is None:
+        bank_key, how = detect_by_path(file_path), "path"
+    if bank_key is not None:
+        logger.info(f"Detected {bank_key} for {file_path} by {how}")
+        return bank_key, load_parser(bank_key)
+    logger.error(f"Bank or statement type not supported or not detected in the content or path of: {file_path}")
+    raise ValueError("Bank or statement type not supported or not detected in file content, name or folders.")
+
+# --- Main function ---
+def parse_statement(file_path, pipeline=None):
+    """
+    Detect, extract, parse, categorize and standardize one statement, each stage exactly once.
+    Pass an IngestPipeline to collect the per-stage timings.
+    """
+    from src.pipeline import IngestPipeline
+    pipeline = pipeline or IngestPipeline()
+    result = pipeline.run(file_path)
+    return result.df, result.metadata
 
 # --- CLI/test block ---
 if __name__ == "__main__":
@@ -84,4 +151,3 @@ if __name__ == "__main__":
         print(df.head(10))
     except Exception as e:
         logger.error(f"Failed to parse statement: {e}")
-
@@ -1,9 +1,88 @@
+import time
+import logging
 from abc import ABC, abstractmethod
 import pandas as pd
+from src.extract_utils import iter_statement_pages
+from src.logger import get_logger, log_event
+from src.metrics import get_metrics
+from src.schema import mark_stage
 
 class BaseParser(ABC):
     def __init__(self, file_path):
         self.file_path = file_path
+        self.lines_read = 0
+        self.pages_read = 0
+        self.extract_seconds = 0.0
+
+    def iter_pages(self):
+        """
+        Stream the statement text page by page, from pdfplumber (or the extraction cache) for PDFs
+        and in fixed-size line chunks for text files. The time spent waiting for each page is added
+        to extract_seconds.
+        """
+        self.lines_read = 0
+        self.pages_read = 0
+        self.extract_seconds = 0.0
+        pages = iter_statement_pages(self.file_path)
+        while True:
+            start = time.perf_counter()
+            page = next(pages, None)
+            self.extract_seconds += time.perf_counter() - start
+            if page is None:
+                return
+            self.pages_read += 1
+            self.lines_read += page.count('\n') + (0 if not page or page.endswith('\n') else 1)
+            yield page
+
+    def iter_lines(self):
+        """
+        Stream the statement one line at a time so peak memory does not grow with statement length.
+        """
+        for page in self.iter_pages():
+            yield from page.splitlines()
+
+    @abstractmethod
+    def iter_transactions(self):
+        """
+        Yield one transaction dict at a time. Parsers implement this to emit records incrementally.
+        """
+        pass
+
+    def read_frame(self) -> pd.DataFrame:
+        """
+        Run the parse stage only: collect the raw transactions into a DataFrame with the required
+        columns, without categorizing or standardizing them. Extraction and matching times and the
+        page, line and transaction counts are recorded once per statement (src.metrics).
+        """
+        start = time.perf_counter()
+        self.transactions = list(self.iter_transactions())
+        self._record_metrics(time.perf_counter() - start)
+        log_event(get_logger(), logging.INFO, 'statement_read', file=self.file_path, parser=type(self).__name__,
+                  pages=self.pages_read, lines=self.lines_read, transactions=len(self.transactions))
+        df = pd.DataFrame(self.transactions)
+        # Defensive: ensure required columns exist
+        required_cols = ['date', 'description', 'amount', 'type']
+        for col in required_cols:
+            if col not in df.columns:
+                df[col] = '' if col in ['date', 'description', 'type'] else 0.0
+        return mark_stage(df, 'parse')
+
+    def _record_metrics(self, seconds):
+        metrics = get_metrics()
+        parser = type(self).__name__
+        # iter_transactions interleaves page reads with matching; whatever was not spent waiting for pages is matching
+        metrics.observe('parser_extract_seconds', self.extract_seconds, parser=parser)
+        metrics.observe('parser_match_seconds', max(seconds - self.extract_seconds, 0.0), parser=parser)
+        metrics.inc('parser_pages_total', self.pages_read, parser=parser)
+        metrics.inc('parser_lines_total', self.lines_read, parser=parser)
+        metrics.inc('parser_transactions_total', len(self.transactions), parser=parser)
+
+    def statement_metadata(self):
+        """
+        Metadata (source, is_credit_card, parser) reported for this statement type, or None when
+        the caller should derive it from the detected bank.
+        """
+        return None
 
     @abstractmethod
     def parse(self) -> pd.DataFrame:
@@ -0,0 +1,187 @@
+"""
+Shared, precompiled tokenizer for statement text.
+
+Parsers hand whole page buffers to the tokenizer instead of testing every line: dated lines
+and multi-line transaction blocks are located with a single MULTILINE finditer per page,
+and each dated line is classified once into date / description / amount / flag tokens.
+"""
+import re
+from collections import namedtuple
+
+DATE_DMY = r'\d{2}-\d{2}-\d{4}'
+# ICICI credit card statements also contain two-digit-year dates that end a description
+DATE_DMY_SHORT_YEAR = r'\d{2}-\d{2}-\d{2,4}'
+
+AMEX_DATE = r'[A-Za-z]+ \d{1,2}'
+
+# Whitespace other than a newline, so MULTILINE patterns never run into the next line
+_HSPACE = r'[^\S\n]*'
+
+DATE_DMY_RE = re.compile(r'(' + DATE_DMY + r')')
+FIRST_TOKEN_RE = re.compile(r'\S+')
+
+# A whitespace-delimited numeric token: digits and thousands commas with an optional decimal part.
+# "stop" marks tokens that end a description: plain integers, or at most three integer digits
+# before the decimal point (larger amounts such as 10,500.00 stay part of the description text).
+NUMERIC_TOKEN_RE = re.compile(
+    r'(?<!\S),*(?:(?P<stop>\d[\d,]*|(?:\d,*){1,3}\.[\d,]*)|\d[\d,]*\.[\d,]*)(?!\S)'
+)
+
+# An ICICI credit card transaction line matched inside a page buffer, together with its wrapped
+# description lines (every following line up to the next dated line) captured in the last group.
+ICICI_CC_BLOCK_RE = re.compile(
+    r'^[^\S\n]*(\d{2}-\d{2}-\d{4})[^\S\n]+(.+?)[^\S\n]+(\d+[,.]*\d*)[^\S\n]*(Dr\.|Cr\.)[^\S\n]*(\d{8,})[^\S\n]*$'
+    r'((?:\n(?![^\S\n]*\d{2}-\d{2}-\d{2,4}).*)*)',
+    re.MULTILINE
+)
+AMEX_DATE_RE = re.compile(r'^([A-Za-z]+) (\d{1,2})')
+AMEX_AMOUNT_RE = re.compile(r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*(Cr\.?)?$')
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('january', 'jan'), ('february', 'feb'), ('march', 'mar'), ('april', 'apr'),
+        ('may',), ('june', 'jun'), ('july', 'jul'), ('august', 'aug'),
+        ('september', 'sep'), ('october', 'oct'), ('november', 'nov'), ('december', 'dec'),
+    ], start=1)
+    for name in names
+}
+
+LineTokens = namedtuple('LineTokens', ['date', 'description', 'amounts', 'flag'])
+
+_line_patterns = {}
+_block_patterns = {}
+
+
+def _line_pattern(start_pattern):
+    pattern = _line_patterns.get(start_pattern)
+    if pattern is None:
+        pattern = re.compile(r'^' + _HSPACE + r'(?:' + start_pattern + r').*$', re.MULTILINE)
+        _line_patterns[start_pattern] = pattern
+    return pattern
+
+
+def _block_pattern(start_pattern):
+    pattern = _block_patterns.get(start_pattern)
+    if pattern is None:
+        pattern = re.compile(r'^' + _HSPACE + r'(?:' + start_pattern + r')', re.MULTILINE)
+        _block_patterns[start_pattern] = pattern
+    return pattern
+
+
+def iter_matching_lines(pages, start_pattern):
+    """Yield the stripped lines of each page buffer that start with start_pattern."""
+    pattern = _line_pattern(start_pattern)
+    for page in pages:
+        for match in pattern.finditer(page):
+            yield match.group(0).strip()
+
+
+def iter_blocks(pages, start_pattern):
+    """
+    Yield transaction blocks: a line starting with start_pattern plus every following line up to
+    the next such line. Blocks may continue across page boundaries. Lines before the first
+    block are ignored. Each block is returned as its non-empty stripped lines.
+    """
+    pattern = _block_pattern(start_pattern)
+    carry = None
+    for page in pages:
+        starts = [match.start() for match in pattern.finditer(page)]
+        head_end = starts[0] if starts else len(page)
+        if carry is not None:
+            carry.append(page[:head_end])
+        if not starts:
+            continue
+        if carry is not None:
+            yield _block_lines(''.join(carry))
+        for start, end in zip(starts, starts[1:]):
+            yield _block_lines(page[start:end])
+        carry = [page[starts[-1]:]]
+    if carry is not None:
+        yield _block_lines(''.join(carry))
+
+
+def _block_lines(block):
+    return [line for line in map(str.strip, block.splitlines()) if line]
+
+
+def tokenize_bank_line(line):
+    """
+    Classify a dated bank statement line (or joined block) in one pass.
+    Returns None when the line does not start with a dd-mm-yyyy date.
+    """
+    date_match = DATE_DMY_RE.match(line)
+    if not date_match:
+        return None
+    first_token = FIRST_TOKEN_RE.match(line)
+    desc_start = first_token.end() if first_token else 0
+    desc_end = None
+    amounts = []
+    for match in NUMERIC_TOKEN_RE.finditer(line):
+        amounts.append(float(match.group(0).replace(',', '')))
+        if desc_end is None and match.group('stop') is not None and match.start() >= desc_start:
+            desc_end = match.start()
+    description = ' '.join(line[desc_start:desc_end].split())
+    return LineTokens(date_match.group(1), description, amounts, None)
+
+
+def iter_icici_cc_transactions(pages):
+    """
+    Yield (LineTokens, reference, continuation_lines) for every ICICI credit card transaction,
+    scanning each page buffer with one finditer. Wrapped descriptions may continue onto the next page.
+    """
+    dated_line = _block_pattern(DATE_DMY_SHORT_YEAR)
+    pending = None
+    for page in pages:
+        first_dated = dated_line.search(page)
+        head_end = first_dated.start() if first_dated else len(page)
+        if pending is not None:
+            pending[2].append(page[:head_end])
+            if first_dated is None:
+                continue
+            yield _finish_icici_cc(pending)
+            pending = None
+        last = None
+        for match in ICICI_CC_BLOCK_RE.finditer(page, head_end):
+            if last is not None:
+                yield _finish_icici_cc(last)
+            last = (match, match.group(5), [match.group(6)])
+        if last is not None:
+            if not page[last[0].end():].strip():
+                # Ran to the end of the page: the description may continue on the next one
+                pending = last
+            else:
+                yield _finish_icici_cc(last)
+    if pending is not None:
+        yield _finish_icici_cc(pending)
+
+
+def _finish_icici_cc(entry):
+    match, reference, continuation = entry
+    amount = float(match.group(3).replace(',', ''))
+    tokens = LineTokens(match.group(1), match.group(2), [amount], match.group(4))
+    return tokens, reference, _block_lines(''.join(continuation))
+
+
+def tokenize_amex_line(line):
+    """
+    Classify an Amex line such as "August 2 IRCTC DELHI 1,390.00 Cr". The date token is returned
+    as (month_number, day) because the statement year comes from the file name.
+    """
+    date_match = AMEX_DATE_RE.match(line)
+    if not date_match or len(line.split(None, 2)) < 3:
+        return None
+    amount_match = AMEX_AMOUNT_RE.search(line)
+    if not amount_match:
+        return None
+    amount = float(amount_match.group(1).replace(',', ''))
+    desc_start = len(date_match.group(0))
+    desc_end = line.rfind(amount_match.group(0))
+    description = line[desc_start:desc_end].strip()
+    date = (month_number(date_match.group(1)), int(date_match.group(2)))
+    return LineTokens(date, description, [amount], amount_match.group(2))
+
+
+def month_number(name, default=8):
+    """Month number for a full or abbreviated English month name (falls back to August)."""
+    return MONTHS.get(name.lower(), default)
@@ -0,0 +1,346 @@
+"""
+Staged ingest pipeline: fingerprint -> detect -> extract -> parse -> categorize -> standardize -> reconcile -> persist
+-> aggregate -> analyze -> render.
+
+Every stage runs once per statement. Stages that transform the frame tag it in df.attrs (see
+src.schema.mark_stage), so a frame handed to standardize_transactions or categorize_transactions
+a second time is returned unchanged. Each stage records its wall time and input/output row counts.
+Frames combining several accounts go through reconcile, which flags transfers between them
+(src.reconcile) so analysis counts them once. Persisted statements are upserted into the ledger
+(src.ledger) by transaction_id and merged into the aggregate cube (src.aggregates) kept next to the processed
+data. Report plots are rendered in the background (src.plotting); the render stage waits for them.
+run_many fans several files out to a process pool, one file per worker task; iter_many yields the
+outcomes in order and keeps only a few files in flight. A combined ingest makes two passes over its
+statements (save_statements, then reconciled_statements), so it holds one statement frame plus the
+possible transfer legs of all of them, never the whole batch.
+The fingerprint stage checks an input file against the manifest (src.manifest) so a statement
+that was ingested before and has not changed is read back from its processed file, not parsed.
+Stage times and row counts also go to the process-wide metrics registry (src.metrics); give the
+pipeline a StageProfiler to collect cProfile statistics per stage as well. Categorization uses the
+configured persistent category cache unless the pipeline is given category_cache=None (or a
+CategoryCache of its own).
+"""
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from src.logger import get_logger
+from src.categorizer import categorize_transactions
+from src.standardizer import standardize_transactions
+from src.extract_utils import iter_pdf_pages, limit_extraction_workers
+from src.metrics import get_metrics
+
+STAGES = ['fingerprint', 'detect', 'extract', 'parse', 'categorize', 'standardize', 'reconcile', 'persist', 'aggregate', 'analyze', 'render']
+
+StageTiming = namedtuple('StageTiming', ['file', 'stage', 'seconds', 'rows_in', 'rows_out'])
+PipelineResult = namedtuple('PipelineResult', ['df', 'metadata', 'processed_path', 'skipped'], defaults=[False])
+IngestOutcome = namedtuple('IngestOutcome', ['file', 'result', 'error'])
+SavedStatement = namedtuple('SavedStatement', ['file', 'source', 'processed_path', 'rows', 'skipped'])
+
+
+def _rows(value):
+    # Stages report a DataFrame (or a (df, metadata) tuple), or a plain count such as pages extracted
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        value = value[0]
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+class IngestPipeline:
+    def __init__(self, processed_dir=None, output_format='csv', aggregates_path=None, profiler=None, category_cache=True):
+        self.processed_dir = processed_dir
+        self.output_format = output_format
+        self.aggregates_path = aggregates_path
+        self.profiler = profiler
+        self.category_cache = category_cache
+        self.timings = []
+        self.logger = get_logger()
+
+    def run_stage(self, stage, func, *args, file=None, **kwargs):
+        """Call func(*args, **kwargs) as the named stage and record its wall time and row counts."""
+        rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+        start = time.perf_counter()
+        if self.profiler is not None:
+            result = self.profiler.run(stage, func, *args, **kwargs)
+        else:
+            result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        timing = StageTiming(file, stage, seconds, rows_in, _rows(result))
+        self.timings.append(timing)
+        metrics = get_metrics()
+        metrics.observe('stage_seconds', seconds, stage=stage)
+        if timing.rows_out is not None:
+            metrics.inc('stage_rows_total', timing.rows_out, stage=stage)
+        self.logger.info(f"Stage {stage} took {seconds:.3f}s (rows in={timing.rows_in}, out={timing.rows_out}) for {file}")
+        return result
+
+    def run(self, file_path, persist=False, original_path=None):
+        """
+        Run detect through standardize (and persist when requested) for one statement file.
+        Returns a PipelineResult; processed_path is None unless the frame was persisted.
+        """
+        from src.parser import detect_parser
+        name = os.path.basename(file_path)
+        start = time.perf_counter()
+        bank_key, parser_cls = self.run_stage('detect', detect_parser, file_path, file=name)
+        if file_path.lower().endswith('.pdf'):
+            # Warm the extraction cache so the parser streams pages from it
+            self.run_stage('extract', self._extract, file_path, file=name)
+        parser = parser_cls(file_path)
+        try:
+            df = self.run_stage('parse', parser.read_frame, file=name)
+        except Exception as e:
+            self.logger.error(f"Failed to parse {file_path} with {parser_cls.__name__}: {e}")
+            raise
+        metadata = parser.statement_metadata() or {
+            "source": bank_key,
+            "is_credit_card": "credit_card" in bank_key,
+            "parser": parser_cls.__name__
+        }
+        df = self.run_stage('categorize', categorize_transactions, df, cache=self.category_cache, file=name)
+        df = self.run_stage('standardize', standardize_transactions, df, metadata, file=name)
+        self.logger.info(f"Parsed {len(df)} transactions from {file_path} using {parser_cls.__name__}")
+        metrics = get_metrics()
+        metrics.observe('parse_statement_seconds', time.perf_counter() - start, parser=parser_cls.__name__)
+        metrics.inc('statements_parsed_total', parser=parser_cls.__name__)
+        processed_path = None
+        if persist and not df.empty:
+            processed_path = self.persist(df, metadata.get('source', 'Unknown'), name, original_path=original_path)
+        return PipelineResult(df, metadata, processed_path)
+
+    def run_many(self, file_paths, jobs=1):
+        """
+        Run detect through standardize for every file, in `jobs` worker processes (1 = one after
+        another in this process). Returns IngestOutcome(file, result, error) in file_paths order;
+        a file that fails gets result=None and the error message without affecting the others.
+        Worker stage timings are added to self.timings in the same order, and their metrics to this
+        process's registry. Holds every result; iterate iter_many to take them one at a time.
+        """
+        return list(self.iter_many(file_paths, jobs=jobs))
+
+    def iter_many(self, file_paths, jobs=1):
+        """
+        Yield run_many's outcomes in file_paths order, each as soon as it is ready. At most 2 * jobs
+        files are queued or parsed ahead of the one being consumed, so a large batch never holds
+        more than those frames at once.
+        """
+        file_paths = list(file_paths)
+        if jobs <= 1 or len(file_paths) <= 1:
+            for path in file_paths:
+                try:
+                    outcome = IngestOutcome(path, self.run(path), None)
+                except Exception as e:
+                    self.logger.error(f"Failed to ingest {path}: {e}")
+                    outcome = IngestOutcome(path, None, f"{type(e).__name__}: {e}")
+                yield outcome
+            return
+        workers = min(jobs, len(file_paths))
+        self.logger.info(f"Ingesting {len(file_paths)} files with {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            remaining = iter(file_paths)
+
+            def submit(path):
+                return path, pool.submit(_run_file, path, self.processed_dir, self.output_format, self.category_cache)
+
+            window = deque(submit(path) for path in islice(remaining, 2 * workers))
+            for done in range(1, len(file_paths) + 1):
+                path, future = window.popleft()
+                try:
+                    result, error, timings, metrics = future.result()
+                    get_metrics().merge(metrics)
+                except Exception as e:
+                    # The worker process itself died, or its result could not be sent back
+                    result, error, timings = None, f"{type(e).__name__}: {e}", []
+                self.timings.extend(timings)
+                window.extend(submit(path) for path in islice(remaining, 1))
+                if error is None:
+                    self.logger.info(f"Ingested {path}: {len(result.df)} rows ({done}/{len(file_paths)})")
+                else:
+                    self.logger.error(f"Failed to ingest {path}: {error}")
+                yield IngestOutcome(path, result, error)
+
+    def load_unchanged(self, file_path):
+        """
+        If the manifest shows file_path was ingested before and has not changed since, return a
+        PipelineResult (skipped=True) holding the rows saved back then; otherwise None, and the file
+        has to go through run. The processed file must still hold exactly those rows (its content
+        hash matches the manifest entry); if it was replaced or edited since, the file is parsed again.
+        """
+        from src.io_utils import DEFAULT_PROCESSED_DIR, load_processed
+        from src.manifest import get_manifest
+        from src.schema import frame_fingerprint
+        name = os.path.basename(file_path)
+        processed_dir = self.processed_dir or DEFAULT_PROCESSED_DIR
+        entry = self.run_stage('fingerprint', get_manifest(processed_dir).unchanged, file_path, file=name)
+        if entry is None:
+            return None
+        processed_path = os.path.join(processed_dir, entry['filename'])
+        if not os.path.exists(processed_path):
+            self.logger.info(f"{file_path} is unchanged but {processed_path} is gone; parsing it again")
+            return None
+        df = load_processed(processed_path)
+        if entry['content_hash'] and frame_fingerprint(df) != entry['content_hash']:
+            self.logger.info(f"{file_path} is unchanged but {processed_path} no longer holds its rows; parsing it again")
+            return None
+        metadata = {
+            "source": entry['source'],
+            "is_credit_card": bool(df['is_credit_card'].any()) if 'is_credit_card' in df.columns else False,
+            "skipped": True,
+        }
+        self.logger.info(f"Skipping unchanged {file_path}: ingested before as {processed_path}")
+        return PipelineResult(df, metadata, processed_path, True)
+
+    def reconcile(self, df, name=None):
+        """Flag transfers between the accounts in df (`analysis.transfer_tolerance_days` apart at most)."""
+        from src.config_loader import get_config
+        from src.reconcile import DEFAULT_TOLERANCE_DAYS, reconcile_transfers
+        options = (get_config() or {}).get('analysis') or {}
+        return self.run_stage('reconcile', reconcile_transfers, df,
+                              tolerance_days=options.get('transfer_tolerance_days', DEFAULT_TOLERANCE_DAYS), file=name)
+
+    def save_statements(self, statements):
+        """
+        First pass of a combined ingest over statements, an iterable of (file, PipelineResult) taken
+        one at a time: persist each that is not saved yet (processed_path is None) and keep only its
+        possible transfer legs (src.reconcile.transfer_legs). Returns (saved, legs): a SavedStatement
+        per non-empty statement, in order, and their legs with rows shared by overlapping statements
+        kept once. Hand both to reconciled_statements.
+        """
+        from src.reconcile import LEG_COLUMNS, transfer_legs
+        saved, legs = [], []
+        for file, result in statements:
+            df = result.df
+            if df is None or df.empty:
+                continue
+            source = result.metadata.get('source', 'Unknown')
+            path = result.processed_path or self.persist(df, source, os.path.basename(file), original_path=file)
+            saved.append(SavedStatement(file, source, path, len(df), result.skipped))
+            legs.append(transfer_legs(df))
+        if not legs:
+            return saved, pd.DataFrame(columns=['transaction_id'] + LEG_COLUMNS)
+        return saved, pd.concat(legs, ignore_index=True).drop_duplicates(subset=['transaction_id'], ignore_index=True)
+
+    def reconciled_statements(self, saved, legs, name=None):
+        """
+        Second pass: flag the transfers among legs, then yield each saved statement read back from its
+        processed file with its `is_internal_transfer` and `transfer_id` columns, one at a time. A
+        statement whose flags changed is saved again, replacing its rows in the ledger and its cells
+        in the cube: it was saved without them in the first pass, or on its own in an earlier run.
+        """
+        from src.io_utils import load_processed
+        from src.schema import frame_fingerprint
+        if not saved:
+            return
+        flags = self.reconcile(legs, name=name).set_index('transaction_id')
+        for statement in saved:
+            df = load_processed(statement.processed_path)
+            ids = df['transaction_id']
+            flagged = df.assign(is_internal_transfer=flags['is_internal_transfer'].reindex(ids, fill_value=False).to_numpy(dtype=bool),
+                                transfer_id=flags['transfer_id'].reindex(ids).array)
+            if frame_fingerprint(flagged) != frame_fingerprint(df):
+                self.persist(flagged, statement.source, os.path.basename(statement.file), original_path=statement.file)
+            yield flagged
+
+    def persist(self, df, source, filename, original_path=None, history=True):
+        """
+        Save df to the processed directory. With history=True (a statement) its rows also go to the
+        partitioned transaction store and, with `analysis.cube_on_ingest` enabled, into the aggregate
+        cube. Pass history=False for frames built from other statements (e.g. combined files), so
+        they are not counted twice.
+        """
+        from src.io_utils import save_to_processed
+        path = self.run_stage('persist', save_to_processed, df, source, filename, format=self.output_format,
+                              processed_dir=self.processed_dir, original_path=original_path, store=history, file=filename)
+        if history and self._cube_on_ingest():
+            from src.aggregates import update_aggregates
+            # Keyed like the processed file, so a corrected statement replaces its earlier contribution
+            key = os.path.splitext(os.path.basename(path))[0]
+            self.run_stage('aggregate', update_aggregates, df, self.get_aggregates_path(), key=key, file=filename)
+        return path
+
+    def persist_combined(self, frames, source, filename):
+        """
+        Stream frames (one statement at a time) into a single processed file; rows repeated across
+        statements are written once (src.io_utils.save_combined). Nothing goes to the transaction
+        store, ledger or cube, so persist the statements themselves separately.
+        """
+        from src.io_utils import save_combined
+        return self.run_stage('persist', save_combined, frames, source, filename, format=self.output_format,
+                              processed_dir=self.processed_dir, file=filename)
+
+    def get_aggregates_path(self):
+        from src.aggregates import get_aggregates_path
+        return self.aggregates_path or get_aggregates_path(self.processed_dir)
+
+    @staticmethod
+    def _cube_on_ingest():
+        from src.config_loader import get_config
+        return bool(((get_config() or {}).get('analysis') or {}).get('cube_on_ingest', True))
+
+    def analyze(self, df, output_dir=None, save_plots=False, name=None, incremental=False):
+        """
+        Analyze df, or with incremental=True merge it (a frame or a list of per-statement frames)
+        into the persisted aggregates and summarize the whole history from them.
+        """
+        if incremental:
+            from src.aggregates import analyze_incremental
+            return self.run_stage('analyze', analyze_incremental, df, state_path=self.get_aggregates_path(),
+                                  output_dir=output_dir, save_plots=save_plots, name=name, file=name)
+        from src.analyzer import analyze_finances
+        return self.run_stage('analyze', analyze_finances, df, output_dir=output_dir, save_plots=save_plots,
+                              name=name, file=name)
+
+    def summarize(self, analysis, output_dir=None, save_plots=False, name=None):
+        """Summary of the statements added to analysis (a src.aggregates.StatementAnalysis), from its cube."""
+        return self.run_stage('analyze', analysis.summary, output_dir=output_dir, save_plots=save_plots, name=name, file=name)
+
+    def render(self, name=None):
+        """Wait for the report plots queued by analyze to finish rendering."""
+        from src.plotting import wait_for_plots
+        return self.run_stage('render', wait_for_plots, file=name)
+
+    @staticmethod
+    def _extract(file_path):
+        return sum(1 for _ in iter_pdf_pages(file_path))
+
+    def timings_frame(self):
+        """Recorded stage timings as a DataFrame (one row per file and stage, in run order)."""
+        timings = pd.DataFrame(self.timings, columns=StageTiming._fields)
+        return timings.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+    def format_timings(self):
+        """Plain-text table of the recorded stage timings with a per-stage total."""
+        timings = self.timings_frame()
+        if timings.empty:
+            return "No stages recorded."
+        totals = timings.groupby('stage', sort=False)['seconds'].sum()
+        lines = [timings.to_string(index=False, float_format=lambda s: f"{s:.3f}"), "", "Total per stage:"]
+        lines += [f"  {stage:<12} {seconds:8.3f}s" for stage, seconds in totals.items()]
+        lines.append(f"  {'all':<12} {totals.sum():8.3f}s")
+        return '\n'.join(lines)
+
+
+def _init_worker():
+    # Files are already spread over processes; sharding pages as well would oversubscribe the CPUs
+    limit_extraction_workers(1)
+    # A forked worker inherits the parent's metrics; only what it records itself is sent back
+    get_metrics().reset()
+
+
+def _run_file(file_path, processed_dir, output_format, category_cache=True):
+    """IngestPipeline.run_many worker: (result, error, timings, metrics snapshot) for one file; never raises."""
+    pipeline = IngestPipeline(processed_dir=processed_dir, output_format=output_format, category_cache=category_cache)
+    try:
+        result, error = pipeline.run(file_path), None
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    # Each task sends only its own metrics; the worker may take another file next
+    metrics.reset()
+    return result, error, pipeline.timings, snapshot
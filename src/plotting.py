@@ -0,0 +1,144 @@
+"""
+Report plot rendering, kept off the analysis critical path.
+
+The analyzer only describes each figure as a PlotSpec (output path, title and the plotted series).
+Specs are rendered by a small background worker pool using matplotlib's object-oriented Figure API
+on the Agg canvas, so matplotlib is imported the first time a plot is actually rendered, and no
+pyplot global state is shared between workers. Each PNG gets a `.sha256` sidecar holding the digest
+of the data it was drawn from; a spec whose digest matches the sidecar is not rendered again.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.logger import get_logger
+
+# Bump when the drawing code changes so existing PNGs are re-rendered
+RENDER_VERSION = 1
+DEFAULT_PLOT_WORKERS = 2
+
+PlotSpec = namedtuple('PlotSpec', ['path', 'title', 'series', 'xlabel', 'ylabel'], defaults=['Month', 'Amount (INR)'])
+
+
+def line_series(label, index, values):
+    """One (label, x, y) line for a PlotSpec, from a Period/Datetime index and a numeric column."""
+    return (label, [str(x) for x in index], [float(y) for y in values])
+
+
+def spec_digest(spec):
+    payload = [RENDER_VERSION, spec.title, spec.xlabel, spec.ylabel, [list(series) for series in spec.series]]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+
+
+def _sidecar_path(path):
+    return path + '.sha256'
+
+
+def is_current(spec, digest=None):
+    """True when spec.path exists and was rendered from exactly this data."""
+    digest = digest or spec_digest(spec)
+    try:
+        with open(_sidecar_path(spec.path), 'r', encoding='utf-8') as f:
+            return f.read().strip() == digest and os.path.exists(spec.path)
+    except OSError:
+        return False
+
+
+def render_plot(spec, digest=None):
+    """Render one line chart to spec.path (atomically) and record its digest next to it."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    for label, x, y in spec.series:
+        ax.plot(x, y, label=label, marker='o')
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    ax.legend()
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(spec.path) or '.', exist_ok=True)
+    tmp_path = f"{spec.path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+    fig.savefig(tmp_path)
+    os.replace(tmp_path, spec.path)
+    with open(_sidecar_path(spec.path), 'w', encoding='utf-8') as f:
+        f.write(digest or spec_digest(spec))
+    return spec.path
+
+
+class PlotRenderer:
+    def __init__(self, workers=DEFAULT_PLOT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.skipped = 0
+        self.logger = get_logger()
+
+    def submit(self, specs):
+        """Queue specs for rendering and return their futures; unchanged plots are skipped."""
+        futures = []
+        for spec in specs:
+            digest = spec_digest(spec)
+            with self._lock:
+                pending = self._pending.get(spec.path)
+                if pending is not None and pending[0] == digest and not pending[1].done():
+                    futures.append(pending[1])
+                    continue
+                if is_current(spec, digest):
+                    self.skipped += 1
+                    self.logger.debug("Plot unchanged, not re-rendering: %s", spec.path)
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='plot')
+                future = self._executor.submit(self._render, spec, digest)
+                self._pending[spec.path] = (digest, future)
+            futures.append(future)
+        return futures
+
+    def _render(self, spec, digest):
+        try:
+            path = render_plot(spec, digest)
+            with self._lock:
+                self.rendered += 1
+            self.logger.info(f"Rendered plot {path}")
+            return path
+        except Exception as e:
+            self.logger.error(f"Failed to render plot {spec.path}: {e}")
+            raise
+
+    def wait(self, timeout=None):
+        """Block until every queued plot has been written (or failed)."""
+        with self._lock:
+            futures = [future for _, future in self._pending.values()]
+        wait(futures, timeout=timeout)
+        with self._lock:
+            self._pending = {path: entry for path, entry in self._pending.items() if not entry[1].done()}
+
+
+_renderer = None
+
+
+def get_plot_renderer():
+    """Shared renderer; worker count from `analysis.plot_workers` in config.yaml."""
+    global _renderer
+    if _renderer is None:
+        from src.config_loader import get_config
+        options = (get_config() or {}).get('analysis') or {}
+        _renderer = PlotRenderer(workers=int(options.get('plot_workers', DEFAULT_PLOT_WORKERS)))
+    return _renderer
+
+
+def render_plots(specs):
+    """Render specs in the background; returns their futures."""
+    return get_plot_renderer().submit(specs)
+
+
+def wait_for_plots(timeout=None):
+    get_plot_renderer().wait(timeout=timeout)
@@ -0,0 +1,144 @@
+"""
+Cross-account transfer matching.
+
+When bank and card statements are combined, a card bill payment appears twice: as an outflow from
+the savings account and as a payment credit on the card (likewise for transfers between two bank
+accounts). Counting both inflates income and expenses, so reconcile_transfers pairs such legs and
+flags them as internal transfers.
+
+Only legs that look like transfers are candidates: a card row must be a bill payment (its
+description matches CARD_PAYMENT_PATTERN), and a bank row must name a transfer rail or payment
+(TRANSFER_PATTERN). A card purchase and an unrelated bank credit of the same amount are therefore
+never paired, which would silently drop the purchase from every analysis total.
+
+Legs are paired on the exact absolute amount and the closest date within a tolerance using
+pd.merge_asof over date-sorted frames (grouped by amount), never a cross join. Each receiving
+account is matched against outflows from the other accounts; a few passes resolve several credits
+competing for the same debit, so pairs are one-to-one. Every pass is a sort plus a linear merge.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+from src.analyzer import transaction_direction
+
+DEFAULT_TOLERANCE_DAYS = 3
+# The columns match_transfers reads; a frame of just these (plus an id) is enough to reconcile
+LEG_COLUMNS = ['date', 'description', 'amount', 'type', 'source', 'AccountType']
+MAX_PASSES = 5
+# Card bill payments ("PAYMENT RECEIVED. THANK YOU", "AUTOPAY", "BBPS ...")
+CARD_PAYMENT_PATTERN = re.compile(r'\bPAYMENT\b|THANK\s*YOU|AUTO\s*(?:PAY|DEBIT)|\bBBPS\b', re.IGNORECASE)
+# Bank rows moving money between accounts or paying a card bill
+TRANSFER_PATTERN = re.compile(r'\b(?:NEFT|IMPS|RTGS|UPI|INFT|MMT|TRANSFER|TRF|SELF|PAYMENT|AUTOPAY|BIL|BBPS)\b'
+                              r'|CREDIT\s*CARD|\bCC\b|CARD', re.IGNORECASE)
+
+
+def _account_keys(df):
+    """The account a row belongs to: its source, or AccountType when the source is unknown."""
+    if 'source' in df.columns:
+        account = df['source'].astype(object)
+        if 'AccountType' in df.columns:
+            account = account.where(account.notna(), df['AccountType'].astype(object))
+        return account.fillna('unknown').to_numpy()
+    if 'AccountType' in df.columns:
+        return df['AccountType'].astype(object).fillna('unknown').to_numpy()
+    return np.full(len(df), 'unknown', dtype=object)
+
+
+def _transfer_like(df):
+    """Rows whose description fits a transfer leg: card payments on cards, transfers and payments on bank accounts."""
+    if 'description' not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    description = df['description'].astype(object).fillna('').astype(str)
+    card = (df['AccountType'] == 'CreditCard').to_numpy() if 'AccountType' in df.columns else np.zeros(len(df), dtype=bool)
+    return np.where(card, description.str.contains(CARD_PAYMENT_PATTERN).to_numpy(),
+                    description.str.contains(TRANSFER_PATTERN).to_numpy())
+
+
+def transfer_legs(df):
+    """
+    The rows of df that could be a transfer leg (see _transfer_like), projected to transaction_id and
+    LEG_COLUMNS: all reconcile_transfers needs from a statement to pair it with the others.
+    """
+    columns = ['transaction_id'] + [col for col in LEG_COLUMNS if col in df.columns]
+    return df.loc[_transfer_like(df), columns].reset_index(drop=True)
+
+
+def _pair_once(credits, debits, tolerance):
+    """One as-of pass: each credit takes its nearest-dated debit of equal amount; ties keep the closest credit."""
+    matched = pd.merge_asof(credits, debits, on='date', by='cents', direction='nearest',
+                            tolerance=tolerance, suffixes=('_credit', '_debit'))
+    matched = matched.dropna(subset=['row_debit'])
+    if matched.empty:
+        return matched
+    matched['gap'] = (matched['date'] - matched['date_debit']).abs()
+    matched = matched.sort_values(['gap', 'row_credit'], kind='stable')
+    return matched.drop_duplicates(subset='row_debit', keep='first')
+
+
+def match_transfers(df, tolerance_days=DEFAULT_TOLERANCE_DAYS):
+    """
+    Pairs of internal transfer legs in df as a DataFrame of (debit_row, credit_row) positions: an
+    outflow from one account and an inflow to a different account with the same absolute amount,
+    at most tolerance_days apart, both with transfer-like descriptions (see _transfer_like).
+    """
+    pairs = pd.DataFrame({'debit_row': pd.Series(dtype='int64'), 'credit_row': pd.Series(dtype='int64')})
+    if df.empty:
+        return pairs
+    direction = np.asarray(transaction_direction(df['type']))
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    legs = pd.DataFrame({
+        'row': np.arange(len(df)),
+        'date': dates.to_numpy(),
+        'cents': np.round(np.abs(df['amount'].to_numpy(dtype=float)) * 100),
+        'account': _account_keys(df),
+    })
+    legs = legs[dates.notna().to_numpy() & np.isfinite(legs['cents'].to_numpy()) & (legs['cents'].to_numpy() > 0)
+                & _transfer_like(df)]
+    legs = legs.astype({'cents': 'int64'}).sort_values('date', kind='stable')
+    credits = legs[direction[legs['row']] == 'in']
+    debits = legs[direction[legs['row']] == 'out']
+    tolerance = pd.Timedelta(days=tolerance_days)
+
+    found = []
+    for account in pd.unique(credits['account']):
+        open_credits = credits[credits['account'] == account][['date', 'cents', 'row']]
+        candidates = debits[debits['account'] != account]
+        date_debit = candidates['date']
+        open_debits = candidates[['date', 'cents', 'row']].assign(date_debit=date_debit)
+        for _ in range(MAX_PASSES):
+            if open_credits.empty or open_debits.empty:
+                break
+            matched = _pair_once(open_credits, open_debits, tolerance)
+            if matched.empty:
+                break
+            found.append(matched[['row_debit', 'row_credit']])
+            open_credits = open_credits[~open_credits['row'].isin(matched['row_credit'])]
+            open_debits = open_debits[~open_debits['row'].isin(matched['row_debit'])]
+        # A debit pairs with at most one credit, whichever account received it
+        if found:
+            used = pd.concat(found)['row_debit']
+            debits = debits[~debits['row'].isin(used)]
+    if not found:
+        return pairs
+    matched = pd.concat(found, ignore_index=True).astype('int64')
+    return matched.rename(columns={'row_debit': 'debit_row', 'row_credit': 'credit_row'})[['debit_row', 'credit_row']]
+
+
+def reconcile_transfers(df, tolerance_days=DEFAULT_TOLERANCE_DAYS):
+    """
+    Return df with `is_internal_transfer` (bool) and `transfer_id` (Int64, shared by both legs of a
+    pair) columns. analyze_finances leaves flagged rows out of its totals.
+    """
+    logger = get_logger()
+    pairs = match_transfers(df, tolerance_days=tolerance_days)
+    transfer_id = np.full(len(df), -1, dtype='int64')
+    ids = np.arange(len(pairs), dtype='int64')
+    transfer_id[pairs['debit_row'].to_numpy()] = ids
+    transfer_id[pairs['credit_row'].to_numpy()] = ids
+    df = df.assign(is_internal_transfer=transfer_id >= 0,
+                   transfer_id=pd.arrays.IntegerArray(transfer_id, transfer_id < 0))
+    logger.info(f"Reconciled {len(pairs)} internal transfers ({2 * len(pairs)} of {len(df)} rows)")
+    return df
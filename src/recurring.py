@@ -0,0 +1,144 @@
+"""
+Recurring payment and subscription detection.
+
+Outgoing transactions are grouped by a normalized merchant key (reference numbers, payment rails
+and punctuation stripped, so "UPI/NETFLIX/5241..." and "POS NETFLIX.COM" meet), then sorted once by
+(merchant, date). Inter-arrival intervals, their spread and the amount variation are computed per
+merchant with numpy group reductions over the sorted arrays, so the whole detector is one
+O(n log n) sort plus linear passes. A merchant is recurring when its typical interval matches a
+known period and most intervals (and amounts) stay close to it.
+"""
+import numpy as np
+import pandas as pd
+
+from src.analyzer import transaction_direction
+
+# name -> (nominal interval in days, allowed deviation in days, months to the next charge or None)
+PERIODS = {
+    'weekly': (7, 2, None),
+    'monthly': (30.44, 4, 1),
+    'quarterly': (91.31, 10, 3),
+    'annual': (365.25, 20, 12),
+}
+# Payment rails and filler that precede or follow the merchant name in statement descriptions
+MERCHANT_STOPWORDS = {
+    'upi', 'pos', 'neft', 'imps', 'rtgs', 'ach', 'nach', 'ecs', 'mmt', 'bil', 'inft', 'ecom', 'vps', 'ips',
+    'billdesk', 'paytm', 'razorpay', 'payu', 'cms', 'transaction', 'payment', 'ref', 'txn', 'the', 'www', 'com',
+    'ind', 'india', 'pvt', 'ltd', 'limited',
+}
+MERCHANT_TOKENS = 2
+RECURRING_COLUMNS = ['merchant', 'description', 'category', 'period', 'occurrences', 'interval_days',
+                     'regularity', 'amount_mean', 'amount_cv', 'first_date', 'last_date', 'next_date']
+
+
+def merchant_key(description):
+    tokens = [t for t in description.split() if len(t) > 2 and t not in MERCHANT_STOPWORDS]
+    return ' '.join(tokens[:MERCHANT_TOKENS])
+
+
+def merchant_keys(descriptions):
+    """Normalized merchant key per description; only the distinct descriptions are normalized."""
+    codes, uniques = pd.factorize(descriptions)
+    letters = pd.Index(uniques).astype(str).str.lower().str.replace(r'[^a-z]+', ' ', regex=True)
+    keys = np.array([merchant_key(text) for text in letters] + [''], dtype=object)
+    return keys[codes]  # code -1 (missing description) -> ''
+
+
+def _group_sum(values, groups, count):
+    return np.bincount(groups, weights=values, minlength=count)
+
+
+def _add_months(dates, months):
+    """dates (datetime64[D]) plus a whole number of months, clipping the day to the target month's end."""
+    month_start = dates.astype('datetime64[M]')
+    day = (dates - month_start.astype('datetime64[D]')).astype('int64')
+    target = month_start + months.astype('int64')
+    month_length = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype('int64')
+    return target.astype('datetime64[D]') + np.minimum(day, month_length - 1)
+
+
+def detect_recurring(df, min_occurrences=3, max_amount_cv=0.25, min_regularity=0.75):
+    """
+    Recurring outgoing payments in df (standardized transactions), one row per merchant with its
+    period (weekly, monthly, quarterly or annual), median interval, the share of intervals within
+    the period's tolerance ('regularity'), amount mean and coefficient of variation, and the
+    predicted next charge date. Sorted by mean amount, largest first.
+    """
+    empty = pd.DataFrame(columns=RECURRING_COLUMNS)
+    if df.empty:
+        return empty
+    dates = pd.to_datetime(df['date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    keep = (np.asarray(transaction_direction(df['type'])) == 'out') & ~np.isnat(dates)
+    merchants = merchant_keys(df['description'])
+    keep &= merchants != ''
+    if not keep.any():
+        return empty
+    merchant_codes, merchant_names = pd.factorize(merchants[keep])
+    days = dates[keep].astype('int64')
+    amounts = np.abs(df['amount'].to_numpy(dtype=float)[keep])
+    rows = np.flatnonzero(keep)
+
+    # One sort by (merchant, day); everything below is a linear pass over the sorted arrays
+    order = np.lexsort((days, merchant_codes))
+    group, days, amounts, rows = merchant_codes[order], days[order], amounts[order], rows[order]
+    groups = len(merchant_names)
+    counts = np.bincount(group, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ends = starts + counts - 1
+
+    # Same-day charges (e.g. a split payment) count once towards the interval statistics
+    same_group = group[1:] == group[:-1]
+    intervals = np.diff(days)
+    valid = same_group & (intervals > 0)
+    interval_group = group[1:][valid]
+    intervals = intervals[valid]
+    interval_counts = np.bincount(interval_group, minlength=groups)
+
+    # Median interval per merchant: sort intervals within groups and take the middle element(s)
+    by_group = np.lexsort((intervals, interval_group))
+    sorted_intervals = intervals[by_group]
+    interval_starts = np.concatenate(([0], np.cumsum(interval_counts)[:-1]))
+    has_intervals = interval_counts > 0
+    lower = interval_starts + np.maximum(interval_counts - 1, 0) // 2
+    upper = interval_starts + interval_counts // 2
+    median = np.full(groups, np.nan)
+    median[has_intervals] = (sorted_intervals[lower[has_intervals]] + sorted_intervals[upper[has_intervals]]) / 2
+
+    # Classify the median interval, then score how many intervals fit that period
+    period_names = np.array(list(PERIODS) + [''], dtype=object)
+    nominal = np.array([p[0] for p in PERIODS.values()] + [np.nan])
+    tolerance = np.array([p[1] for p in PERIODS.values()] + [np.nan])
+    matches = np.abs(median[:, None] - nominal[None, :-1]) <= tolerance[None, :-1]
+    period_index = np.where(matches.any(axis=1), matches.argmax(axis=1), len(PERIODS))
+    fits = np.abs(intervals - nominal[period_index][interval_group]) <= tolerance[period_index][interval_group]
+    regularity = _group_sum(fits.astype(float), interval_group, groups) / np.maximum(interval_counts, 1)
+
+    amount_mean = _group_sum(amounts, group, groups) / counts
+    amount_var = _group_sum((amounts - amount_mean[group]) ** 2, group, groups) / counts
+    amount_cv = np.sqrt(amount_var) / np.where(amount_mean > 0, amount_mean, np.nan)
+
+    recurring = ((counts >= min_occurrences) & (period_index < len(PERIODS)) & (regularity >= min_regularity)
+                 & (amount_cv <= max_amount_cv))
+    if not recurring.any():
+        return empty
+
+    last_day = days[ends].astype('datetime64[D]')
+    months_ahead = np.array([p[2] or 0 for p in PERIODS.values()] + [0])[period_index]
+    next_date = np.where(months_ahead > 0, _add_months(last_day, months_ahead),
+                         last_day + np.nan_to_num(median).round().astype('int64'))
+    latest = rows[ends]
+    result = pd.DataFrame({
+        'merchant': merchant_names,
+        'description': df['description'].to_numpy()[latest],
+        'category': df['category'].to_numpy()[latest] if 'category' in df.columns else None,
+        'period': period_names[period_index],
+        'occurrences': counts,
+        'interval_days': median,
+        'regularity': regularity.round(3),
+        'amount_mean': amount_mean.round(2),
+        'amount_cv': amount_cv.round(3),
+        'first_date': pd.to_datetime(days[starts].astype('datetime64[D]')),
+        'last_date': pd.to_datetime(last_day),
+        'next_date': pd.to_datetime(next_date),
+    })[recurring]
+    return result.sort_values('amount_mean', ascending=False, kind='stable').reset_index(drop=True)
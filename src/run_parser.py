@@ -1,34 +1,46 @@
 
 import os
+from contextlib import nullcontext
 from src.logger import get_logger
 from src.config_loader import get_config
-from src.io_utils import save_to_processed
+from src.io_utils import COMBINED_COLUMNS
+from src.aggregates import StatementAnalysis
+from src.pipeline import IngestPipeline
 import json
-import src.analyzer as analyzer
 
 # Folder-based mapping: (bank/type) -> parser class
 
 # FOLDER_PARSER_MAP can be dynamically loaded from config if needed
 
-def parse_statement(file_path):
+def parse_statement(file_path, pipeline=None):
     # This function is now deprecated; use src/parser.py:parse_statement instead
     from src.parser import parse_statement as main_parse_statement
-    from src.parser import parse_statement as main_parse_statement
-    return main_parse_statement(file_path)
+    return main_parse_statement(file_path, pipeline=pipeline)
 
 if __name__ == "__main__":
-    import sys
     logger = get_logger()
     import argparse
 
     parser = argparse.ArgumentParser(
-        description="CLI entry-point: parse -> standardize -> save -> (optional) analyze\n\nUsage examples:\n  python src/run_parser.py data/raw/ICICI\\ August\\ Statement.pdf --analyze\n  python src/run_parser.py data/raw/2025/08/ --analyze --combined --fmt parquet"
+        description="CLI entry-point: parse -> standardize -> save -> (optional) analyze\n\nUsage examples:\n  python src/run_parser.py data/raw/ICICI\\ August\\ Statement.pdf --analyze\n  python src/run_parser.py data/raw/2025/08/ --analyze --combined --fmt parquet\n  python src/run_parser.py data/raw/2025/08/ --combined --force --jobs 4\n  python src/run_parser.py data/raw/2025/08/ --combined --profile\n  python src/run_parser.py --history --since 2025-01-01 --until 2025-06-30 --source axis"
     )
-    parser.add_argument("statement_file", help="Path to the bank/credit card statement PDF or directory of statements")
+    parser.add_argument("statement_file", nargs="?", help="Path to the bank/credit card statement PDF or directory of statements")
     parser.add_argument("--analyze", action="store_true", help="Run financial analysis and save JSON report")
     parser.add_argument("--combined", action="store_true", help="Create combined CSV across processed files in directory")
     parser.add_argument("--fmt", choices=["csv", "parquet"], default="csv", help="Output format for processed files")
+    parser.add_argument("--timings", action="store_true", help="Print wall time and row counts for each pipeline stage")
+    parser.add_argument("--profile", action="store_true", help="Write cProfile statistics per pipeline stage to <processed_dir>/profile (statements are parsed in this process)")
+    parser.add_argument("--incremental", action="store_true", help="With --analyze, merge statements into the persisted aggregates and report on the full history")
+    parser.add_argument("--jobs", type=int, default=1, help="With --combined, parse statements in N worker processes (0 = one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Parse statements again even if the manifest shows they were ingested before and are unchanged")
+    parser.add_argument("--history", action="store_true", help="Analyze transactions already in the ledger instead of parsing a statement")
+    parser.add_argument("--since", help="With --history, first date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="With --history, last date to include (YYYY-MM-DD)")
+    parser.add_argument("--source", action="append", help="With --history, only this source (repeatable)")
+    parser.add_argument("--category", action="append", help="With --history, only this category (repeatable)")
     args = parser.parse_args()
+    if not args.statement_file and not args.history:
+        parser.error("statement_file is required unless --history is given")
 
     file_path = args.statement_file
     run_analysis = args.analyze
@@ -36,8 +48,13 @@ if __name__ == "__main__":
     output_fmt = args.fmt
     import pandas as pd
     pd.set_option('display.max_columns', None)
+    profiler = None
+    if args.profile:
+        from src.metrics import StageProfiler
+        profiler = StageProfiler(os.path.join(get_config()['data']['processed_dir'], 'profile'))
+    pipeline = IngestPipeline(processed_dir=get_config()['data']['processed_dir'], output_format=output_fmt, profiler=profiler)
 
-    def analyze_and_save_report(df, filename, bank=None, month=None):
+    def analyze_and_save_report(df, filename, bank=None, month=None, analysis=None):
         try:
             config = get_config()
             processed_dir = config['data']['processed_dir']
@@ -45,13 +62,21 @@ if __name__ == "__main__":
             os.makedirs(output_dir, exist_ok=True)
             # Compose name: <bank>_<month> (lowercase, underscores)
             name = None
-            if bank and month:
+            if args.incremental:
+                name = "history"
+            elif bank and month:
                 name = f"{bank.lower()}_{month.lower()}"
             else:
                 # Fallback: use filename without extension
                 name = os.path.splitext(filename)[0].lower().replace(' ', '_')
             # Run analyzer and save CSV/PNG files
-            summary = analyzer.analyze_finances(df, output_dir=output_dir, save_plots=True, name=name)
+            if analysis is not None:
+                # Statements were merged into the analysis cube one at a time as they streamed past
+                summary = pipeline.summarize(analysis, output_dir=output_dir, save_plots=True, name=name)
+            elif args.incremental:
+                summary = pipeline.analyze(df, output_dir=output_dir, save_plots=True, name=name, incremental=True)
+            else:
+                summary = pipeline.analyze(df, output_dir=output_dir, save_plots=True, name=name)
             # Save JSON summary report as before
             report_path = os.path.join(output_dir, name + '.json')
             with open(report_path, 'w') as f:
@@ -60,73 +85,120 @@ if __name__ == "__main__":
             print(f"Saved monthly breakdown CSV: {os.path.join(output_dir, name + '_monthly.csv')}")
             print(f"Saved top categories CSV: {os.path.join(output_dir, name + '_top_categories.csv')}")
             print(f"Saved monthly trend PNG: {os.path.join(output_dir, name + '_monthly_trend.png')}")
+            # Periodic charges need the dated rows, so they come from the statements at hand
+            from src.recurring import detect_recurring
+            recurring = detect_recurring(analysis.rows() if analysis is not None else df)
+            recurring_path = os.path.join(output_dir, name + '_recurring.csv')
+            recurring.to_csv(recurring_path, index=False)
+            print(f"Saved recurring payments CSV ({len(recurring)} found): {recurring_path}")
         except Exception as e:
             logger.error(f"Failed to analyze and save report: {e}")
 
     def find_statement_files(directory):
-        # Recursively find all PDF files in directory
+        # Recursively find all PDF files in directory (sorted, so combined output does not depend on walk order)
         statement_files = []
         for root, _, files in os.walk(directory):
             for file in files:
                 if file.lower().endswith('.pdf'):
                     statement_files.append(os.path.join(root, file))
-        return statement_files
+        return sorted(statement_files)
 
     try:
-        if run_combined and os.path.isdir(file_path):
-            # Parse all statement files in directory, combine, save
+        if args.history:
+            # Indexed lookup in the ledger, where rows shared by overlapping statements are stored once
+            from src.ledger import get_ledger
+            from src.schema import TRANSACTION_SCHEMA
+            df = get_ledger(pipeline.processed_dir).query(start=args.since, end=args.until, sources=args.source,
+                                                         categories=args.category, columns=list(TRANSACTION_SCHEMA))
+            print(f"Loaded {len(df)} ledger transactions (since={args.since}, until={args.until}, sources={args.source}, categories={args.category})")
+            if run_analysis and not df.empty:
+                analyze_and_save_report(df, "history", bank="history", month=f"{args.since or 'start'}_{args.until or 'latest'}")
+        elif run_combined and os.path.isdir(file_path):
+            # Parse all statement files in directory, save each, combine, save. Statements are taken
+            # one at a time in two passes, so the batch is never held in memory at once.
             statement_files = find_statement_files(file_path)
-            dfs = []
-            for f in statement_files:
-                try:
-                    df, metadata = parse_statement(f)
-                    if df is not None and not df.empty:
-                        # Standardize before saving
-                        from src.standardizer import standardize_transactions
-                        df = standardize_transactions(df, metadata)
-                        dfs.append(df)
-                        logger.info(f"Parsed and standardized {len(df)} transactions from {f} | Metadata: {metadata}")
-                except Exception as e:
-                    logger.error(f"Failed to parse {f}: {e}")
-            if dfs:
-                combined_df = pd.concat(dfs, ignore_index=True)
-                # Dedupe by transaction id if present
-                if 'transaction_id' in combined_df.columns:
-                    combined_df = combined_df.drop_duplicates(subset=['transaction_id'])
+            jobs = args.jobs or os.cpu_count() or 1
+            if profiler is not None and jobs > 1:
+                logger.info(f"--profile parses statements in this process; ignoring --jobs {args.jobs}")
+                jobs = 1
+
+            def statements():
+                pending = []
+                for f in statement_files:
+                    try:
+                        # A statement ingested before and unchanged since is read back instead of parsed
+                        result = None if args.force else pipeline.load_unchanged(f)
+                    except Exception as e:
+                        logger.error(f"Failed to read back {f}, parsing it again: {e}")
+                        result = None
+                    if result is None:
+                        pending.append(f)
+                    else:
+                        yield f, result
+                # The rest are parsed in --jobs worker processes; outcomes come back in file order
+                for outcome in pipeline.iter_many(pending, jobs=jobs):
+                    if outcome.error is None:
+                        logger.info(f"Parsed and standardized {len(outcome.result.df)} transactions from {outcome.file} | Metadata: {outcome.result.metadata}")
+                        yield outcome.file, outcome.result
+
+            # First pass: save each statement and keep only its possible transfer legs
+            saved, legs = pipeline.save_statements(statements())
+            order = {f: i for i, f in enumerate(statement_files)}
+            saved.sort(key=lambda statement: order[statement.file])
+            skipped = sum(statement.skipped for statement in saved)
+            if skipped:
+                print(f"Skipped {skipped} unchanged of {len(saved)} statements (use --force to parse them again)")
+            if saved:
+                # Second pass: pair card bill payments and transfers between the statements' accounts, then
+                # stream each statement with its flags (saved again if they changed) into the combined file,
+                # repeated rows dropped, and with --analyze into the analysis cube
+                frames = pipeline.reconciled_statements(saved, legs, name="combined")
                 combined_filename = os.path.basename(os.path.normpath(file_path)) + "_combined.{}".format(output_fmt)
-                config = get_config()
-                processed_dir = config['data']['processed_dir']
-                save_to_processed(combined_df, "Combined", combined_filename, format=output_fmt, processed_dir=processed_dir)
-                print(f"Saved combined processed file: {os.path.join(processed_dir, combined_filename)}")
-                if run_analysis:
-                    # Try to extract bank and month from directory name
-                    dir_name = os.path.basename(os.path.normpath(file_path)).lower()
-                    bank = 'combined'
-                    month = dir_name
-                    analyze_and_save_report(combined_df, combined_filename, bank=bank, month=month)
+                first_row = {}
+
+                def noting_first_row(frames):
+                    for df in frames:
+                        if not first_row:
+                            first_row.update(df.iloc[0].to_dict())
+                        yield df
+
+                # --incremental merges into the persisted cube (the whole history), otherwise into one for this batch
+                analysis_state = pipeline.get_aggregates_path() if args.incremental else None
+                with StatementAnalysis(analysis_state) if run_analysis else nullcontext() as analysis:
+                    if analysis is not None:
+                        frames = analysis.track(frames)
+                    saved_path = pipeline.persist_combined(noting_first_row(frames), "Combined", combined_filename)
+                    print(f"Saved combined processed file: {saved_path}")
+                    if analysis is not None:
+                        # Try to extract bank and month from directory name
+                        dir_name = os.path.basename(os.path.normpath(file_path)).lower()
+                        bank = 'combined'
+                        month = dir_name
+                        analyze_and_save_report(None, combined_filename, bank=bank, month=month, analysis=analysis)
                 print("First full row (combined):")
-                print(combined_df.iloc[0].to_dict())
-                print("Columns:", list(combined_df.columns))
+                print(first_row)
+                print("Columns:", COMBINED_COLUMNS)
             else:
                 print("No valid statement files found or parsed in directory.")
         else:
             # Single file mode
-            df, metadata = parse_statement(file_path)
+            result = None if args.force else pipeline.load_unchanged(file_path)
+            if result is not None:
+                print(f"Skipping unchanged {file_path}: already ingested as {result.processed_path} (use --force to parse it again)")
+                df, metadata = result.df, result.metadata
+            else:
+                df, metadata = parse_statement(file_path, pipeline=pipeline)
             if df is None:
                 logger.error("Parser returned None. No DataFrame generated.")
             elif df.empty:
                 logger.warning(f"Parsed DataFrame is empty. No transactions found in {file_path}.")
                 print(df)
             else:
-                # Standardize before saving
-                from src.standardizer import standardize_transactions
-                df = standardize_transactions(df, metadata)
                 logger.info(f"Parsed and standardized {len(df)} transactions from {file_path} | Metadata: {metadata}")
                 source = metadata.get('source', 'Unknown')
                 filename = os.path.basename(file_path)
-                config = get_config()
-                processed_dir = config['data']['processed_dir']
-                save_to_processed(df, source, filename, format=output_fmt, processed_dir=processed_dir)
+                if result is None:
+                    pipeline.persist(df, source, filename, original_path=file_path)
                 if run_analysis:
                     # Extract bank and month from metadata and filename
                     folder_parts = os.path.normpath(os.path.dirname(file_path)).split(os.sep)
@@ -151,3 +223,25 @@ if __name__ == "__main__":
                 print("Columns:", list(df.columns))
     except Exception as e:
         logger.error(f"Failed to parse statement: {e}")
+    # Report plots render in the background while later statements are parsed; finish them here
+    if run_analysis:
+        pipeline.render()
+    if args.timings:
+        print("Pipeline stage timings:")
+        print(pipeline.format_timings())
+        from src.categorizer import get_category_engine
+        from src.category_cache import get_category_cache
+        category_cache = get_category_cache(get_category_engine().fingerprint)
+        if category_cache is not None:
+            print(f"Category cache hit rate: {category_cache.hit_rate:.1%} ({category_cache.hits} hits, {category_cache.misses} misses)")
+    from src.metrics import get_metrics, get_metrics_dir
+    metrics_dir = get_metrics_dir()
+    if metrics_dir:
+        try:
+            prom_path, json_path = get_metrics().export(metrics_dir)
+            print(f"Saved metrics: {prom_path}, {json_path}")
+        except OSError as e:
+            logger.error(f"Failed to export metrics: {e}")
+    if profiler is not None:
+        paths = profiler.dump()
+        print(f"Saved per-stage profiles ({len(paths) // 2} stages) to {profiler.output_dir}")
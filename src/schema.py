@@ -0,0 +1,141 @@
+"""
+Typed schema for standardized transactions.
+
+Both standardize_transactions and save_to_processed pass frames through enforce_schema so every
+stage downstream sees the same compact dtypes: datetime64 dates, categoricals for low-cardinality
+labels and Arrow-backed strings (when pyarrow is installed) for free text. Display strings such as
+the formatted rupee amount are not stored; add them at render time with with_display_columns.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype('pyarrow')
+    except ImportError:
+        return pd.StringDtype('python')
+
+
+STRING_DTYPE = _string_dtype()
+
+TRANSACTION_SCHEMA = {
+    'date': 'datetime64[ns]',
+    'description': STRING_DTYPE,
+    'description_clean': STRING_DTYPE,
+    'amount': 'float64',
+    'type': 'category',
+    'balance': 'float64',
+    'reference': STRING_DTYPE,
+    'category': 'category',
+    'AmountValue': 'float64',
+    'AccountType': 'category',
+    'source': 'category',
+    'is_credit_card': 'bool',
+    'is_internal_transfer': 'bool',
+    'transfer_id': 'Int64',
+    'transaction_id': STRING_DTYPE,
+}
+
+# Columns derived purely for presentation; never persisted
+DISPLAY_COLUMNS = ['Amount']
+
+
+def enforce_schema(df):
+    """
+    Cast the known transaction columns of df to TRANSACTION_SCHEMA and drop display-only columns.
+    Unknown columns are kept as they are.
+    """
+    if df is None:
+        return df
+    df = df.drop(columns=[col for col in DISPLAY_COLUMNS if col in df.columns])
+    for col, dtype in TRANSACTION_SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype == 'float64':
+            values = df[col]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = values.astype(str).str.replace(r'[₹,\s]', '', regex=True)
+            df[col] = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif dtype == 'bool':
+            values = df[col].to_numpy(dtype=object)
+            df[col] = np.where(pd.isna(values), False, values).astype(bool)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def format_amount(values):
+    """Render amounts as rupee strings, e.g. 1234.5 -> '₹1,234.50'."""
+    return values.map('₹{:,.2f}'.format)
+
+
+def with_display_columns(df):
+    """Return a copy of df with the presentation columns (formatted Amount) added for rendering."""
+    if 'AmountValue' not in df.columns:
+        return df
+    return df.assign(Amount=format_amount(df['AmountValue']))
+
+
+def fingerprint_columns(df):
+    return [col for col in ['date', 'description', 'amount', 'type', 'AccountType', 'source'] if col in df.columns]
+
+
+def row_fingerprints(df):
+    """
+    Per-row content hashes (uint64) of fingerprint_columns plus the internal transfer flag (missing
+    counts as False), so a statement whose rows were flagged by src.reconcile after it was saved
+    no longer matches its earlier fingerprint.
+    """
+    flags = df['is_internal_transfer'].to_numpy(dtype=object) if 'is_internal_transfer' in df.columns else np.zeros(len(df), dtype=object)
+    frame = df[fingerprint_columns(df)].assign(is_internal_transfer=np.where(pd.isna(flags), False, flags).astype(bool))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def frame_fingerprint(df):
+    """Content hash of a transaction frame (manifest entries, skipping statements already aggregated)."""
+    return hashlib.sha256(row_fingerprints(df).tobytes()).hexdigest()
+
+
+# Content that identifies a transaction; the same row in two overlapping statements gets the same id
+TRANSACTION_KEY_COLUMNS = ['date', 'description', 'amount', 'type']
+
+
+def transaction_ids(df):
+    """
+    Deterministic id per row of a standardized frame: a hash of TRANSACTION_KEY_COLUMNS, the account
+    (source, else AccountType) and the row's occurrence number among identical rows, so genuine
+    repeats within one statement (two equal purchases on a day) keep distinct ids.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=STRING_DTYPE)
+    keys = pd.DataFrame({col: df[col] if col in df.columns else None for col in TRANSACTION_KEY_COLUMNS}, index=df.index)
+    account = df['source'].astype(object) if 'source' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    if 'AccountType' in df.columns:
+        account = account.where(account.notna(), df['AccountType'].astype(object))
+    keys['account'] = account.astype(object)
+    row_hash = pd.util.hash_pandas_object(keys, index=False, categorize=True)
+    occurrence = row_hash.groupby(row_hash.to_numpy(), sort=False).cumcount()
+    ids = pd.util.hash_pandas_object(pd.DataFrame({'row': row_hash.to_numpy(), 'occurrence': occurrence.to_numpy()}),
+                                     index=False).to_numpy()
+    return pd.Series([f'{value:016x}' for value in ids], index=df.index, dtype=STRING_DTYPE)
+
+
+# Pipeline stages already applied to a frame are recorded in df.attrs so no stage runs twice
+STAGES_ATTR = 'stages'
+
+
+def has_stage(df, stage):
+    return df is not None and stage in df.attrs.get(STAGES_ATTR, ())
+
+
+def mark_stage(df, stage):
+    """Record that stage has been applied to df and return df."""
+    if not has_stage(df, stage):
+        df.attrs[STAGES_ATTR] = [*df.attrs.get(STAGES_ATTR, []), stage]
+    return df
@@ -1,23 +1,76 @@
-
 # Always import get_logger at module level, never conditionally assign
 from src.logger import get_logger
+from src.metrics import get_metrics, timed
+from src.schema import enforce_schema, has_stage, mark_stage, transaction_ids
 
 import pandas as pd
 import re
 from datetime import datetime
 
+# Date layout each parser emits, keyed by normalised source name (lowercase, alphanumerics only).
+# Sources not listed here fall back to day-first inference.
+SOURCE_DATE_FORMATS = {
+    'axis': '%d-%m-%Y',
+    'axisbank': '%d-%m-%Y',
+    'icicibank': '%d-%m-%Y',
+    'icicisavings': '%d-%m-%Y',
+    'icicicreditcard': '%d-%m-%Y',
+    'amex': '%Y-%m-%d',
+    'amexcreditcard': '%Y-%m-%d',
+}
+
+def _source_key(source):
+    return re.sub(r'[^a-z0-9]', '', str(source).lower())
+
+def get_date_format(source):
+    return SOURCE_DATE_FORMATS.get(_source_key(source)) if source is not None else None
+
+def parse_dates(values, date_format=None):
+    """
+    Parse a date column in one vectorized call. Strings use the explicit date_format when given;
+    anything that does not match it falls back to day-first inference. Values that are already
+    dates or timestamps (e.g. from a previous standardization) are kept as they are.
+    """
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if pd.api.types.is_datetime64_any_dtype(values) or kind in ('date', 'datetime', 'datetime64'):
+        return pd.to_datetime(values, errors='coerce')
+    if kind == 'empty':
+        return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    text = values.astype(str).str.strip() if kind != 'string' else values.str.strip()
+    if date_format:
+        parsed = pd.to_datetime(text, format=date_format, errors='coerce')
+        unparsed = parsed.isna() & values.notna()
+        if unparsed.any():
+            parsed[unparsed] = pd.to_datetime(text[unparsed], errors='coerce', dayfirst=True, format='mixed')
+        return parsed
+    return pd.to_datetime(text, errors='coerce', dayfirst=True, format='mixed')
+
+def parse_amounts(values):
+    """Convert amounts such as '₹1,234.50' to floats; unparseable values become 0.0."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    cleaned = values.astype(str).str.replace(',', '', regex=False).str.replace('₹', '', regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0.0)
+
+@timed('standardize_seconds')
 def standardize_transactions(df, source, is_credit_card=False):
 
     logger = get_logger()
+    date_format = None
     # Accept options dict for compatibility
     if isinstance(source, dict):
         options = source
         source = options.get('source', None)
         is_credit_card = options.get('is_credit_card', False)
+        date_format = options.get('date_format')
     # Defensive: if df is None, return empty DataFrame
     if df is None:
         logger.error("Input DataFrame is None in standardize_transactions.")
         return pd.DataFrame()
+    # Each frame is standardized exactly once; later callers get it back untouched
+    if has_stage(df, 'standardize'):
+        logger.debug("Skipping standardize_transactions for source=%s: frame is already standardized", source)
+        return df
     # Defensive: ensure required columns exist
     required_cols = ['date', 'description', 'amount', 'type']
     for col in required_cols:
@@ -25,37 +78,24 @@ def standardize_transactions(df, source, is_credit_card=False):
             logger.warning(f"Missing column '{col}' in input DataFrame. Filling with default values.")
             df[col] = '' if col in ['date', 'description', 'type'] else 0.0
 
-    # Standardize date format if possible
+    # Standardize dates with the source's explicit format (one vectorized parse, no per-row calls)
     if 'date' in df.columns:
-        def parse_date_safe(val):
-            try:
-                return pd.to_datetime(val, errors='coerce', dayfirst=True).date()
-            except Exception:
-                return val
-        df['date'] = df['date'].apply(parse_date_safe)
-
-    # Parse amount as float and format as currency
-    def parse_amount(val):
-        try:
-            # Remove commas and currency symbols
-            val = str(val).replace(',', '').replace('₹', '').strip()
-            return float(val)
-        except Exception:
-            return 0.0
-    df['AmountValue'] = df['amount'].apply(parse_amount)
-    df['Amount'] = df['AmountValue'].apply(lambda x: f"₹{x:,.2f}")
-
-    # Map account type
-    def map_account_type(row):
-        if is_credit_card:
-            return "CreditCard"
-        # You can add more mappings if needed
-        return "BankAccount"
-    df['AccountType'] = df.apply(map_account_type, axis=1)
+        df['date'] = parse_dates(df['date'], date_format or get_date_format(source)).dt.normalize()
+
+    # Parse amount as float; the ₹ display string is only produced at render time
+    df['AmountValue'] = parse_amounts(df['amount'])
+
+    # Map account type: constant for the whole statement
+    df['AccountType'] = "CreditCard" if is_credit_card else "BankAccount"
 
     # Add metadata columns
     df['source'] = source
     df['is_credit_card'] = is_credit_card
 
+    df = enforce_schema(df)
+    # Content-hash id (of the typed values): lets combined frames and the ledger drop re-ingested rows
+    df['transaction_id'] = transaction_ids(df)
+    df = mark_stage(df, 'standardize')
+    get_metrics().inc('standardize_rows_total', len(df))
     logger.info(f"Standardized {len(df)} transactions for source={source}, is_credit_card={is_credit_card}")
     return df
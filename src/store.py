@@ -0,0 +1,178 @@
+"""
+Partitioned Parquet store of every processed transaction.
+
+save_to_processed writes each statement into data/processed/transactions/, a hive-partitioned
+dataset (year=YYYY/month=M/source=...). Files are named after the statement, so saving the same
+statement again replaces its rows. Reads go through pyarrow.dataset: a date range prunes
+year/month partitions, sources prune source partitions, and the remaining date and category
+filters are pushed down to Parquet row-group statistics (rows are date-sorted within each file),
+so a query reads only the slices it needs instead of concatenating every processed file.
+
+Requires pyarrow; without it get_transaction_store returns None and nothing is written.
+"""
+import glob
+import os
+import re
+
+import pandas as pd
+
+from src.logger import get_logger
+from src.schema import TRANSACTION_SCHEMA, enforce_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    ds = None
+
+STORE_DIRNAME = 'transactions'
+PARTITION_COLUMNS = ['year', 'month', 'source']
+# Undated rows land in year=0/month=0 so they are still stored (and excluded by any date range)
+NO_DATE_PARTITION = 0
+ROWS_PER_GROUP = 64 * 1024
+
+
+def _arrow_type(dtype):
+    if dtype == 'datetime64[ns]':
+        return pa.timestamp('ns')
+    if dtype == 'float64':
+        return pa.float64()
+    if dtype == 'bool':
+        return pa.bool_()
+    if dtype == 'Int64':
+        return pa.int64()
+    return pa.string()
+
+
+def transaction_arrow_schema(columns=None):
+    """Arrow schema of the given TRANSACTION_SCHEMA columns (all of them by default)."""
+    return pa.schema([(col, _arrow_type(TRANSACTION_SCHEMA[col])) for col in (columns or TRANSACTION_SCHEMA)])
+
+
+def store_schema():
+    """Arrow schema of the stored files: every TRANSACTION_SCHEMA column except the source partition."""
+    return transaction_arrow_schema([col for col in TRANSACTION_SCHEMA if col != 'source'])
+
+
+def arrow_table(df, schema):
+    """df as an Arrow table with the given schema; missing columns are null (False for booleans)."""
+    frame = pd.DataFrame(index=df.index)
+    for field in schema:
+        if field.name in df.columns:
+            values = df[field.name]
+        else:
+            values = pd.Series(False if pa.types.is_boolean(field.type) else None, index=df.index, dtype=object)
+        frame[field.name] = values.astype(object) if pa.types.is_string(field.type) else values
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([('year', pa.int16()), ('month', pa.int8()), ('source', pa.string())]),
+                           flavor='hive')
+
+
+def statement_key(filename):
+    """File-name-safe key of a statement; the store's files for it are named <key>-<n>.parquet."""
+    return re.sub(r'[^a-z0-9_.-]+', '_', filename.lower()).strip('_') or 'statement'
+
+
+class TransactionStore:
+    def __init__(self, root):
+        self.root = root
+        self.logger = get_logger()
+
+    def _files(self, key):
+        return glob.glob(os.path.join(glob.escape(self.root), '**', f"{glob.escape(key)}-*.parquet"), recursive=True)
+
+    def delete(self, key):
+        """Remove a statement's rows; returns the number of files deleted."""
+        files = self._files(key)
+        for path in files:
+            os.remove(path)
+        return len(files)
+
+    def write(self, df, key):
+        """Store df (standardized transactions) under key, replacing anything stored under key before."""
+        df = enforce_schema(df).reset_index(drop=True)
+        if 'date' in df.columns:
+            df = df.sort_values('date', kind='stable', ignore_index=True)
+        table = arrow_table(df, store_schema())
+        dates = pd.to_datetime(df['date']) if 'date' in df.columns else pd.Series(pd.NaT, index=df.index)
+        source = df['source'].astype(object).fillna('unknown') if 'source' in df.columns else pd.Series('unknown', index=df.index)
+        table = table.append_column('year', pa.array(dates.dt.year.fillna(NO_DATE_PARTITION).to_numpy('int16'), pa.int16()))
+        table = table.append_column('month', pa.array(dates.dt.month.fillna(NO_DATE_PARTITION).to_numpy('int8'), pa.int8()))
+        table = table.append_column('source', pa.array(source.astype(str).to_numpy(), pa.string()))
+        self.delete(key)
+        ds.write_dataset(table, self.root, format='parquet', partitioning=_partitioning(),
+                         basename_template=f"{key}-{{i}}.parquet", existing_data_behavior='overwrite_or_ignore',
+                         max_rows_per_group=ROWS_PER_GROUP, max_rows_per_file=4 * ROWS_PER_GROUP,
+                         min_rows_per_group=min(len(table), ROWS_PER_GROUP))
+        self.logger.info(f"Stored {len(df)} transactions for {key} in {self.root}")
+        return self.root
+
+    def dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=_partitioning(),
+                          schema=store_schema().append(pa.field('year', pa.int16())).append(
+                              pa.field('month', pa.int8())).append(pa.field('source', pa.string())))
+
+    @staticmethod
+    def filter_expression(start=None, end=None, sources=None, categories=None):
+        """
+        pyarrow filter for a date range (inclusive; anything pd.Timestamp accepts), sources and
+        categories. Month bounds are expressed on the partition columns as well, for pruning.
+        """
+        expression = None
+
+        def both(left, right):
+            return right if left is None else left & right
+
+        year, month = ds.field('year'), ds.field('month')
+        if start is not None:
+            start = pd.Timestamp(start)
+            expression = both(expression, (year > start.year) | ((year == start.year) & (month >= start.month)))
+            expression = both(expression, ds.field('date') >= pa.scalar(start.value, pa.timestamp('ns')))
+        if end is not None:
+            end = pd.Timestamp(end)
+            # A date-only bound includes the whole day
+            if end == end.normalize():
+                end = end + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+            expression = both(expression, (year < end.year) | ((year == end.year) & (month <= end.month)))
+            expression = both(expression, (year != NO_DATE_PARTITION))
+            expression = both(expression, ds.field('date') <= pa.scalar(end.value, pa.timestamp('ns')))
+        if sources is not None:
+            expression = both(expression, ds.field('source').isin(list(sources)))
+        if categories is not None:
+            expression = both(expression, ds.field('category').isin(list(categories)))
+        return expression
+
+    def read(self, start=None, end=None, sources=None, categories=None, columns=None):
+        """Stored transactions matching the filters (see filter_expression) as a typed DataFrame."""
+        if not os.path.isdir(self.root):
+            return enforce_schema(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in TRANSACTION_SCHEMA.items()
+                                                if columns is None or col in columns}))
+        expression = self.filter_expression(start, end, sources, categories)
+        table = self.dataset().to_table(filter=expression, columns=columns)
+        df = table.to_pandas()
+        df = df.drop(columns=[col for col in ('year', 'month') if col in df.columns and (columns is None or col not in columns)])
+        if columns is None:
+            df = df[[col for col in TRANSACTION_SCHEMA if col in df.columns]]
+        if 'date' in df.columns:
+            df = df.sort_values('date', kind='stable', ignore_index=True)
+        return enforce_schema(df)
+
+    def partitions(self):
+        """(year, month, source, files) for every stored partition."""
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=PARTITION_COLUMNS + ['files'])
+        fragments = list(self.dataset().get_fragments())
+        keys = [ds.get_partition_keys(fragment.partition_expression) for fragment in fragments]
+        frame = pd.DataFrame(keys, columns=PARTITION_COLUMNS)
+        return frame.groupby(PARTITION_COLUMNS, dropna=False).size().rename('files').reset_index()
+
+
+def get_transaction_store(processed_dir):
+    """Store under processed_dir, or None when pyarrow is not installed."""
+    if ds is None:
+        return None
+    return TransactionStore(os.path.join(processed_dir, STORE_DIRNAME))
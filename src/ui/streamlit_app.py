@@ -3,6 +3,7 @@ import os
 import pandas as pd
 import json
 import shutil
+import hashlib
 from datetime import datetime, timedelta
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
@@ -10,8 +11,12 @@ from src.logger import get_logger
 from src.config_loader import get_config
 from src.parser import parse_statement
 from src.standardizer import standardize_transactions
-from src.io_utils import save_to_processed
-from src.analyzer import analyze_finances
+from src.analyzer import exclude_transfers, query_cube
+from src.aggregates import AggregateStore, StatementAnalysis
+from src.recurring import detect_recurring
+from src.store import get_transaction_store
+from src.schema import with_display_columns
+from src.pipeline import IngestPipeline, PipelineResult
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -22,6 +27,8 @@ config = get_config()
 PROCESSED_DIR = config['data']['processed_dir']
 REPORTS_DIR = os.path.join(PROCESSED_DIR, 'reports')
 TEMP_RAW_DIR = 'data/temp_raw'
+# Rows shown in the processed transactions preview
+PREVIEW_ROWS = 1000
 
 os.makedirs(TEMP_RAW_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
@@ -141,43 +148,36 @@ def create_spending_trend_chart(df):
     fig.update_layout(xaxis_title="Date", yaxis_title="Amount (₹)", hovermode='x unified', showlegend=False)
     return fig
 
-def create_category_pie_chart(df):
-    if df.empty or 'category' not in df.columns or 'AmountValue' not in df.columns:
+# The charts below take an aggregate cube (analyzer.aggregate_transactions or AggregateStore.cube)
+# and answer their query by slicing it, never by scanning transactions
+def create_category_pie_chart(cube):
+    if cube.empty:
         return None
-    category_spending = df.groupby('category')['AmountValue'].sum().reset_index()
-    category_spending = category_spending[category_spending['AmountValue'] > 0]
-    fig = px.pie(category_spending, values='AmountValue', names='category', title='Spending by Category')
+    category_spending = query_cube(cube, by='category').reset_index()
+    category_spending = category_spending[category_spending['amount'] > 0]
+    fig = px.pie(category_spending, values='amount', names='category', title='Spending by Category')
     fig.update_traces(textposition='inside', textinfo='percent+label')
     return fig
 
-def create_monthly_comparison_chart(df):
-    if df.empty or 'date' not in df.columns or 'AmountValue' not in df.columns:
+def create_monthly_comparison_chart(cube):
+    if cube.empty:
         return None
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date'])
-    df['month'] = df['date'].dt.to_period('M')
-    monthly_spending = df.groupby('month')['AmountValue'].sum().reset_index()
+    monthly_spending = query_cube(cube, by='month').reset_index()
     monthly_spending['month_str'] = monthly_spending['month'].astype(str)
-    fig = px.bar(monthly_spending, x='month_str', y='AmountValue', title='Monthly Spending Comparison', labels={'AmountValue': 'Amount (₹)', 'month_str': 'Month'})
+    fig = px.bar(monthly_spending, x='month_str', y='amount', title='Monthly Spending Comparison', labels={'amount': 'Amount (₹)', 'month_str': 'Month'})
     fig.update_layout(xaxis_title="Month", yaxis_title="Amount (₹)")
     return fig
 
-def create_income_vs_expense_chart(df):
-    if df.empty or 'type' not in df.columns or 'AmountValue' not in df.columns:
+def create_income_vs_expense_chart(cube):
+    if cube.empty:
         return None
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date'])
-    income_df = df[df['type'].str.contains('Credit|Deposit', case=False, na=False)]
-    expense_df = df[df['type'].str.contains('Debit|Withdrawal', case=False, na=False)]
-    income_df['month'] = income_df['date'].dt.to_period('M')
-    expense_df['month'] = expense_df['date'].dt.to_period('M')
-    monthly_income = income_df.groupby('month')['AmountValue'].sum().reset_index()
-    monthly_expense = expense_df.groupby('month')['AmountValue'].sum().reset_index()
+    monthly_income = query_cube(cube, by='month', direction='in')
+    monthly_expense = query_cube(cube, by='month', direction='out')
     fig = make_subplots(rows=1, cols=1, subplot_titles=['Income vs Expenses'])
     if not monthly_income.empty:
-        fig.add_trace(go.Bar(x=monthly_income['month'].astype(str), y=monthly_income['AmountValue'], name='Income', marker_color='green'))
+        fig.add_trace(go.Bar(x=monthly_income.index.astype(str), y=monthly_income.to_numpy(), name='Income', marker_color='green'))
     if not monthly_expense.empty:
-        fig.add_trace(go.Bar(x=monthly_expense['month'].astype(str), y=monthly_expense['AmountValue'], name='Expenses', marker_color='red'))
+        fig.add_trace(go.Bar(x=monthly_expense.index.astype(str), y=monthly_expense.to_numpy(), name='Expenses', marker_color='red'))
     fig.update_layout(title='Monthly Income vs Expenses', xaxis_title='Month', yaxis_title='Amount (₹)', barmode='group')
     return fig
 
@@ -218,75 +218,118 @@ uploaded_files = st.file_uploader("Upload your bank/credit card statements (PDF,
 
 if uploaded_files:
     st.subheader("⚙️ Processing Uploaded Files...")
-    all_processed_dfs = []
     processed_file_paths = []
     report_file_paths = []
+    pipeline = IngestPipeline(processed_dir=PROCESSED_DIR, output_format=output_format)
     progress_bar = st.progress(0)
     status_text = st.empty()
-    for idx, uploaded_file in enumerate(uploaded_files):
-        file_name = uploaded_file.name
-        temp_file_path = os.path.join(TEMP_RAW_DIR, file_name)
-        progress = (idx + 1) / len(uploaded_files)
-        progress_bar.progress(progress)
-        status_text.text(f"Processing {file_name}...")
-        try:
-            with open(temp_file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.info(f"Saved {file_name} to temporary path: {temp_file_path}")
-            df = None
-            metadata = {}
-            if file_name.lower().endswith('.csv'):
-                df = pd.read_csv(temp_file_path)
-                metadata = {"source": "CSV_Upload", "is_credit_card": False, "parser": "CSVParser"}
-                df = standardize_transactions(df, metadata)
-            elif file_name.lower().endswith(('.pdf', '.txt')):
-                parsed_df, parsed_metadata = parse_statement(temp_file_path)
-                df = parsed_df
-                metadata = parsed_metadata
-            if df is not None and not df.empty:
-                processed_save_path = save_to_processed(df, metadata.get('source', 'Unknown'), file_name, format=output_format, processed_dir=PROCESSED_DIR, original_path=temp_file_path)
-                processed_file_paths.append(processed_save_path)
-                all_processed_dfs.append(df)
-                st.success(f"✅ Successfully processed: {file_name}")
-                if run_analysis:
-                    bank = metadata.get('source', 'unknown').lower().replace(' ', '_')
-                    month = datetime.now().strftime('%m')
-                    if 'date' in df.columns and not df['date'].empty:
-                        try:
-                            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-                            earliest_date = df['date'].min()
-                            if pd.notna(earliest_date):
-                                month = earliest_date.strftime('%m')
-                        except Exception as e:
-                            logger.warning(f"Could not determine month from dates for {file_name}: {e}")
-                    report_name = f"{bank}_{month}"
-                    summary = analyze_finances(df, output_dir=REPORTS_DIR, save_plots=True, name=report_name)
-                    with st.expander(f"📊 Analysis Results for {file_name}"):
-                        st.json(summary)
-                        report_json_path = os.path.join(REPORTS_DIR, f"{report_name}.json")
-                        if os.path.exists(report_json_path):
-                            st.download_button(label=f"Download {report_name}.json", data=open(report_json_path, "rb").read(), file_name=f"{report_name}.json", mime="application/json")
-                            report_file_paths.append(report_json_path)
-                        generated_files = [f for f in os.listdir(REPORTS_DIR) if f.startswith(report_name) and (f.endswith('.csv') or f.endswith('.png'))]
-                        for gen_file in generated_files:
-                            file_path = os.path.join(REPORTS_DIR, gen_file)
-                            mime_type = "text/csv" if gen_file.endswith('.csv') else "image/png"
-                            st.download_button(label=f"Download {gen_file}", data=open(file_path, "rb").read(), file_name=gen_file, mime=mime_type)
-                            report_file_paths.append(file_path)
-            else:
-                st.warning(f"⚠️ No transactions found for {file_name}")
-        except Exception as e:
-            logger.exception(f"Error processing {file_name}")
-            st.error(f"❌ Failed to process {file_name}: {e}")
+
+    def uploaded_statements():
+        # Each upload is parsed, saved and (optionally) analyzed on its own, then handed on as a
+        # (file, PipelineResult) so that only one statement is in memory at a time
+        for idx, uploaded_file in enumerate(uploaded_files):
+            file_name = uploaded_file.name
+            # One folder per upload content: the temporary path identifies the statement when it is saved
+            upload_dir = os.path.join(TEMP_RAW_DIR, hashlib.sha256(uploaded_file.getbuffer()).hexdigest()[:12])
+            os.makedirs(upload_dir, exist_ok=True)
+            temp_file_path = os.path.join(upload_dir, file_name)
+            progress = (idx + 1) / len(uploaded_files)
+            progress_bar.progress(progress)
+            status_text.text(f"Processing {file_name}...")
+            try:
+                with open(temp_file_path, "wb") as f:
+                    f.write(uploaded_file.getbuffer())
+                st.info(f"Saved {file_name} to temporary path: {temp_file_path}")
+                df = None
+                metadata = {}
+                if file_name.lower().endswith('.csv'):
+                    df = pd.read_csv(temp_file_path)
+                    metadata = {"source": "CSV_Upload", "is_credit_card": False, "parser": "CSVParser"}
+                    df = pipeline.run_stage('standardize', standardize_transactions, df, metadata, file=file_name)
+                elif file_name.lower().endswith(('.pdf', '.txt')):
+                    parsed_df, parsed_metadata = parse_statement(temp_file_path, pipeline=pipeline)
+                    df = parsed_df
+                    metadata = parsed_metadata
+                if df is not None and not df.empty:
+                    processed_save_path = pipeline.persist(df, metadata.get('source', 'Unknown'), file_name, original_path=temp_file_path)
+                    processed_file_paths.append(processed_save_path)
+                    st.success(f"✅ Successfully processed: {file_name}")
+                    if run_analysis:
+                        bank = metadata.get('source', 'unknown').lower().replace(' ', '_')
+                        month = datetime.now().strftime('%m')
+                        if 'date' in df.columns and not df['date'].empty:
+                            try:
+                                df['date'] = pd.to_datetime(df['date'], errors='coerce')
+                                earliest_date = df['date'].min()
+                                if pd.notna(earliest_date):
+                                    month = earliest_date.strftime('%m')
+                            except Exception as e:
+                                logger.warning(f"Could not determine month from dates for {file_name}: {e}")
+                        report_name = f"{bank}_{month}"
+                        summary = pipeline.analyze(df, output_dir=REPORTS_DIR, save_plots=True, name=report_name)
+                        pipeline.render(report_name)
+                        with st.expander(f"📊 Analysis Results for {file_name}"):
+                            st.json(summary)
+                            report_json_path = os.path.join(REPORTS_DIR, f"{report_name}.json")
+                            if os.path.exists(report_json_path):
+                                st.download_button(label=f"Download {report_name}.json", data=open(report_json_path, "rb").read(), file_name=f"{report_name}.json", mime="application/json")
+                                report_file_paths.append(report_json_path)
+                            generated_files = [f for f in os.listdir(REPORTS_DIR) if f.startswith(report_name) and (f.endswith('.csv') or f.endswith('.png'))]
+                            for gen_file in generated_files:
+                                file_path = os.path.join(REPORTS_DIR, gen_file)
+                                mime_type = "text/csv" if gen_file.endswith('.csv') else "image/png"
+                                st.download_button(label=f"Download {gen_file}", data=open(file_path, "rb").read(), file_name=gen_file, mime=mime_type)
+                                report_file_paths.append(file_path)
+                    yield temp_file_path, PipelineResult(df, metadata, processed_save_path)
+                else:
+                    st.warning(f"⚠️ No transactions found for {file_name}")
+            except Exception as e:
+                logger.exception(f"Error processing {file_name}")
+                st.error(f"❌ Failed to process {file_name}: {e}")
+
+    # First pass: keep only each statement's possible transfer legs
+    saved, legs = pipeline.save_statements(uploaded_statements())
     progress_bar.empty()
     status_text.empty()
 
+    # Second pass: the statements come back one at a time with their transfer flags (saved again
+    # when those changed, so the cube stops counting them). They stream into the combined file and
+    # into small per-run cubes; the trend section keeps a few columns of the filtered rows, and the
+    # preview the first PREVIEW_ROWS rows. Rows of overlapping statements share a transaction id
+    # (src.schema.transaction_ids) and are counted once.
+    trend = StatementAnalysis(columns=['date', 'description', 'amount', 'type', 'category', 'AmountValue'])
+    combined = StatementAnalysis(columns=()) if run_combine and run_analysis else None
+    preview = []
+
+    def reconciled_uploads():
+        previewed = 0
+        for df in pipeline.reconciled_statements(saved, legs, name="combined"):
+            trend.add(apply_filters(df))
+            if combined is not None:
+                combined.add(df)
+            if previewed < PREVIEW_ROWS:
+                preview.append(df.head(PREVIEW_ROWS - previewed))
+                previewed += len(preview[-1])
+            yield df
+
+    combined_save_path = None
+    if saved and run_combine:
+        combined_save_path = pipeline.persist_combined(reconciled_uploads(), "Combined", f"combined_statements.{output_format}")
+        processed_file_paths.append(combined_save_path)
+    else:
+        for _ in reconciled_uploads():
+            pass
+    if pipeline.timings:
+        with st.expander("⏱️ Pipeline Stage Timings"):
+            st.dataframe(pipeline.timings_frame())
+
     # --- Trend Analysis Section ---
-    if all_processed_dfs:
+    if saved:
         st.header("📈 Trend Analysis & Insights")
-        trend_df = pd.concat(all_processed_dfs, ignore_index=True)
-        trend_df = apply_filters(trend_df)
+        trend_df = trend.rows()
         if not trend_df.empty:
+            # The filtered rows' cube (transfers left out); every chart and insight below slices it
+            trend_cube = trend.store.cube
             st.subheader("🎯 Key Metrics")
             display_key_metrics(trend_df)
             col1, col2 = st.columns(2)
@@ -294,20 +337,21 @@ if uploaded_files:
                 spending_chart = create_spending_trend_chart(trend_df)
                 if spending_chart:
                     st.plotly_chart(spending_chart, use_container_width=True)
-                monthly_chart = create_monthly_comparison_chart(trend_df)
+                monthly_chart = create_monthly_comparison_chart(trend_cube)
                 if monthly_chart:
                     st.plotly_chart(monthly_chart, use_container_width=True)
             with col2:
-                category_chart = create_category_pie_chart(trend_df)
+                category_chart = create_category_pie_chart(trend_cube)
                 if category_chart:
                     st.plotly_chart(category_chart, use_container_width=True)
-                income_expense_chart = create_income_vs_expense_chart(trend_df)
+                income_expense_chart = create_income_vs_expense_chart(trend_cube)
                 if income_expense_chart:
                     st.plotly_chart(income_expense_chart, use_container_width=True)
             st.subheader("💡 AI-Powered Insights")
-            if 'category' in trend_df.columns and 'AmountValue' in trend_df.columns:
-                top_category = trend_df.groupby('category')['AmountValue'].sum().idxmax()
-                top_amount = trend_df.groupby('category')['AmountValue'].sum().max()
+            category_totals = query_cube(trend_cube, by='category')
+            if 'AmountValue' in trend_df.columns and not category_totals.empty:
+                top_category = category_totals.idxmax()
+                top_amount = category_totals.max()
                 avg_daily = trend_df['AmountValue'].sum() / max(1, len(trend_df['date'].dt.date.unique()) if 'date' in trend_df.columns else 1)
                 recent_trend = None
                 if len(trend_df) > 1:
@@ -319,20 +363,21 @@ if uploaded_files:
                     <div class='metric-card' style='flex:1;'>📈 <b>Recent Trend</b><br>{recent_trend if recent_trend else ''}</div>
                 </div>
                 """, unsafe_allow_html=True)
+            recurring = detect_recurring(trend_df)
+            if not recurring.empty:
+                st.subheader("🔁 Recurring Payments & Subscriptions")
+                st.dataframe(recurring[['merchant', 'category', 'period', 'occurrences', 'amount_mean', 'last_date', 'next_date']])
+    trend.close()
 
     # --- Combine Statements --- 
-    if run_combine and all_processed_dfs:
+    if combined_save_path is not None:
         st.subheader("Combined Statement Analysis")
-        combined_df = pd.concat(all_processed_dfs, ignore_index=True)
-        if 'transaction_id' in combined_df.columns:
-            combined_df = combined_df.drop_duplicates(subset=['transaction_id'])
-        combined_filename = f"combined_statements.{output_format}"
-        combined_save_path = save_to_processed(combined_df, "Combined", combined_filename, format=output_format, processed_dir=PROCESSED_DIR)
-        processed_file_paths.append(combined_save_path)
         st.success(f"All statements combined and saved to: {combined_save_path}")
-        if run_analysis:
+        if combined is not None:
             report_name = "combined_all_statements"
-            combined_summary = analyze_finances(combined_df, output_dir=REPORTS_DIR, save_plots=True, name=report_name)
+            combined_summary = pipeline.summarize(combined, output_dir=REPORTS_DIR, save_plots=True, name=report_name)
+            combined.close()
+            pipeline.render(report_name)
             st.json(combined_summary)
             st.success("Combined analysis report generated.")
             st.markdown("**Downloadable Reports for Combined Statements:**")
@@ -348,10 +393,10 @@ if uploaded_files:
                 report_file_paths.append(file_path)
 
     # --- Show Processed Preview ---
-    if all_processed_dfs:
-        st.subheader("Processed Transactions Preview")
-        preview_df = pd.concat(all_processed_dfs, ignore_index=True)
-        st.dataframe(preview_df)
+    if preview:
+        st.subheader(f"Processed Transactions Preview (first {PREVIEW_ROWS} rows)")
+        preview_df = pd.concat(preview, ignore_index=True).drop_duplicates(subset=['transaction_id'], ignore_index=True)
+        st.dataframe(with_display_columns(preview_df))
 
     st.subheader("Summary of Processed Files")
     if processed_file_paths:
@@ -384,3 +429,29 @@ else:
     st.plotly_chart(fig, use_container_width=True)
 
 
+
+# --- Ingested History: answered from the aggregate cube updated at ingest, without reading transactions ---
+history_path = IngestPipeline(processed_dir=PROCESSED_DIR).get_aggregates_path()
+if os.path.exists(history_path):
+    history = AggregateStore(history_path)
+    history_cube = history.cube
+    if category_filter_enabled:
+        history_cube = history_cube[history_cube.index.get_level_values('category').isin(selected_categories)]
+    if not history_cube.empty:
+        with st.expander(f"🗂️ All Ingested History ({len(history.ingested)} statements)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(create_monthly_comparison_chart(history_cube), use_container_width=True)
+            with col2:
+                st.plotly_chart(create_income_vs_expense_chart(history_cube), use_container_width=True)
+            st.plotly_chart(create_category_pie_chart(history_cube), use_container_width=True)
+            # Daily detail needs rows: read only the filtered slice of the partitioned store
+            transaction_store = get_transaction_store(PROCESSED_DIR)
+            if transaction_store is not None:
+                history_rows = transaction_store.read(
+                    start=start_date if date_filter_enabled else None, end=end_date if date_filter_enabled else None,
+                    categories=selected_categories if category_filter_enabled else None,
+                    columns=['date', 'AmountValue', 'category', 'is_internal_transfer'])
+                daily_chart = create_spending_trend_chart(exclude_transfers(history_rows))
+                if daily_chart:
+                    st.plotly_chart(daily_chart, use_container_width=True)
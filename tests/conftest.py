@@ -1,5 +1,6 @@
 import sys
 import os
+import copy
 import pytest
 
 @pytest.fixture(autouse=True, scope='session')
@@ -10,3 +11,17 @@ def add_src_to_syspath():
     # Remove standard library parser from sys.modules to force local import
     if 'parser' in sys.modules:
         del sys.modules['parser']
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Point the category and extraction caches at tmp_path, so tests never read or write data/cache."""
+    import src.config_loader as config_loader
+    import src.category_cache as category_cache
+    import src.extract_utils as extract_utils
+    config = copy.deepcopy(config_loader.get_config() or {})
+    config['categorization'] = dict(config.get('categorization') or {}, cache_path=str(tmp_path / 'cache' / 'categories.sqlite'))
+    config['extraction'] = dict(config.get('extraction') or {}, cache_dir=str(tmp_path / 'cache' / 'extracted'))
+    monkeypatch.setattr(config_loader, '_config', config)
+    monkeypatch.setattr(category_cache, '_cache', None)
+    monkeypatch.setattr(extract_utils, '_cache', None)
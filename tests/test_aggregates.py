@@ -0,0 +1,118 @@
+import os
+
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.aggregates import AggregateStore, StatementAnalysis, analyze_incremental, update_aggregates
+from src.analyzer import aggregate_transactions, analyze_finances, query_cube
+
+
+def _statement(month, account, rows):
+    return pd.DataFrame({
+        'date': pd.to_datetime([f'2025-{month:02d}-{day:02d}' for day in range(1, rows + 1)]),
+        'description': ['rent', 'zomato', 'salary', 'rent'][:rows],
+        'amount': [100.0, 25.5, 1000.0, 100.0][:rows],
+        'type': ['Debit', 'Debit', 'Credit', 'Debit'][:rows],
+        'category': ['Housing', 'Food', 'Income', 'Housing'][:rows],
+        'AccountType': account,
+    })
+
+
+def _merge_month(state_path, month):
+    return update_aggregates(_statement(month, 'BankAccount', 4), state_path=state_path, key=f'month_{month}')
+
+
+def test_incremental_summary_matches_full_analysis(tmp_path):
+    state_path = str(tmp_path / 'aggregates.sqlite')
+    statements = [_statement(6, 'BankAccount', 4), _statement(7, 'BankAccount', 3), _statement(7, 'CreditCard', 2)]
+    for statement in statements:
+        summary = analyze_incremental(statement, state_path=state_path)
+    assert summary == analyze_finances(pd.concat(statements, ignore_index=True))
+    assert summary['bank']['recurring_payments'] == {"('rent', 'Housing')": 3}
+
+    # Re-adding a statement that is already in the state does not double count it
+    assert analyze_incremental(statements[0], state_path=state_path) == summary
+    store = AggregateStore(state_path)
+    assert len(store.ingested) == 3
+    assert store.cube['size'].sum() == 9
+    assert store.cube['max'].max() == 1000.0
+
+
+def test_streamed_statements_are_analyzed_from_the_cube(tmp_path):
+    statements = [_statement(6, 'BankAccount', 4), _statement(7, 'BankAccount', 3)]
+    with StatementAnalysis() as analysis:
+        # A statement overlapping an earlier one adds no rows
+        frames = analysis.track(statements + [statements[1].iloc[:2]])
+        assert sum(len(df) for df in frames) == 9
+        assert analysis.summary() == analyze_finances(pd.concat(statements, ignore_index=True))
+        rows = analysis.rows()
+        assert len(rows) == 7 and list(rows.columns) == ['date', 'description', 'amount', 'type', 'category', 'transaction_id']
+        path = analysis.store.path
+    # Without a state path the cube lives only as long as the analysis
+    assert not os.path.exists(path)
+
+
+def test_cube_queries_match_row_scans(tmp_path):
+    state_path = str(tmp_path / 'aggregates.sqlite')
+    statements = [_statement(6, 'BankAccount', 4).assign(source='axis'), _statement(7, 'CreditCard', 2).assign(source='icici')]
+    for statement in statements:
+        assert update_aggregates(statement, state_path=state_path)
+    assert not update_aggregates(statements[0], state_path=state_path)
+    rows = pd.concat(statements, ignore_index=True)
+    store = AggregateStore(state_path)
+
+    assert store.query(account='BankAccount', direction='out') == 225.5
+    by_category = store.query(by='category', direction='out')
+    assert by_category.to_dict() == rows[rows['type'] == 'Debit'].groupby('category')['amount'].sum().to_dict()
+    monthly = store.query(by=['month', 'source'])
+    assert monthly[(pd.Period('2025-07', freq='M'), 'icici')] == 125.5
+    assert store.query(stat='size', start='2025-07', end='2025-07') == 2
+    # The same queries work on an in-memory aggregate
+    cube = aggregate_transactions(rows, by=['month', 'category', 'source', 'direction'])
+    assert query_cube(cube, by='month').equals(store.query(by='month'))
+
+
+def test_statements_are_replaced_by_key_and_overlaps_counted_once(tmp_path):
+    state_path = str(tmp_path / 'aggregates.sqlite')
+    june = _statement(6, 'BankAccount', 4)
+    assert update_aggregates(june.iloc[:2], state_path=state_path, key='axis_june')
+    # A corrected statement replaces its earlier contribution instead of adding to it
+    assert update_aggregates(june, state_path=state_path, key='axis_june')
+    # A second statement overlapping the first adds only its own rows
+    assert update_aggregates(pd.concat([june.iloc[2:], _statement(7, 'BankAccount', 1)]), state_path=state_path, key='axis_july')
+    store = AggregateStore(state_path)
+    assert list(store.ingested) == ['axis_june', 'axis_july']
+    assert store.cube['size'].sum() == 5
+    assert store.query(direction='out') == 325.5
+    assert AggregateStore(str(tmp_path / 'empty.sqlite')).cube.empty
+
+
+def test_rows_of_a_replaced_statement_pass_to_an_overlapping_one(tmp_path):
+    state_path = str(tmp_path / 'aggregates.sqlite')
+    rows = pd.DataFrame({
+        'date': pd.to_datetime(['2025-06-01', '2025-06-02', '2025-06-03']),
+        'description': ['r1', 'r2', 'r3'],
+        'amount': [10.0, 20.0, 30.0],
+        'type': 'Debit',
+        'category': 'Food',
+        'AccountType': 'BankAccount',
+    })
+    assert update_aggregates(rows.iloc[:2], state_path=state_path, key='a')
+    assert update_aggregates(rows.iloc[1:], state_path=state_path, key='b')
+    store = AggregateStore(state_path)
+    assert (store.cube['size'].sum(), store.query(direction='out')) == (3, 60.0)
+    # r2 was counted for a; once a no longer has it, b counts it
+    assert update_aggregates(rows.iloc[:1], state_path=state_path, key='a')
+    store = AggregateStore(state_path)
+    assert (store.cube['size'].sum(), store.query(direction='out')) == (3, 60.0)
+    assert {key: info['rows'] for key, info in store.ingested.items()} == {'a': 1, 'b': 2}
+    assert store.recurring.to_dict() == {('r1', 'Food'): 1, ('r2', 'Food'): 1, ('r3', 'Food'): 1}
+
+
+def test_concurrent_merges_are_all_kept(tmp_path):
+    state_path = str(tmp_path / 'aggregates.sqlite')
+    AggregateStore(state_path)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        assert all(pool.map(_merge_month, [state_path] * 12, range(1, 13)))
+    store = AggregateStore(state_path)
+    assert len(store.ingested) == 12
+    assert store.cube['size'].sum() == 48
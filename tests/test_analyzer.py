@@ -0,0 +1,35 @@
+import pandas as pd
+from src.analyzer import aggregate_transactions, analyze_finances, transaction_direction
+
+
+def _frame():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2025-07-03', '2025-07-10', '2025-08-01', '2025-08-05', '2025-08-09', None, '2025-08-12', '2025-08-20']),
+        'description': ['rent', 'rent', 'rent', 'salary', 'zomato', 'zomato', 'payment', 'zomato'],
+        'amount': [100.0, 100.0, 100.0, 1000.0, 20.0, 30.0, 500.0, 40.0],
+        'type': ['Debit', 'debit', 'OUT', 'Credit', 'Debit', 'Debit', 'Refund/Payment', 'Debit'],
+        'category': ['Housing', 'Housing', 'Housing', 'Income', 'Food', 'Food', 'Payment', 'Food'],
+        'AccountType': ['BankAccount'] * 6 + ['CreditCard'] * 2,
+    })
+
+
+def test_transaction_direction_is_case_insensitive():
+    direction = transaction_direction(pd.Series(['Debit', 'CREDIT', 'refund/payment', 'other', None]))
+    assert list(direction) == ['out', 'in', 'in', 'other', 'other']
+
+
+def test_summary_tables_from_single_aggregation():
+    df = _frame()
+    summary = analyze_finances(df, output_dir=None)
+    bank = summary['bank']
+    assert (bank['total_income'], bank['total_expenses'], bank['net_cash_flow']) == (1000.0, 350.0, 650.0)
+    assert bank['monthly_breakdown'] == {'income': {'2025-07': 0.0, '2025-08': 1000.0},
+                                         'expense': {'2025-07': 200.0, '2025-08': 120.0}}
+    assert bank['top_5_spending_categories'] == {'Housing': 300.0, 'Food': 50.0}
+    assert bank['recurring_payments'] == {"('rent', 'Housing')": 3}
+    cc = summary['credit_card']
+    assert cc['total_spend_by_category'] == {'Payment': 500.0, 'Food': 40.0}
+    assert (cc['payments'], cc['average_monthly_spend']) == (500.0, 40.0)
+    # The input frame is not modified and rows without a date are kept in the aggregate
+    assert list(df.columns) == list(_frame().columns)
+    assert aggregate_transactions(df)['size'].sum() == len(df)
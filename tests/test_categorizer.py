@@ -0,0 +1,64 @@
+import pandas as pd
+from src.categorizer import CategoryEngine, CategoryRule, KeywordAutomaton, categorize_transactions, load_rules
+
+
+def _legacy_categorize(desc):
+    for keywords, category in [(['zomato'], 'Food'), (['uber'], 'Travel'), (['amazon'], 'Shopping'),
+                               (['fuel', 'petrol'], 'Fuel'), (['swiggy'], 'Food'), (['bookmyshow'], 'Entertainment'),
+                               (['bata'], 'Shopping'), (['gwalia sweets'], 'Food'), (['shoppers stop'], 'Shopping'),
+                               (['infiniti payment'], 'Payment')]:
+        if any(keyword in desc for keyword in keywords):
+            return category
+    return 'Other'
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton([('he', 2), ('she', 1), ('hers', 0), ('his', 3)])
+    assert automaton.best_rank('ushers') == 0
+    assert automaton.best_rank('ushe') == 1
+    assert automaton.best_rank('this') == 3
+    assert automaton.best_rank('xyz') is None
+
+
+def test_default_rules_match_legacy_chain():
+    df = pd.DataFrame({'description': ['ZOMATO via UBER', 'Swiggy Uber', 'Indian Oil PETROL', 'Shoppers Stop Amazon',
+                                       'BATA India', 'GWALIA SWEETS PVT', 'unknown', 'zomato'],
+                       'amount': 1.0})
+    df = categorize_transactions(df)
+    assert df['category'].tolist() == [_legacy_categorize(desc) for desc in df['description_clean']]
+    assert df.attrs['stages'] == ['categorize']
+
+
+def test_explicit_priority_and_csv_rules(tmp_path):
+    rules_path = tmp_path / 'rules.csv'
+    rules_path.write_text('keyword,category,priority\nuber,Travel,5\nuber eats,Food,1\ncafe,Food,\n')
+    rules, default = load_rules(str(rules_path))
+    assert rules[0] == CategoryRule('Travel', ('uber',), 5.0)
+    engine = CategoryEngine(rules, default=default)
+    series = pd.Series(['uber eats order', 'uber trip', 'uber trip', 'nothing'])
+    assert engine.classify_series(series).tolist() == ['Food', 'Travel', 'Travel', 'Other']
+
+
+def test_category_cache_hits_and_invalidation(tmp_path):
+    from src.category_cache import CategoryCache
+    rules = [CategoryRule('Food', ('zomato',), 0.0)]
+    engine = CategoryEngine(rules)
+    path = str(tmp_path / 'categories.sqlite')
+    cache = CategoryCache(path, fingerprint=engine.fingerprint)
+    series = pd.Series(['zomato order', 'zomato order', 'rent'])
+    assert engine.classify_series(series, cache=cache).tolist() == ['Food', 'Food', 'Other']
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert engine.classify_series(series, cache=cache).tolist() == ['Food', 'Food', 'Other']
+    assert cache.hit_rate == 0.5
+    # Reopening with the same rules keeps the entries; changed rules get entries of their own
+    assert len(CategoryCache(path, fingerprint=engine.fingerprint)) == 2
+    changed = CategoryEngine(rules + [CategoryRule('Housing', ('rent',), 1.0)])
+    assert changed.fingerprint != engine.fingerprint
+    cache = CategoryCache(path, fingerprint=changed.fingerprint)
+    assert len(cache) == 0
+    assert changed.classify_series(series, cache=cache).tolist() == ['Food', 'Food', 'Housing']
+    # Switching back does not lose the first rule set's entries
+    assert len(CategoryCache(path, fingerprint=engine.fingerprint)) == 2
+    # Only the most recently used rule sets are kept
+    CategoryCache(path, fingerprint='other', keep_rule_sets=2)
+    assert len(CategoryCache(path, fingerprint=changed.fingerprint, keep_rule_sets=2)) == 0
@@ -0,0 +1,90 @@
+import os
+import src.extract_utils as extract_utils
+from src.extract_utils import ExtractionCache, extract_pdf_text
+
+
+def test_cache_hit_skips_pdfplumber(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "statement.pdf"
+    pdf_path.write_bytes(b"%PDF-fake-content")
+    calls = []
+    def fake_pages(path, workers=None):
+        calls.append(path)
+        yield "10-08-2025 Zomato Order 500.00 Dr. 12345678901\n"
+        yield "11-08-2025 Uber Trip 200.00 Dr. 12345678902\n"
+    monkeypatch.setattr(extract_utils, "_iter_pdfplumber_pages", fake_pages)
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    first = extract_pdf_text(str(pdf_path), cache=cache)
+    second = extract_pdf_text(str(pdf_path), cache=cache)
+    assert first == second
+    assert len(calls) == 1
+    # Cached text streams back with the original page boundaries
+    assert list(extract_utils.iter_pdf_pages(str(pdf_path), cache=cache)) == [
+        "10-08-2025 Zomato Order 500.00 Dr. 12345678901\n",
+        "11-08-2025 Uber Trip 200.00 Dr. 12345678902\n",
+    ]
+    # Changed content means a new key and a fresh extraction
+    pdf_path.write_bytes(b"%PDF-other-content")
+    extract_pdf_text(str(pdf_path), cache=cache)
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"), max_entries=2)
+    cache.put("a", "first")
+    cache.put("b", "second")
+    os.utime(cache.path_for("a"), (1, 1))
+    os.utime(cache.path_for("b"), (2, 2))
+    cache.get("a")  # refreshes "a", leaving "b" as the oldest entry
+    cache.put("c", "third")
+    assert cache.get("b") is None
+    assert cache.get("a") == "first"
+    assert cache.get("c") == "third"
+
+
+def test_entry_larger_than_the_cache_is_kept_until_the_next_commit(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "statement.pdf"
+    pdf_path.write_bytes(b"%PDF-fake-content")
+    calls = []
+    def fake_pages(path, workers=None):
+        calls.append(path)
+        yield "x" * 100 + "\n"
+    monkeypatch.setattr(extract_utils, "_iter_pdfplumber_pages", fake_pages)
+    hashed = []
+    monkeypatch.setattr(extract_utils, "file_sha256", lambda path: hashed.append(path) or "digest")
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"), max_bytes=10)
+    # The extract stage warms the cache and the parse stage reads it back: one extraction, one hash
+    extract_pdf_text(str(pdf_path), cache=cache)
+    assert extract_pdf_text(str(pdf_path), cache=cache) == "x" * 100 + "\n"
+    assert (len(calls), len(hashed)) == (1, 1)
+    cache.put("other", "y")
+    assert [os.path.basename(path) for _, _, path in cache.entries()] == ["other.txt"]
+
+
+def test_concurrent_writers_of_one_key_do_not_share_a_temporary_file(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    first, second = cache.writer("a"), cache.writer("a")
+    assert first.tmp_path != second.tmp_path
+    first.write_page("page one")
+    second.write_page("page one")
+    first.commit()
+    second.commit()
+    assert cache.get("a") == "page one"
+    assert [name for name in os.listdir(cache.cache_dir) if name.endswith('.tmp')] == []
+
+
+def test_shard_pages_covers_every_page_in_order():
+    ranges = extract_utils.shard_pages(10, workers=3)
+    pages = [p for start, stop in ranges for p in range(start, stop)]
+    assert pages == list(range(10))
+    assert extract_utils.shard_pages(2, workers=8) == [(0, 1), (1, 2)]
+
+
+def test_partially_consumed_extraction_is_not_cached(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "statement.pdf"
+    pdf_path.write_bytes(b"%PDF-fake-content")
+    monkeypatch.setattr(extract_utils, "_iter_pdfplumber_pages", lambda path, workers=None: iter(["page 1\n", "page 2\n"]))
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    pages = extract_utils.iter_pdf_pages(str(pdf_path), cache=cache)
+    next(pages)
+    pages.close()
+    assert cache.entries() == []
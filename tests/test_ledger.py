@@ -0,0 +1,50 @@
+import pandas as pd
+from src.ledger import get_ledger
+from src.standardizer import standardize_transactions
+from src.io_utils import save_to_processed
+
+
+def _statement(days, amounts, source='axis', category='Food'):
+    df = pd.DataFrame({
+        'date': [f'{day:02d}-08-2025' for day in days],
+        'description': [f'UPI/SHOP {amount:g}' for amount in amounts],
+        'amount': amounts,
+        'type': 'Debit',
+        'category': category,
+    })
+    return standardize_transactions(df, source)
+
+
+def test_overlapping_statements_upsert_once(tmp_path):
+    ledger = get_ledger(str(tmp_path))
+    first = _statement([1, 2, 2], [10.0, 20.0, 20.0])
+    # Two equal purchases on one day are two transactions; the overlap with the next statement is not
+    assert first['transaction_id'].nunique() == 3
+    second = _statement([2, 2, 3], [20.0, 20.0, 30.0])
+    assert second['transaction_id'].iloc[:2].tolist() == first['transaction_id'].iloc[1:].tolist()
+
+    assert ledger.upsert(first, statement='first') == 3
+    assert ledger.upsert(first, statement='first') == 0
+    assert ledger.upsert(second, statement='second') == 1
+    assert len(ledger) == 4
+    assert ledger.query()['amount'].tolist() == [10.0, 20.0, 20.0, 30.0]
+
+
+def test_query_filters(tmp_path):
+    ledger = get_ledger(str(tmp_path))
+    ledger.upsert(_statement([1, 15], [10.0, 20.0]))
+    ledger.upsert(_statement([15, 31], [5.0, 7.0], source='amex', category='Travel'))
+    assert ledger.query(start='2025-08-15', end='2025-08-15')['amount'].tolist() == [20.0, 5.0]
+    assert ledger.query(sources=['amex'])['amount'].tolist() == [5.0, 7.0]
+    assert ledger.query(categories=['Food'], end='2025-08-01')['amount'].tolist() == [10.0]
+    typed = ledger.query(columns=['transaction_id', 'date', 'is_credit_card'])
+    assert typed.columns.tolist() == ['transaction_id', 'date', 'is_credit_card']
+    assert typed['date'].dtype == 'datetime64[ns]' and typed['is_credit_card'].dtype == bool
+
+
+def test_save_to_processed_upserts(tmp_path):
+    df = _statement([1, 2], [10.0, 20.0])
+    save_to_processed(df, 'axis', 'axis.pdf', processed_dir=str(tmp_path))
+    save_to_processed(df, 'axis', 'axis.pdf', processed_dir=str(tmp_path))
+    save_to_processed(df, 'Combined', 'combined.csv', processed_dir=str(tmp_path), store=False)
+    assert len(get_ledger(str(tmp_path))) == 2
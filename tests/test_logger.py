@@ -0,0 +1,58 @@
+import io
+import json
+import logging
+from src.logger import StructuredMessage, configure_logging, debug_sampler, log_event
+
+
+def test_debug_sampler_only_counts_when_debug_is_on():
+    logger = logging.getLogger('test_sampler')
+    logger.setLevel(logging.INFO)
+    sample = debug_sampler(logger, first=2, every=3)
+    assert not any(sample() for _ in range(10))
+    logger.setLevel(logging.DEBUG)
+    sample = debug_sampler(logger, first=2, every=3)
+    assert [i for i in range(1, 11) if sample()] == [1, 2, 3, 6, 9]
+
+
+def test_configure_logging_sets_debug_sampling(monkeypatch):
+    import src.logger as logger_module
+    root = logging.getLogger()
+    level, foreign = root.level, [h for h in root.handlers if not getattr(h, '_finance_handler', False)]
+    monkeypatch.setattr(logger_module, '_sample_first', logger_module._sample_first)
+    monkeypatch.setattr(logger_module, '_sample_every', logger_module._sample_every)
+    try:
+        configure_logging(level='DEBUG', stream=io.StringIO(), use_queue=False, sample_first=0, sample_every=1)
+        sample = debug_sampler(logging.getLogger('test_sampler_config'))
+        assert all(sample() for _ in range(5))
+    finally:
+        for handler in [h for h in root.handlers if getattr(h, '_finance_handler', False)]:
+            root.removeHandler(handler)
+        for handler in foreign:
+            if handler not in root.handlers:
+                root.addHandler(handler)
+        root.setLevel(level)
+
+
+def test_structured_events_through_the_queue():
+    root = logging.getLogger()
+    level, foreign = root.level, [h for h in root.handlers if not getattr(h, '_finance_handler', False)]
+    for handler in foreign:
+        root.removeHandler(handler)
+    stream = io.StringIO()
+    try:
+        configure_logging(level='INFO', stream=stream, use_queue=True, fmt='json')
+        log_event(root, logging.INFO, 'statement_read', file='axis.txt', lines=2)
+        # Below the level: never rendered
+        log_event(root, logging.DEBUG, 'line', text='ignored')
+        root.info("Parsed %d transactions", 2)
+        configure_logging(level='INFO', stream=io.StringIO(), use_queue=False)  # stops the listener, flushing the queue
+    finally:
+        for handler in [h for h in root.handlers if getattr(h, '_finance_handler', False)]:
+            root.removeHandler(handler)
+        for handler in foreign:
+            root.addHandler(handler)
+        root.setLevel(level)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r.get('event', r.get('message')) for r in records] == ['statement_read', 'Parsed 2 transactions']
+    assert records[0]['lines'] == 2 and records[0]['file'] == 'axis.txt'
+    assert str(StructuredMessage('statement_read', {'lines': 2})) == 'statement_read lines=2'
@@ -0,0 +1,48 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from src.manifest import Manifest, file_fingerprint, get_manifest
+
+
+def _append_many(path, writer, count):
+    manifest = Manifest(path)
+    for i in range(count):
+        manifest.append({'filename': f'w{writer}_{i}.csv', 'source': f'writer{writer}', 'rows': i})
+
+
+def test_legacy_import_and_lookups(tmp_path):
+    (tmp_path / 'manifest.json').write_text(json.dumps([
+        {'filename': 'axis.csv', 'source': 'Axis Bank', 'rows': 10, 'saved_at': '2025-08-01T00:00:00'},
+        {'filename': 'amex.csv', 'source': 'Amex', 'rows': 5, 'saved_at': '2025-08-02T00:00:00'},
+    ]))
+    manifest = get_manifest(str(tmp_path))
+    manifest.append({'filename': 'axis.csv', 'source': 'Axis Bank', 'rows': 12, 'content_hash': 'abc'})
+    # Reopening does not import the legacy file again
+    manifest = get_manifest(str(tmp_path))
+    assert len(manifest) == 3
+    assert [e['rows'] for e in manifest.find(filename='axis.csv')] == [10, 12]
+    assert manifest.latest(content_hash='abc')['filename'] == 'axis.csv'
+    assert manifest.find(source='Amex', filename='axis.csv') == []
+
+
+def test_concurrent_writers_keep_every_entry(tmp_path):
+    path = str(tmp_path / 'manifest.sqlite')
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_append_many, [path] * 4, range(4), [50] * 4))
+    manifest = Manifest(path)
+    assert len(manifest) == 200
+    assert len(manifest.find(source='writer3')) == 50
+
+
+def test_unchanged_inputs_are_recognized(tmp_path):
+    statement = tmp_path / 'statement.pdf'
+    statement.write_bytes(b'%PDF statement')
+    manifest = get_manifest(str(tmp_path / 'processed'))
+    assert manifest.unchanged(str(statement)) is None
+    manifest.append({'filename': 'statement.csv', 'source': 'axis', **file_fingerprint(str(statement))})
+    assert manifest.unchanged(str(statement))['filename'] == 'statement.csv'
+    # A touched or renamed copy with the same content is still unchanged; new content is not
+    moved = tmp_path / 'moved.pdf'
+    statement.rename(moved)
+    assert manifest.unchanged(str(moved))['filename'] == 'statement.csv'
+    moved.write_bytes(b'%PDF statement, corrected')
+    assert manifest.unchanged(str(moved)) is None
@@ -0,0 +1,66 @@
+import json
+import os
+from src.metrics import MetricsRegistry, StageProfiler, get_metrics
+from src.pipeline import IngestPipeline
+
+
+def _axis_statement(tmp_path):
+    axis_dir = tmp_path / "axis" / "bank"
+    axis_dir.mkdir(parents=True)
+    file_path = axis_dir / "axis_bank_statement.txt"
+    file_path.write_text("01-08-2025 UPI/ZOMATO 250.00 1,000.00\n02-08-2025 NEFT/SALARY 500.00 1,500.00\n")
+    return str(file_path)
+
+
+def test_registry_exports_prometheus_and_json(tmp_path):
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.describe('rows_total', 'Rows seen.')
+    metrics.inc('rows_total', 3, stage='parse')
+    metrics.inc('rows_total', 2, stage='parse')
+    for seconds in (0.05, 0.5, 5.0):
+        metrics.observe('stage_seconds', seconds, stage='parse')
+    worker = MetricsRegistry(buckets=(0.1, 1.0))
+    worker.observe('stage_seconds', 0.2, stage='parse')
+    metrics.merge(worker.snapshot())
+
+    text = metrics.to_prometheus()
+    assert '# HELP finance_rows_total Rows seen.' in text
+    assert 'finance_rows_total{stage="parse"} 5' in text
+    assert 'finance_stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'finance_stage_seconds_bucket{stage="parse",le="1"} 3' in text
+    assert 'finance_stage_seconds_bucket{stage="parse",le="+Inf"} 4' in text
+    assert 'finance_stage_seconds_count{stage="parse"} 4' in text
+
+    prom_path, json_path = metrics.export(str(tmp_path))
+    summary = json.loads(open(json_path).read())
+    histogram = summary['histograms'][0]
+    assert (histogram['count'], histogram['sum'], histogram['max']) == (4, 5.75, 5.0)
+    assert open(prom_path).read() == text
+
+
+def test_pipeline_records_metrics_and_profiles(tmp_path):
+    metrics = get_metrics()
+    metrics.reset()
+    profiler = StageProfiler(str(tmp_path / "profile"))
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"), profiler=profiler)
+    pipeline.run(_axis_statement(tmp_path), persist=True)
+    parser = 'AxisBankStatementParser'
+    assert metrics.counter_value('parser_transactions_total', parser=parser) == 2
+    assert metrics.counter_value('parser_lines_total', parser=parser) == 2
+    assert metrics.histogram_count('parser_match_seconds', parser=parser) == 1
+    assert metrics.histogram_count('parse_statement_seconds', parser=parser) == 1
+    assert metrics.counter_value('standardize_rows_total') == 2
+    assert metrics.counter_value('persist_rows_total', format='csv') == 2
+    assert metrics.histogram_count('stage_seconds', stage='persist') == 1
+    assert {'parse.prof', 'parse.txt', 'standardize.txt'} <= {os.path.basename(path) for path in profiler.dump()}
+
+
+def test_run_many_merges_worker_metrics(tmp_path):
+    metrics = get_metrics()
+    metrics.reset()
+    statement = _axis_statement(tmp_path)
+    second = tmp_path / "axis" / "bank" / "axis_second.txt"
+    second.write_text("05-08-2025 UPI/SWIGGY 100.00 1,400.00\n")
+    IngestPipeline(processed_dir=str(tmp_path / "processed")).run_many([statement, str(second)], jobs=2)
+    assert metrics.counter_value('parser_transactions_total', parser='AxisBankStatementParser') == 3
+    assert metrics.histogram_count('stage_seconds', stage='standardize') == 2
@@ -104,3 +104,55 @@ def test_category_assignment(tmp_path, parser_cls):
         assert False, f"parse_statement failed: {e}"
     if 'Category' in df.columns:
         assert 'Food' in df['Category'].values
+
+def test_icici_credit_card_streams_wrapped_descriptions(tmp_path):
+    file_path = tmp_path / "icici_credit_card_statement.txt"
+    file_path.write_text(
+        "Transaction Details\n"
+        "09-08-2025 CHOUDHARY AISHI RAM 2124.78 Dr. 11760327288\n"
+        "BA, DELHI, IND\n"
+        "06-08-2025 GWALIA SWEETS PVT LTD, 1370 Dr. 11743243204\n"
+        "AHMEDABAD, IND\n"
+        "12-08-2025 Statement footer\n"
+        "trailing text that belongs to no transaction\n"
+    )
+    parser = ICICICreditCardParser(str(file_path))
+    records = list(parser.iter_transactions())
+    assert [r['description'] for r in records] == [
+        "CHOUDHARY AISHI RAM BA, DELHI, IND",
+        "GWALIA SWEETS PVT LTD, AHMEDABAD, IND",
+    ]
+    assert parser.lines_read == 7
+
+def test_detect_parser_routes_by_first_page_content(tmp_path, monkeypatch):
+    import src.parser as parser_module
+    monkeypatch.setattr(parser_module, "_detections", {})
+    # Neutral name and folder: only the header identifies the bank
+    file_path = tmp_path / "statement.txt"
+    file_path.write_text("Customer ID 1234\nBase Branch: MUMBAI\nwww.icicibank.com\n" + sample_text)
+    bank_key, parser_cls = parser_module.detect_parser(str(file_path))
+    assert bank_key == "icici_savings"
+    assert parser_cls is ICICISavingsBankStatementParser
+    assert list(parser_module._detections.values()) == ["icici_savings"]
+
+def test_detect_parser_falls_back_to_path(tmp_path):
+    from src.parser import detect_parser
+    axis_dir = tmp_path / "axis" / "bank"
+    axis_dir.mkdir(parents=True)
+    file_path = axis_dir / "statement.txt"
+    file_path.write_text(sample_text)
+    assert detect_parser(str(file_path)) == ("axis", AxisBankStatementParser)
+    unknown = tmp_path / "statement.txt"
+    unknown.write_text(sample_text)
+    with pytest.raises(ValueError):
+        detect_parser(str(unknown))
+
+def test_parser_without_iter_transactions_cannot_be_instantiated(tmp_path):
+    from src.parsers.base_parser import BaseParser
+
+    class IncompleteParser(BaseParser):
+        def parse(self):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        IncompleteParser(str(tmp_path / "statement.txt"))
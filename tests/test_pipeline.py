@@ -0,0 +1,124 @@
+import pandas as pd
+
+from src.aggregates import AggregateStore
+from src.pipeline import IngestPipeline, PipelineResult
+from src.io_utils import load_processed
+from src.parser import parse_statement
+from src.standardizer import standardize_transactions
+
+
+def _axis_statement(tmp_path):
+    axis_dir = tmp_path / "axis" / "bank"
+    axis_dir.mkdir(parents=True)
+    file_path = axis_dir / "axis_bank_statement.txt"
+    file_path.write_text("01-08-2025 UPI/ZOMATO 250.00 1,000.00\n02-08-2025 NEFT/SALARY 500.00 1,500.00\n")
+    return str(file_path)
+
+
+def _raw_statement(tmp_path, name, rows, metadata):
+    raw = tmp_path / "raw" / name
+    raw.parent.mkdir(parents=True, exist_ok=True)
+    raw.write_text(name)
+    frame = pd.DataFrame(rows, columns=['date', 'description', 'amount', 'type', 'category'])
+    return str(raw), standardize_transactions(frame, metadata)
+
+
+def test_pipeline_runs_each_stage_once(tmp_path):
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+    result = pipeline.run(_axis_statement(tmp_path), persist=True)
+    assert result.df.attrs['stages'] == ['parse', 'categorize', 'standardize']
+    assert [t.stage for t in pipeline.timings] == ['detect', 'parse', 'categorize', 'standardize', 'persist', 'aggregate']
+    assert (tmp_path / "processed" / "aggregates.sqlite").exists()
+    assert all(t.seconds >= 0 for t in pipeline.timings)
+    assert pipeline.timings_frame()['rows_out'].tolist()[1:4] == [2, 2, 2]
+    assert result.processed_path.endswith('axis_bank_statement.csv')
+    assert (tmp_path / "processed" / "transactions" / "year=2025" / "month=8" / "source=axis").is_dir()
+    # Standardizing again is a no-op on an already standardized frame
+    assert standardize_transactions(result.df, {'source': 'other'}) is result.df
+    assert list(result.df['source'].unique()) == ['axis']
+
+
+def test_parse_statement_records_timings(tmp_path):
+    pipeline = IngestPipeline()
+    df, metadata = parse_statement(_axis_statement(tmp_path), pipeline=pipeline)
+    assert metadata['parser'] == 'AxisBankStatementParser'
+    assert len(df) == 2
+    assert 'standardize' in pipeline.format_timings()
+
+
+def test_pipeline_category_cache_can_be_overridden(tmp_path):
+    from src.category_cache import CategoryCache, get_category_cache
+    from src.categorizer import get_category_engine
+    fingerprint = get_category_engine().fingerprint
+    cache = CategoryCache(str(tmp_path / 'categories.sqlite'), fingerprint=fingerprint)
+    IngestPipeline(category_cache=cache).run(_axis_statement(tmp_path))
+    assert len(cache) == 2
+    # Without a cache the configured one is left alone
+    IngestPipeline(category_cache=None).run(_axis_statement(tmp_path / 'again'))
+    assert len(get_category_cache(fingerprint)) == 0
+
+
+def test_unchanged_statements_are_not_parsed_again(tmp_path):
+    statement = _axis_statement(tmp_path)
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+    assert pipeline.load_unchanged(statement) is None
+    first = pipeline.run(statement, persist=True, original_path=statement)
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+    result = pipeline.load_unchanged(statement)
+    assert result.skipped and result.processed_path == first.processed_path
+    assert [t.stage for t in pipeline.timings] == ['fingerprint']
+    assert result.df['transaction_id'].tolist() == first.df['transaction_id'].tolist()
+    with open(statement, 'a') as f:
+        f.write("03-08-2025 UPI/SWIGGY 100.00 1,400.00\n")
+    assert pipeline.load_unchanged(statement) is None
+
+
+def test_unchanged_statement_whose_processed_file_changed_is_parsed_again(tmp_path):
+    statement = _axis_statement(tmp_path)
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+    first = pipeline.run(statement, persist=True, original_path=statement)
+    # Another statement's rows (or a hand edit) in the processed file must not be served for this one
+    load_processed(first.processed_path).iloc[:1].to_csv(first.processed_path, index=False)
+    assert pipeline.load_unchanged(statement) is None
+
+
+def test_run_many_keeps_file_order_and_isolates_failures(tmp_path):
+    good = _axis_statement(tmp_path)
+    second = tmp_path / "axis" / "bank" / "axis_second.txt"
+    second.write_text("05-08-2025 UPI/SWIGGY 100.00 1,400.00\n")
+    missing = str(tmp_path / "axis" / "bank" / "missing.txt")
+    for jobs in (1, 2):
+        pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+        outcomes = pipeline.run_many([str(second), missing, good], jobs=jobs)
+        assert [o.file for o in outcomes] == [str(second), missing, good]
+        assert [len(o.result.df) if o.result else None for o in outcomes] == [1, None, 2]
+        assert outcomes[1].error and outcomes[0].error is None
+        assert [t.file for t in pipeline.timings if t.stage == 'standardize'] == ['axis_second.txt', 'axis_bank_statement.txt']
+
+
+def test_statement_saved_alone_is_saved_again_with_its_transfer_flags(tmp_path):
+    bank_file, bank = _raw_statement(tmp_path, "axis.txt", [('01-08-2025', 'NEFT/AMEX CARD', 1200.0, 'Debit', 'Payment'),
+                                                            ('05-08-2025', 'UPI/ZOMATO', 250.0, 'Debit', 'Food')], {'source': 'axis'})
+    card_file, card = _raw_statement(tmp_path, "amex.txt", [('02-08-2025', 'PAYMENT RECEIVED', 1200.0, 'Credit', 'Payment'),
+                                                            ('03-08-2025', 'SWIGGY', 300.0, 'Debit', 'Food')],
+                                     {'source': 'amex', 'is_credit_card': True})
+    pipeline = IngestPipeline(processed_dir=str(tmp_path / "processed"))
+    # Ingested on its own first, so the card payment counts as spending
+    pipeline.persist(bank, 'axis', 'axis.txt', original_path=bank_file)
+    assert AggregateStore(pipeline.get_aggregates_path()).query(direction='out') == 1450.0
+    # The combined run reads it back unchanged, but pairing it with the card changes its flags
+    skipped = pipeline.load_unchanged(bank_file)
+    assert skipped.skipped
+    saved, legs = pipeline.save_statements([(bank_file, skipped), (card_file, PipelineResult(card, {'source': 'amex'}, None))])
+    # The card purchase cannot be a transfer leg, so it is not kept
+    assert [statement.skipped for statement in saved] == [True, False]
+    assert sorted(legs['description']) == ['NEFT/AMEX CARD', 'PAYMENT RECEIVED', 'UPI/ZOMATO']
+    frames = list(pipeline.reconciled_statements(saved, legs))
+    assert [df['is_internal_transfer'].tolist() for df in frames] == [[True, False], [True, False]]
+    cube = AggregateStore(pipeline.get_aggregates_path())
+    assert (cube.query(direction='out'), cube.query(direction='in')) == (550.0, 0.0)
+    # Saved with the flags, it is still unchanged for the next run and keeps them
+    again = pipeline.load_unchanged(bank_file)
+    assert again.skipped and again.df['is_internal_transfer'].tolist() == [True, False]
+    # Both statements were saved in the first pass and again with their flags
+    assert [t.stage for t in pipeline.timings].count('persist') == 4
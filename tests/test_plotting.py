@@ -0,0 +1,37 @@
+import os
+import pandas as pd
+from src.analyzer import analyze_finances
+from src.plotting import PlotRenderer, PlotSpec, line_series
+
+
+def _spec(path, values):
+    index = pd.period_range('2025-06', periods=len(values), freq='M')
+    return PlotSpec(str(path), 'Test', [line_series('Spend', index, values)])
+
+
+def test_renderer_skips_unchanged_plots(tmp_path):
+    renderer = PlotRenderer(workers=1)
+    path = tmp_path / 'trend.png'
+    renderer.submit([_spec(path, [1.0, 2.0])])
+    renderer.wait()
+    assert path.exists() and (tmp_path / 'trend.png.sha256').exists()
+    assert renderer.rendered == 1
+
+    assert renderer.submit([_spec(path, [1.0, 2.0])]) == []
+    assert renderer.skipped == 1
+    renderer.submit([_spec(path, [1.0, 3.0])])
+    renderer.wait()
+    assert renderer.rendered == 2
+
+
+def test_analyzer_honours_save_plots(tmp_path):
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2025-06-01', '2025-07-01']),
+        'description': ['salary', 'rent'],
+        'amount': [1000.0, 100.0],
+        'type': ['Credit', 'Debit'],
+        'category': ['Income', 'Housing'],
+        'AccountType': 'BankAccount',
+    })
+    analyze_finances(df, output_dir=str(tmp_path), save_plots=False, name='r')
+    assert sorted(os.listdir(tmp_path)) == ['r_bank_monthly.csv', 'r_bank_top_categories.csv']
@@ -0,0 +1,56 @@
+import pandas as pd
+from src.analyzer import analyze_finances
+from src.reconcile import match_transfers, reconcile_transfers, transfer_legs
+
+
+def _combined():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2025-08-01', '2025-08-02', '2025-08-03', '2025-08-05', '2025-08-20', '2025-08-20', '2025-08-10']),
+        'description': ['BIL/INFT/Self', 'PAYMENT RECEIVED', 'ZOMATO', 'SALARY', 'NEFT/AMEX', 'AMEX PAYMENT', 'SWIGGY'],
+        'amount': [5000.0, -5000.0, 5000.0, 90000.0, 1200.0, -1200.0, 1200.0],
+        'type': ['Debit', 'Credit', 'Debit', 'Credit', 'Debit', 'Credit', 'Debit'],
+        'category': ['Payment', 'Payment', 'Food', 'Income', 'Payment', 'Payment', 'Food'],
+        'AccountType': ['BankAccount', 'CreditCard', 'CreditCard', 'BankAccount', 'BankAccount', 'CreditCard', 'CreditCard'],
+        'source': ['icici', 'amex', 'amex', 'icici', 'icici', 'amex', 'amex'],
+    })
+
+
+def test_pairs_opposite_legs_across_accounts_once():
+    pairs = match_transfers(_combined())
+    # The card's own 5000 and 1200 purchases are not transfers, nor is the salary
+    assert sorted(map(tuple, pairs[['debit_row', 'credit_row']].to_numpy().tolist())) == [(0, 1), (4, 5)]
+
+
+def test_tolerance_and_analysis_exclusion():
+    df = _combined()
+    assert match_transfers(df.assign(date=df['date'].where(df.index != 1, pd.Timestamp('2025-08-09')))).shape[0] == 1
+    reconciled = reconcile_transfers(df)
+    assert reconciled['is_internal_transfer'].tolist() == [True, True, False, False, True, True, False]
+    assert reconciled.loc[0, 'transfer_id'] == reconciled.loc[1, 'transfer_id']
+    summary = analyze_finances(reconciled)
+    assert summary['bank']['total_expenses'] == 0.0
+    assert summary['bank']['total_income'] == 90000.0
+
+
+def test_card_purchases_are_not_paired_with_unrelated_credits():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2025-08-01', '2025-08-02', '2025-08-05', '2025-08-05']),
+        'description': ['FLIPKART', 'NEFT/REFUND FROM LANDLORD', 'UPI/ZOMATO', 'SALARY'],
+        'amount': [2500.0, 2500.0, 700.0, 700.0],
+        'type': ['Debit', 'Credit', 'Debit', 'Credit'],
+        'AccountType': ['CreditCard', 'BankAccount', 'BankAccount', 'BankAccount'],
+        'source': ['amex', 'icici', 'icici', 'axis'],
+    })
+    assert match_transfers(df).empty
+    reconciled = reconcile_transfers(df)
+    assert not reconciled['is_internal_transfer'].any()
+    assert reconciled['transfer_id'].isna().all()
+
+
+def test_legs_alone_reconcile_like_the_whole_frame():
+    df = _combined().assign(transaction_id=[f'id{i}' for i in range(7)])
+    legs = transfer_legs(df)
+    # Purchases and the salary credit can never pair, so they are left out
+    assert legs['transaction_id'].tolist() == ['id0', 'id1', 'id4', 'id5']
+    flags = reconcile_transfers(legs).set_index('transaction_id')['is_internal_transfer']
+    assert flags.reindex(df['transaction_id'], fill_value=False).tolist() == reconcile_transfers(df)['is_internal_transfer'].tolist()
@@ -0,0 +1,28 @@
+import pandas as pd
+from src.recurring import detect_recurring, merchant_keys
+
+
+def _ledger():
+    rows = [(pd.Timestamp(2024, month, 15), f'UPI/NETFLIX/52410{month}77/PAYMENT', 649.0, 'Debit', 'Entertainment')
+            for month in range(1, 7)]
+    rows += [(pd.Timestamp(2024, 1, 1) + pd.Timedelta(weeks=week), 'POS GYM CLUB', 500.0 + week, 'Debit', 'Health')
+             for week in range(8)]
+    rows += [(pd.Timestamp(2024, 1, 1) + pd.Timedelta(days=day), 'STARBUCKS COFFEE', amount, 'Debit', 'Food')
+             for day, amount in [(3, 180.0), (40, 520.0), (41, 150.0), (90, 300.0)]]
+    rows += [(pd.Timestamp(2024, month, 1), 'NEFT/SALARY', 100000.0, 'Credit', 'Income') for month in range(1, 7)]
+    return pd.DataFrame(rows, columns=['date', 'description', 'amount', 'type', 'category'])
+
+
+def test_merchant_keys_ignore_references_and_rails():
+    keys = merchant_keys(pd.Series(['UPI/NETFLIX/123456/PAYMENT', 'POS NETFLIX.COM', 'ACH/SPIL FNLDIV']))
+    assert list(keys) == ['netflix', 'netflix', 'spil fnldiv']
+
+
+def test_detects_periodic_charges_only():
+    found = detect_recurring(_ledger()).set_index('merchant')
+    assert sorted(found.index) == ['gym club', 'netflix']
+    assert found.loc['netflix', 'period'] == 'monthly'
+    assert found.loc['netflix', 'next_date'] == pd.Timestamp(2024, 7, 15)
+    assert found.loc['gym club', 'period'] == 'weekly'
+    assert found.loc['gym club', 'next_date'] == pd.Timestamp(2024, 2, 26)
+    assert found.loc['gym club', 'occurrences'] == 8
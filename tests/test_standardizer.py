@@ -0,0 +1,44 @@
+import pandas as pd
+from src.schema import STRING_DTYPE, format_amount, with_display_columns
+from src.standardizer import standardize_transactions
+
+
+def test_per_source_date_formats():
+    amex = pd.DataFrame({'date': ['2025-08-01'], 'description': ['IRCTC'], 'amount': [1390.0], 'type': ['Debit']})
+    axis = pd.DataFrame({'date': ['01-08-2025'], 'description': ['UPI'], 'amount': ['1,390.00'], 'type': ['Debit']})
+    amex = standardize_transactions(amex, {'source': 'Amex_CreditCard', 'is_credit_card': True})
+    axis = standardize_transactions(axis, {'source': 'Axis Bank', 'is_credit_card': False})
+    assert amex['date'].iloc[0] == pd.Timestamp(2025, 8, 1)
+    assert axis['date'].iloc[0] == pd.Timestamp(2025, 8, 1)
+    assert axis['AmountValue'].iloc[0] == 1390.0
+    assert list(amex['AccountType']) == ['CreditCard']
+    assert list(axis['AccountType']) == ['BankAccount']
+
+
+def test_unparseable_values_and_restandardization():
+    df = pd.DataFrame({'date': ['01-08-2025', 'not a date', '2025/08/03'], 'description': ['a', 'b', 'c'],
+                       'amount': ['₹1,000.50', 'n/a', '20'], 'type': ['Debit', 'Credit', 'Debit']})
+    df = standardize_transactions(df, 'icici_savings')
+    assert df['date'].iloc[0] == pd.Timestamp(2025, 8, 1)
+    assert pd.isna(df['date'].iloc[1])
+    assert df['date'].iloc[2] == pd.Timestamp(2025, 8, 3)
+    assert df['AmountValue'].tolist() == [1000.5, 0.0, 20.0]
+    assert 'Amount' not in df.columns
+    assert format_amount(df['AmountValue']).iloc[0] == '₹1,000.50'
+    assert with_display_columns(df)['Amount'].iloc[0] == '₹1,000.50'
+    # Running the stage again on its own output leaves the dates untouched
+    again = standardize_transactions(df.copy(), 'icici_savings')
+    assert again['date'].tolist()[::2] == df['date'].tolist()[::2]
+
+
+def test_standardized_frame_uses_typed_schema():
+    df = pd.DataFrame({'date': ['01-08-2025', '02-08-2025'], 'description': ['UPI', 'NEFT'], 'amount': [10.0, 20.0],
+                       'type': ['Debit', 'Credit'], 'category': ['Food', 'Income'], 'Amount': ['₹10.00', '₹20.00']})
+    df = standardize_transactions(df, 'axis')
+    assert df['date'].dtype == 'datetime64[ns]'
+    assert df['description'].dtype == STRING_DTYPE
+    assert df['amount'].dtype == 'float64'
+    for col in ['type', 'category', 'source', 'AccountType']:
+        assert df[col].dtype == 'category'
+    assert df['is_credit_card'].dtype == bool
+    assert 'Amount' not in df.columns
@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+from src.store import TransactionStore, statement_key
+from src.io_utils import load_processed, save_combined, save_to_processed
+from src.schema import transaction_ids
+
+
+def _statement(source, month, amounts, category='Food'):
+    return pd.DataFrame({
+        'date': pd.to_datetime([f'2025-{month:02d}-{day + 1:02d}' for day in range(len(amounts))]),
+        'description': [f'{source} purchase {i}' for i in range(len(amounts))],
+        'amount': amounts,
+        'type': 'Debit',
+        'category': category,
+        'AccountType': 'BankAccount',
+        'source': source,
+    })
+
+
+def test_rewrites_replace_and_filters_prune(tmp_path):
+    store = TransactionStore(str(tmp_path / 'transactions'))
+    store.write(pd.concat([_statement('axis', 6, [1.0, 2.0]), _statement('axis', 7, [3.0])]), 'axis_june')
+    store.write(_statement('amex', 7, [10.0, 20.0], category='Travel'), 'amex_july')
+    # Saving the same statement again replaces its rows instead of duplicating them
+    store.write(_statement('axis', 6, [1.0, 2.0]), 'axis_june')
+
+    assert len(store.read()) == 4
+    assert store.read(start='2025-07-01')['amount'].tolist() == [10.0, 20.0]
+    assert store.read(end='2025-06-01')['amount'].tolist() == [1.0]
+    assert store.read(sources=['axis'], categories=['Food'])['amount'].sum() == 3.0
+    assert store.read(categories=['Travel'], columns=['date', 'amount']).columns.tolist() == ['date', 'amount']
+    assert sorted(map(tuple, store.partitions()[['month', 'source']].to_numpy().tolist())) == [(6, 'axis'), (7, 'amex')]
+
+
+def test_save_to_processed_names_and_stores(tmp_path):
+    path = save_to_processed(_statement('axis', 8, [5.0]), 'axis', 'Axis Statement.pdf', processed_dir=str(tmp_path))
+    assert path.endswith('axis_statement.csv')
+    assert statement_key('Axis Statement.pdf') == 'axis_statement.pdf'
+    assert TransactionStore(str(tmp_path / 'transactions')).read()['amount'].tolist() == [5.0]
+    save_to_processed(_statement('axis', 8, [5.0]), 'Combined', 'all_combined.csv', processed_dir=str(tmp_path), store=False)
+    assert len(TransactionStore(str(tmp_path / 'transactions')).read()) == 1
+
+
+def test_statements_sharing_a_file_name_are_kept_apart(tmp_path):
+    processed = str(tmp_path / 'processed')
+    paths = []
+    for folder, amounts in (('m1', [1.0, 2.0]), ('m2', [3.0])):
+        (tmp_path / folder).mkdir()
+        original = tmp_path / folder / 'statement.txt'
+        original.write_text(folder)
+        paths.append(save_to_processed(_statement('axis', 8, amounts), 'axis', 'statement.txt', processed_dir=processed,
+                                       original_path=str(original)))
+    assert paths[0] != paths[1]
+    assert load_processed(paths[0])['amount'].tolist() == [1.0, 2.0]
+    assert sorted(TransactionStore(os.path.join(processed, 'transactions')).read()['amount']) == [1.0, 2.0, 3.0]
+    # Saving a statement again still replaces only its own rows
+    save_to_processed(_statement('axis', 8, [4.0]), 'axis', 'statement.txt', processed_dir=processed,
+                      original_path=str(tmp_path / 'm1' / 'statement.txt'))
+    assert sorted(TransactionStore(os.path.join(processed, 'transactions')).read()['amount']) == [3.0, 4.0]
+
+
+def test_combined_file_is_streamed_and_deduplicated(tmp_path):
+    # The second statement repeats the first one's rows and adds one
+    first, second = _statement('axis', 8, [1.0, 2.0, 2.0]), _statement('axis', 8, [1.0, 2.0, 2.0, 4.0])
+    for df in (first, second):
+        df['transaction_id'] = transaction_ids(df)
+    for fmt in ('csv', 'parquet'):
+        path = save_combined(iter([first, second]), 'Combined', 'all.csv', format=fmt, processed_dir=str(tmp_path))
+        combined = load_processed(path)
+        assert combined['amount'].tolist() == [1.0, 2.0, 2.0, 4.0]
+        assert combined['transaction_id'].is_unique
+    # Combined files never reach the transaction store
+    assert not (tmp_path / 'transactions').exists()
@@ -0,0 +1,43 @@
+from src.parsers.tokenizer import (
+    DATE_DMY, iter_blocks, iter_icici_cc_transactions, tokenize_amex_line, tokenize_bank_line,
+)
+
+
+def test_bank_line_tokens():
+    tokens = tokenize_bank_line("01-08-2025 NEFT FROM 10,500.00 SHARMA 161.00 3,493.42")
+    assert tokens.date == "01-08-2025"
+    # Amounts over three integer digits stay in the description; 161.00 ends it
+    assert tokens.description == "NEFT FROM 10,500.00 SHARMA"
+    assert tokens.amounts == [10500.0, 161.0, 3493.42]
+    assert tokenize_bank_line("Opening Balance 3,654.42") is None
+
+
+def test_blocks_continue_across_pages():
+    pages = [
+        "Header line\n01-08-2025 ACH/INDIAN CLEARING\n",
+        "CORP 10,500.00\n02-08-2025 UPI/SWIGGY 250.00 95,257.37\n",
+    ]
+    assert list(iter_blocks(pages, DATE_DMY)) == [
+        ["01-08-2025 ACH/INDIAN CLEARING", "CORP 10,500.00"],
+        ["02-08-2025 UPI/SWIGGY 250.00 95,257.37"],
+    ]
+
+
+def test_icici_credit_card_description_continues_on_next_page():
+    pages = [
+        "10-08-2025 Fuel Trxn Onus 21.25 Cr. 11760327291\n09-08-2025 CHOUDHARY AISHI RAM 2124.78 Dr. 11760327288\n",
+        "BA, DELHI, IND\n12-08-2025 Statement date\nnot a description\n",
+    ]
+    results = [(tokens.description, tokens.flag, ref, continuation) for tokens, ref, continuation in iter_icici_cc_transactions(pages)]
+    assert results == [
+        ("Fuel Trxn Onus", "Cr.", "11760327291", []),
+        ("CHOUDHARY AISHI RAM", "Dr.", "11760327288", ["BA, DELHI, IND"]),
+    ]
+
+
+def test_amex_line_tokens():
+    tokens = tokenize_amex_line("August 2 IRCTC DELHI 1,390.00 Cr")
+    assert tokens.date == (8, 2)
+    assert tokens.description == "IRCTC DELHI"
+    assert tokens.amounts == [1390.0]
+    assert tokens.flag == "Cr"